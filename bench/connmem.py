@@ -0,0 +1,68 @@
+"""memory and construction time of the conn wrappers.
+
+    $ python -m bench.connmem [-n conns]
+
+wraps n sockets (10000 by default) in TCPConns and reports the memory
+the wrappers take on top of the sockets, as traced by tracemalloc, and
+how long wrapping them took. the sockets are made before measuring, they
+cost the same whatever wraps them. the open file limit is raised as far
+as the hard limit allows, n is capped to fit under it.
+"""
+import gc, getopt, resource, socket, sys, time, tracemalloc
+import net
+
+# descriptors left for the interpreter and the imports.
+SPARE_FDS = 64
+
+def raise_nofile(n: int) -> int:
+    # make room for n more open files, returns how many fit.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = n + SPARE_FDS
+    if soft != resource.RLIM_INFINITY and soft < want:
+        if hard != resource.RLIM_INFINITY:
+            want = min(want, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+        soft = want
+    if soft == resource.RLIM_INFINITY:
+        return n
+    return min(n, soft - SPARE_FDS)
+
+def wrap(socks):
+    return [net.TCPConn(None, None, sock=s) for s in socks]
+
+def main(argv):
+    n = 10000
+    opts, _ = getopt.getopt(argv, 'n:')
+    for opt, val in opts:
+        if opt == '-n':
+            n = int(val)
+
+    fit = raise_nofile(n)
+    if fit < n:
+        print(f'open file limit too low, measuring {fit} conns instead of {n}')
+        n = fit
+    socks = [socket.socket() for _ in range(n)]
+    try:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        conns = wrap(socks)
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        per_conn = (after - before) / n
+        print(f'memory    {(after - before) / 1e6:8.2f} MB for {n} conns, '
+              f'{per_conn:.0f} bytes per conn')
+
+        # construction time without tracemalloc slowing it down.
+        del conns
+        gc.collect()
+        start = time.perf_counter()
+        conns = wrap(socks)
+        took = time.perf_counter() - start
+        print(f'construct {took / n * 1e6:8.2f} us per conn')
+    finally:
+        for s in socks:
+            s.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
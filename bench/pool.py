@@ -0,0 +1,75 @@
+"""requests/sec with a fresh dial per request against a connection pool.
+
+    $ python -m bench.pool [-d seconds] [-c clients]
+
+a threaded echo server runs on loopback, every client thread does a 64
+byte request/response round trip in a loop, either dialing for every
+request or taking a connection from a shared net.Pool.
+"""
+import getopt, sys, threading, time
+import net
+
+REQUEST = b'x' * 64
+
+def echo_handler(conn):
+    # keep serving requests on the conn until the client goes away.
+    while True:
+        buf = conn.read(len(REQUEST))
+        if not buf:
+            return
+        conn.write(buf)
+
+def dial_client(addr, deadline, counts):
+    n = 0
+    while time.monotonic() < deadline:
+        conn = net.dial(addr, 'tcp')
+        conn.write(REQUEST)
+        conn.readexactly(len(REQUEST))
+        conn.close()
+        n += 1
+    counts.append(n)
+
+def pool_client(pool, deadline, counts):
+    n = 0
+    while time.monotonic() < deadline:
+        with pool.conn() as conn:
+            conn.write(REQUEST)
+            conn.readexactly(len(REQUEST))
+        n += 1
+    counts.append(n)
+
+def run(target, args, clients, duration):
+    counts = []
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=target, args=args + (deadline, counts))
+            for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / duration
+
+def main(argv):
+    duration, clients = 2.0, 4
+    opts, _ = getopt.getopt(argv, 'd:c:')
+    for opt, val in opts:
+        if opt == '-d':
+            duration = float(val)
+        elif opt == '-c':
+            clients = int(val)
+
+    lstn = net.listen('127.0.0.1:0', 'tcp')
+    addr = str(lstn.local_addr())
+    server = threading.Thread(target=net.serve, args=(lstn, echo_handler),
+            kwargs={'workers': clients * 2}, daemon=True)
+    server.start()
+
+    rate = run(dial_client, (addr,), clients, duration)
+    print(f'dial per request  {rate:10.0f} req/s')
+    with net.Pool(addr, 'tcp', max_size=clients) as pool:
+        rate = run(pool_client, (pool,), clients, duration)
+        print(f'pooled            {rate:10.0f} req/s  {pool.stats()}')
+    lstn.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
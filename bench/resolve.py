@@ -0,0 +1,49 @@
+"""cold lookup fan-out with and without the threaded resolver.
+
+    $ python -m bench.resolve [-n callers] [-d delay]
+
+n threads resolve the same name at once against a HostsResolver that
+sleeps delay seconds per lookup, standing in for a slow dns server. the
+resolver cache is off so every round is a cold lookup. with the plain
+backend each caller does its own lookup, with ThreadedResolver they are
+coalesced into one.
+"""
+import getopt, sys, time
+from concurrent.futures import ThreadPoolExecutor
+import net
+
+def fan_out(n, rounds=5):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n) as pool:
+        for i in range(rounds):
+            futs = [pool.submit(net.resolve_tcp_addr, 'svc:443') for _ in range(n)]
+            for f in futs:
+                f.result()
+    return (time.perf_counter() - start) / rounds
+
+def main(argv):
+    n, delay = 32, 0.05
+    opts, _ = getopt.getopt(argv, 'n:d:')
+    for opt, val in opts:
+        if opt == '-n':
+            n = int(val)
+        elif opt == '-d':
+            delay = float(val)
+    net.set_resolver_cache(None)
+
+    hosts = net.HostsResolver({'svc': ['127.0.0.1']}, delay)
+    # a blocking backend still overlaps lookups across the caller threads,
+    # but every caller pays for a lookup of its own.
+    net.set_resolver_backend(hosts)
+    took = fan_out(n)
+    print(f'plain     {n} callers {took*1000:8.1f} ms/round {hosts.lookups:5d} lookups')
+
+    hosts = net.HostsResolver({'svc': ['127.0.0.1']}, delay)
+    threaded = net.ThreadedResolver(lookup=hosts)
+    net.set_resolver_backend(threaded)
+    took = fan_out(n)
+    print(f'threaded  {n} callers {took*1000:8.1f} ms/round {hosts.lookups:5d} lookups')
+    threaded.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,86 @@
+"""accept/sec and datagrams/sec against SO_REUSEPORT shard counts.
+
+    $ python -m bench.reuseport [-d seconds] [-c clients] [-s 1,2,4]
+
+every run opens a sharded listener on loopback, serves it with one worker
+process per shard and hammers it from client processes for the duration.
+the numbers only scale with shards on a machine with spare cores for both
+the workers and the clients.
+"""
+import getopt, multiprocessing, socket, sys, threading, time
+import net
+
+def close_handler(conn):
+    pass
+
+def reply_handler(conn, buf, raddr):
+    conn.write_to(b'.', raddr)
+
+def connect_client(addr, deadline, count):
+    n = 0
+    while time.monotonic() < deadline:
+        c = socket.create_connection(addr)
+        # wait for the worker to close, so we count accepted conns only.
+        c.recv(1)
+        c.close()
+        n += 1
+    with count.get_lock():
+        count.value += n
+
+def datagram_client(addr, deadline, count):
+    c = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    c.settimeout(0.5)
+    n = 0
+    while time.monotonic() < deadline:
+        c.sendto(b'.', addr)
+        try:
+            c.recvfrom(1)
+            n += 1
+        except socket.timeout:
+            pass
+    c.close()
+    with count.get_lock():
+        count.value += n
+
+def run(network, handler, client, shards, clients, duration) -> float:
+    lstn = net.listen('127.0.0.1:0', network, reuse_port=True, shards=shards) \
+            if shards > 1 else net.ShardedListener(
+                    [net.listen('127.0.0.1:0', network, reuse_port=True)])
+    addr = lstn.local_addr().addrinfo
+    ctx = multiprocessing.get_context('fork')
+    server = threading.Thread(target=lstn.serve, args=(handler,))
+    server.start()
+    time.sleep(0.2)
+    count = ctx.Value('q', 0)
+    deadline = time.monotonic() + duration
+    procs = [ctx.Process(target=client, args=(addr, deadline, count))
+            for _ in range(clients)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    lstn.close()
+    server.join()
+    return count.value / duration
+
+def main():
+    opts, _ = getopt.getopt(sys.argv[1:], 'd:c:s:')
+    duration, clients, shard_counts = 2.0, 4, [1, 2, 4]
+    for opt, arg in opts:
+        if opt == '-d':
+            duration = float(arg)
+        elif opt == '-c':
+            clients = int(arg)
+        elif opt == '-s':
+            shard_counts = [int(n) for n in arg.split(',')]
+
+    print(f'{"shards":>6} {"accept/s":>12} {"datagrams/s":>12}')
+    for shards in shard_counts:
+        accepts = run('tcp', close_handler, connect_client, shards, clients,
+                duration)
+        grams = run('udp', reply_handler, datagram_client, shards, clients,
+                duration)
+        print(f'{shards:>6} {accepts:>12.0f} {grams:>12.0f}')
+
+if __name__ == '__main__':
+    main()
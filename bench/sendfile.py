@@ -0,0 +1,92 @@
+"""file streaming throughput: TCPConn.send_file against reading the file
+into memory and writing it.
+
+    $ python -m bench.sendfile [-s 1M,16M,256M,1G] [-r repeats]
+
+    read+write  conn.write(open(path, 'rb').read())
+    chunked     conn.send_file on a file object without a fileno, the
+                fallback path through one reusable buffer
+    sendfile    conn.send_file(path), copied in the kernel
+
+the files are written to the temp directory and streamed over loopback tcp
+to a reader thread.
+"""
+import getopt, os, sys, tempfile, threading, time
+import net
+
+class NoFileno:
+    # hides the fileno of a file so send_file takes the chunked path.
+    def __init__(self, f):
+        self.f = f
+
+    def seek(self, offset):
+        return self.f.seek(offset)
+
+    def readinto(self, buf):
+        return self.f.readinto(buf)
+
+def read_write(conn, path):
+    with open(path, 'rb') as f:
+        conn.write(f.read())
+
+def chunked(conn, path):
+    with open(path, 'rb') as f:
+        conn.send_file(NoFileno(f))
+
+def sendfile(conn, path):
+    conn.send_file(path)
+
+def drain(conn):
+    buf = bytearray(1 << 20)
+    while conn.read_into(buf):
+        pass
+
+def run(fn, path, size, repeats) -> float:
+    lstn = net.listen('127.0.0.1:0', 'tcp')
+    client = net.dial(str(lstn.local_addr()), 'tcp')
+    conn = lstn.accept()
+    reader = threading.Thread(target=drain, args=(conn,))
+    reader.start()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(client, path)
+    client.close_write()
+    reader.join()
+    elapsed = time.perf_counter() - start
+    for c in (client, conn, lstn):
+        c.close()
+    return size * repeats / elapsed / 1e6
+
+def parse_size(s: str) -> int:
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    if s[-1].upper() in units:
+        return int(s[:-1]) * units[s[-1].upper()]
+    return int(s)
+
+def main():
+    opts, _ = getopt.getopt(sys.argv[1:], 's:r:')
+    sizes, repeats = ['1M', '16M', '256M'], 3
+    for opt, arg in opts:
+        if opt == '-s':
+            sizes = arg.split(',')
+        elif opt == '-r':
+            repeats = int(arg)
+
+    print(f'{"size":>6} {"read+write":>12} {"chunked":>12} {"sendfile":>12}  MB/s')
+    for name in sizes:
+        size = parse_size(name)
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                block = os.urandom(1 << 20)
+                for _ in range(size >> 20):
+                    f.write(block)
+                f.write(block[:size & ((1 << 20) - 1)])
+            rates = [run(fn, path, size, repeats)
+                    for fn in (read_write, chunked, sendfile)]
+        finally:
+            os.unlink(path)
+        print(f'{name:>6} ' + ' '.join(f'{r:>12.0f}' for r in rates))
+
+if __name__ == '__main__':
+    main()
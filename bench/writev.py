@@ -0,0 +1,68 @@
+"""header + payload writes: Conn.writev against the write paths.
+
+    $ python -m bench.writev [-n iterations]
+
+    concat   conn.write(header + payload)
+    2-write  conn.write(header); conn.write(payload)
+    buffered conn.file().write(header); .write(payload); .flush()
+    writev   conn.writev([header, payload])
+
+a thread drains the other end of a socketpair while the writes run.
+"""
+import getopt, socket, sys, threading, time
+import net
+
+def drain(sock):
+    buf = bytearray(1 << 20)
+    while sock.recv_into(buf):
+        pass
+
+def concat(conn, header, payload):
+    conn.write(header + payload)
+
+def two_writes(conn, header, payload):
+    conn.write(header)
+    conn.write(payload)
+
+def buffered(conn, header, payload):
+    f = conn.file()
+    f.write(header)
+    f.write(payload)
+    f.flush()
+
+def writev(conn, header, payload):
+    conn.writev([header, payload])
+
+def run(fn, size, iterations):
+    a, b = socket.socketpair()
+    reader = threading.Thread(target=drain, args=(b,))
+    reader.start()
+    conn = net.Conn(a)
+    header, payload = b'h' * 16, b'p' * size
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(conn, header, payload)
+    elapsed = time.perf_counter() - start
+    conn.close_write()
+    reader.join()
+    conn.close()
+    b.close()
+    return iterations / elapsed, iterations * (size + 16) / elapsed / 1e6
+
+def main():
+    opts, _ = getopt.getopt(sys.argv[1:], 'n:')
+    iterations = 20000
+    for opt, arg in opts:
+        if opt == '-n':
+            iterations = int(arg)
+
+    print(f'{"payload":>8} {"path":>9} {"writes/s":>12} {"MB/s":>10}')
+    for size in (64, 4096, 1 << 20):
+        n = iterations if size < (1 << 20) else max(iterations // 100, 10)
+        for name, fn in (('concat', concat), ('2-write', two_writes),
+                ('buffered', buffered), ('writev', writev)):
+            ops, mbs = run(fn, size, n)
+            print(f'{size:>8} {name:>9} {ops:>12.0f} {mbs:>10.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,19 @@
 from .errors   import *
 from .netaddr  import *
+from .resolv   import *
+from .metrics  import *
+from .trace    import *
 from .tcpconn  import *
 from .udpconn  import *
 from .unixconn import *
+from .shard    import *
 from .dial_listen import *
+from .writequeue import *
+from .server import *
+from .pool   import *
+from .framing import *
+from .histogram import *
+from .client  import *
+from . import aio
 
 #__all__ = ['address', 'conn', 'errors']
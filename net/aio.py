@@ -0,0 +1,421 @@
+"""asyncio flavour of the net api.
+
+the blocking Conn types tie up a thread for every connection they serve, the
+types in here wrap non blocking sockets and hand the waiting over to the
+running asyncio event loop instead. the same address resolution machinery
+(resolver, AddrConfig and the Addr types) is used, so addresses and networks
+look exactly like they do for the blocking api.
+
+    import asyncio
+    from net import aio
+
+    async def main():
+        lstn = await aio.listen('localhost:5055', 'tcp')
+        async for conn in lstn:
+            buf = await conn.read(1024)
+            await conn.write(buf)
+            conn.close()
+
+    asyncio.run(main())
+"""
+import asyncio
+import os
+import time
+
+from .netconn import *
+from .netaddr import *
+from .errors import *
+from .tcpconn import _set_accept_options
+from . import metrics as _metrics
+
+def _wake(fut):
+    # reader/writer callback that resolves fut. the waiting task may have
+    # been cancelled before the callback got to run, so check first.
+    if not fut.done():
+        fut.set_result(None)
+
+class AsyncConn:
+    """AsyncConn is the generic wrapper around a non blocking socket.
+
+    reads and writes are coroutines that wait on the running event loop
+    for the socket to become ready.
+
+    Parameters
+    ----------
+    sock: socket.socket
+        the socket to wrap, it is switched into non blocking mode.
+    """
+    def __init__(self, sock: socket.socket):
+        assert isinstance(sock, socket.socket), 'socket not a socket object'
+        sock.setblocking(False)
+        self.sock = sock
+        self.laddr = None
+        self.raddr = None
+
+    async def read(self, n: int = 0) -> bytes:
+        # read at most n bytes from the connection, without n read until
+        # the remote end closes its side of the connection.
+        loop = asyncio.get_running_loop()
+        if n:
+            return await self._recv(loop, n)
+        chunks = []
+        while True:
+            buf = await self._recv(loop, RECV_MAX)
+            if not buf:
+                return b''.join(chunks)
+            chunks.append(buf)
+
+    async def _recv(self, loop, n: int) -> bytes:
+        hooks = _metrics._hooks
+        if hooks is None:
+            return await loop.sock_recv(self.sock, n)
+        # the time spent waiting on the loop is counted, like the time a
+        # blocking recv spends waiting.
+        start = time.perf_counter()
+        buf = await loop.sock_recv(self.sock, n)
+        hooks.on_read(self, 'recv', len(buf), seconds=time.perf_counter() - start)
+        return buf
+
+    async def write(self, buf: bytes) -> int:
+        # write all of buf to the connection.
+        loop = asyncio.get_running_loop()
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        await loop.sock_sendall(self.sock, buf)
+        with memoryview(buf) as view:
+            n = view.nbytes
+        if hooks is not None:
+            hooks.on_write(self, 'sendall', n, seconds=time.perf_counter() - start)
+        return n
+
+    async def _wait(self, writable: bool = False):
+        # wait for the socket to become readable or writable on the
+        # running loop. used for the calls asyncio has no sock_* helper for.
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        fd = self.sock.fileno()
+        if writable:
+            loop.add_writer(fd, _wake, fut)
+            remove = loop.remove_writer
+        else:
+            loop.add_reader(fd, _wake, fut)
+            remove = loop.remove_reader
+        try:
+            await fut
+        finally:
+            remove(fd)
+
+    async def _recvfrom(self):
+        while True:
+            try:
+                return self.sock.recvfrom(RECV_MAX)
+            except (BlockingIOError, InterruptedError):
+                await self._wait()
+
+    async def _sendto(self, buf, addrinfo) -> int:
+        while True:
+            try:
+                return self.sock.sendto(buf, addrinfo)
+            except (BlockingIOError, InterruptedError):
+                await self._wait(writable=True)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def close_read(self):
+        self.sock.shutdown(socket.SHUT_RD)
+
+    def close_write(self):
+        self.sock.shutdown(socket.SHUT_WR)
+
+    def close(self) -> None:
+        hooks = _metrics._hooks
+        if hooks is not None:
+            hooks.on_close(self)
+        self.sock.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+class AsyncTCPConn(AsyncConn):
+    """AsyncTCPConn is the asyncio version of TCPConn."""
+    def local_addr(self) -> TCPAddr:
+        if self.laddr:
+            return self.laddr
+        self.laddr = TCPAddr(self.sock.getsockname())
+        return self.laddr
+
+    def remote_addr(self) -> TCPAddr:
+        if self.raddr:
+            return self.raddr
+        self.raddr = TCPAddr(self.sock.getpeername())
+        return self.raddr
+
+class AsyncUDPConn(AsyncConn):
+    """AsyncUDPConn is the asyncio version of UDPConn."""
+    async def read_from(self) -> tuple[bytes, UDPAddr]:
+        # read a datagram and the address of the sender.
+        data, raddr = await self._recvfrom()
+        return data, intern_addr(UDPAddr, raddr)
+
+    async def write_to(self, buf: bytes, addr: UDPAddr) -> int:
+        # write a datagram to addr.
+        return await self._sendto(buf, addr.addrinfo)
+
+    def local_addr(self) -> UDPAddr:
+        if self.laddr:
+            return self.laddr
+        self.laddr = UDPAddr(self.sock.getsockname())
+        return self.laddr
+
+    def remote_addr(self) -> UDPAddr:
+        if self.raddr:
+            return self.raddr
+        self.raddr = UDPAddr(self.sock.getpeername())
+        return self.raddr
+
+class AsyncUnixConn(AsyncConn):
+    """AsyncUnixConn is the asyncio version of UnixConn."""
+    async def read_from(self) -> tuple[bytes, UnixAddr]:
+        data, raddr = await self._recvfrom()
+        return data, intern_addr(UnixAddr, raddr)
+
+    async def write_to(self, buf: bytes, addr: UnixAddr) -> int:
+        return await self._sendto(buf, addr.addrinfo)
+
+    def local_addr(self) -> UnixAddr:
+        if self.laddr:
+            return self.laddr
+        self.laddr = UnixAddr(self.sock.getsockname())
+        return self.laddr
+
+    def remote_addr(self) -> UnixAddr:
+        if self.raddr:
+            return self.raddr
+        self.raddr = UnixAddr(self.sock.getpeername())
+        return self.raddr
+
+class AsyncListener:
+    """AsyncListener accepts connections from a listening socket on the
+    running event loop.
+
+    accept returns the next connection, a listener is also an async iterator
+    so connections can be consumed with `async for`. closing the listener
+    wakes a pending accept and ends the iteration.
+    """
+    conn_type = AsyncConn
+
+    def __init__(self, laddr: Addr, sock: socket.socket):
+        assert isinstance(sock, socket.socket), 'sock not a socket object'
+        sock.setblocking(False)
+        self.sock = sock
+        self.laddr = laddr
+        self._closed = False
+        # (loop, future) of the accept currently waiting on the socket.
+        self._waiter = None
+
+    async def accept(self) -> AsyncConn:
+        """accept waits for and returns the next connection to the listener"""
+        loop = asyncio.get_running_loop()
+        while True:
+            if self._closed:
+                raise SocketError('accept on a closed listener')
+            try:
+                sock, _ = self.sock.accept()
+                conn = self.conn_type(sock)
+                hooks = _metrics._hooks
+                if hooks is not None:
+                    # only the accept call, not the wait on the loop.
+                    hooks.on_accept(self, conn)
+                return conn
+            except (BlockingIOError, InterruptedError):
+                pass
+            fut = loop.create_future()
+            fd = self.sock.fileno()
+            loop.add_reader(fd, _wake, fut)
+            self._waiter = (loop, fut)
+            try:
+                await fut
+            finally:
+                self._waiter = None
+                if not self._closed:
+                    loop.remove_reader(fd)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> AsyncConn:
+        try:
+            return await self.accept()
+        except (SocketError, OSError):
+            # the listener was closed underneath us.
+            if self._closed:
+                raise StopAsyncIteration
+            raise
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def close(self) -> None:
+        # the event loop does not notice a closed fd, so drop the reader
+        # and wake the waiting accept ourselves before closing.
+        self._closed = True
+        if self._waiter:
+            loop, fut = self._waiter
+            loop.remove_reader(self.sock.fileno())
+            _wake(fut)
+        self.sock.close()
+
+class AsyncTCPListener(AsyncListener):
+    """AsyncTCPListener is the asyncio version of TCPListener."""
+    conn_type = AsyncTCPConn
+
+    def local_addr(self) -> TCPAddr:
+        if self.laddr:
+            return self.laddr
+        self.laddr = TCPAddr(self.sock.getsockname())
+        return self.laddr
+
+class AsyncUnixListener(AsyncListener):
+    """AsyncUnixListener is the asyncio version of UnixListener.
+
+    the socket file is removed on close by default, since the listener
+    created it. use set_unlink_on_close(False) to keep it around.
+    """
+    conn_type = AsyncUnixConn
+
+    def __init__(self, laddr: UnixAddr, sock: socket.socket):
+        super().__init__(laddr, sock)
+        self.__unlink = True
+
+    def local_addr(self) -> UnixAddr:
+        return self.laddr
+
+    def set_unlink_on_close(self, unlink: bool):
+        self.__unlink = unlink
+
+    def close(self):
+        super().close()
+        if self.__unlink:
+            try:
+                os.unlink(self.laddr.addrinfo)
+            except OSError as e:
+                raise SocketError(e.strerror)
+
+async def _resolve(address: str, network: str):
+    host, port = split_host_port(address)
+    return await resolve_addr_async(host, port, network)
+
+async def dial(address: str, network: str, options = None):
+    """dial connects to network on the address endpoint.
+
+    it works exactly like net.dial, see it for the forms address and network
+    can take, and AddrConfig.add_options for options. every resolved address
+    is tried in order until one connects.
+
+    Returns
+    -------
+    AsyncTCPConn | AsyncUDPConn | AsyncUnixConn
+
+    Raises
+    ------
+    UnknownNetworkError
+    """
+    loop = asyncio.get_running_loop()
+    if net_is_valid('tcp', network) or net_is_valid('udp', network):
+        addr_list, config = await _resolve(address, network)
+        config.add_options(options)
+        conn_obj = AsyncTCPConn if net_is_valid('tcp', network) else AsyncUDPConn
+        err = None
+        for raddr in addr_list:
+            sock = config.get_socket()
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, raddr.addrinfo)
+            except OSError as e:
+                sock.close()
+                err = e
+                continue
+            conn = conn_obj(sock)
+            conn.raddr = raddr
+            return conn
+        if err:
+            raise err
+        raise SocketError(f'no addresses to dial for {address}')
+    elif net_is_valid('unix', network):
+        config = config_inetaddr(address, '', network)
+        config.add_options(options)
+        sock = config.get_socket()
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+        except OSError:
+            sock.close()
+            raise
+        conn = AsyncUnixConn(sock)
+        conn.raddr = UnixAddr(address)
+        return conn
+    else:
+        raise UnknownNetworkError(network)
+
+async def listen(address: str, network: str, options = None,
+        backlog: int = socket.SOMAXCONN, defer_accept: int = 0,
+        fastopen: int = 0):
+    """listen announces on the local network address.
+
+    it works exactly like net.listen, options, backlog and the tcp accept
+    tuning included. stream networks return a listener,
+    datagram networks return a bound conn ready for read_from.
+
+    Returns
+    -------
+    AsyncTCPListener | AsyncUDPConn | AsyncUnixListener | AsyncUnixConn
+
+    Raises
+    ------
+    UnknownNetworkError
+    """
+    if net_is_valid('tcp', network) or net_is_valid('udp', network):
+        addr_list, config = await _resolve(address, network)
+        config.add_options(options)
+        err = None
+        for addr in addr_list:
+            sock = config.get_socket()
+            try:
+                if net_is_valid('tcp', network):
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    sock.bind(addr.addrinfo)
+                    _set_accept_options(sock, defer_accept, fastopen)
+                    sock.listen(backlog)
+                    # the resolved addr may carry port 0, keep the bound one.
+                    return AsyncTCPListener(TCPAddr(sock.getsockname()), sock)
+                sock.bind(addr.addrinfo)
+                return AsyncUDPConn(sock)
+            except OSError as e:
+                sock.close()
+                err = e
+        if err:
+            raise err
+        raise SocketError(f'no addresses to listen on for {address}')
+    elif network == 'unix' or network == 'unixgram':
+        laddr = UnixAddr(address)
+        config = config_inetaddr(address, '', network)
+        config.add_options(options)
+        sock = config.get_socket()
+        try:
+            sock.bind(address)
+            if network == 'unix':
+                sock.listen(backlog)
+        except OSError:
+            sock.close()
+            raise
+        if network == 'unix':
+            return AsyncUnixListener(laddr, sock)
+        conn = AsyncUnixConn(sock)
+        conn.laddr = laddr
+        return conn
+    else:
+        raise UnknownNetworkError(network)
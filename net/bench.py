@@ -0,0 +1,303 @@
+"""benchmarks for every network net supports, against loopback.
+
+    $ python -m net.bench [-n tcp,udp,...] [-d seconds] [-o out.json]
+    $ python -m net.bench -c old.json new.json [-t percent]
+
+for the stream networks (tcp, tcp6, unix) it measures echo throughput,
+request/response round trip latency and the connection rate. for the
+datagram networks (udp, udp6, unixgram) it measures round trip latency and
+the rate datagrams are received at. servers and clients are set up with
+net.listen and net.dial, so the numbers include whatever those do.
+
+results are printed as json, -o writes them to a file as well. -c compares
+two result files and exits with status 1 when a metric got worse by more
+than -t percent, to catch regressions between versions.
+"""
+import getopt, json, os, platform, socket, sys, tempfile, threading, time
+import net
+
+STREAM_NETWORKS = ('tcp', 'tcp6', 'unix')
+DATAGRAM_NETWORKS = ('udp', 'udp6', 'unixgram')
+NETWORKS = STREAM_NETWORKS + DATAGRAM_NETWORKS
+
+CHUNK = 0x10000
+MESSAGE = b'x' * 64
+# datagrams starting with PING are echoed, the rest are only counted.
+PING = b'?'
+
+def usage():
+    print('Usage: python -m net.bench <options>')
+    print('  Benchmark the networks net supports on loopback')
+    print('')
+    print('    -n    Comma separated networks to run, all of them by default')
+    print(f'          {",".join(NETWORKS)}')
+    print('    -d    Seconds every scenario runs for, 1 by default')
+    print('    -o    Write the json results to a file')
+    print('    -c    Compare two result files: -c old.json new.json')
+    print('    -t    Percent a metric may get worse by in a compare, 10 by default')
+
+def _address(network: str, tmpdir: str) -> str:
+    if network in ('unix', 'unixgram'):
+        return os.path.join(tmpdir, f'{network}.sock')
+    return '[::1]:0' if '6' in network else '127.0.0.1:0'
+
+def _latency(hist: net.Histogram) -> dict:
+    # round trip percentiles in microseconds, n/a when no round trip
+    # finished in time.
+    summary = hist.summary()
+    return {f'rtt_{p}_us': 'n/a' if summary[p] is None
+            else round(summary[p] * 1e6, 1) for p in ('p50', 'p99', 'p999')}
+
+def echo_handler(conn):
+    while True:
+        buf = conn.read(CHUNK)
+        if not buf:
+            return
+        conn.write(buf)
+
+def stream_throughput(address: str, network: str, duration: float) -> float:
+    # MB/s echoed back, the client writes from a thread while it reads.
+    conn = net.dial(address, network)
+    chunk = b'x' * CHUNK
+
+    def send():
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            conn.write(chunk)
+        conn.close_write()
+    t = threading.Thread(target=send)
+    start = time.perf_counter()
+    t.start()
+    total = 0
+    buf = bytearray(CHUNK)
+    while True:
+        n = conn.read_into(buf)
+        if not n:
+            break
+        total += n
+    took = time.perf_counter() - start
+    t.join()
+    conn.close()
+    return total / took / 1e6
+
+def stream_latency(address: str, network: str, duration: float) -> dict:
+    conn = net.dial(address, network)
+    hist = net.Histogram()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn.write(MESSAGE)
+        conn.readexactly(len(MESSAGE))
+        hist.record(time.perf_counter() - start)
+    conn.close()
+    return _latency(hist)
+
+def conn_rate(address: str, network: str, duration: float) -> float:
+    # connections per second, dialed and closed one after the other.
+    n = 0
+    start = time.perf_counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        net.dial(address, network).close()
+        n += 1
+    return n / (time.perf_counter() - start)
+
+def bench_stream(network: str, duration: float, tmpdir: str) -> dict:
+    lstn = net.listen(_address(network, tmpdir), network)
+    address = str(lstn.local_addr())
+    server = threading.Thread(target=net.serve, args=(lstn, echo_handler),
+            kwargs={'workers': 4}, daemon=True)
+    server.start()
+    try:
+        results = {'throughput_mb_s': round(stream_throughput(address,
+            network, duration), 1)}
+        results.update(stream_latency(address, network, duration))
+        results['conn_rate'] = round(conn_rate(address, network, duration))
+    finally:
+        lstn.close()
+    return results
+
+class _DatagramServer:
+    # echoes pings and counts every datagram it gets.
+    def __init__(self, conn):
+        self.conn = conn
+        self.received = 0
+        self.closing = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            try:
+                buf, raddr = self.conn.read_from()
+            except OSError:
+                return
+            if self.closing:
+                return
+            self.received += 1
+            if buf.startswith(PING):
+                try:
+                    self.conn.write_to(buf, raddr)
+                except OSError:
+                    pass
+
+    def close(self):
+        self.closing = True
+        try:
+            self.conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.thread.join(1)
+        self.conn.close()
+
+def _datagram_client(address: str, network: str, tmpdir: str):
+    if network == 'unixgram':
+        # a unixgram client has to be bound to get the echo back.
+        conn = net.listen(os.path.join(tmpdir, 'client.sock'), network)
+        conn.connect(net.UnixAddr(address))
+        return conn
+    return net.dial(address, network)
+
+def datagram_latency(conn, duration: float) -> dict:
+    hist = net.Histogram()
+    lost = 0
+    ping = PING + MESSAGE[1:]
+    conn.settimeout(0.5)
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        conn.write(ping)
+        try:
+            conn.sock.recv(len(ping))
+        except socket.timeout:
+            lost += 1
+            continue
+        hist.record(time.perf_counter() - start)
+    results = _latency(hist)
+    results['lost'] = lost
+    return results
+
+def datagram_rate(conn, server: _DatagramServer, duration: float) -> float:
+    # datagrams per second the server got. udp drops what does not fit
+    # in the server's buffer, unixgram sends block until it does.
+    conn.settimeout(None)
+    before = server.received
+    start = time.perf_counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for _ in range(64):
+            try:
+                conn.write(MESSAGE)
+            except (BlockingIOError, ConnectionRefusedError):
+                pass
+    # let the server catch up with what is queued.
+    time.sleep(0.1)
+    return (server.received - before) / (time.perf_counter() - start)
+
+def bench_datagram(network: str, duration: float, tmpdir: str) -> dict:
+    server = _DatagramServer(net.listen(_address(network, tmpdir), network))
+    address = str(server.conn.local_addr())
+    conn = _datagram_client(address, network, tmpdir)
+    try:
+        results = datagram_latency(conn, duration)
+        results['datagram_rate'] = round(datagram_rate(conn, server, duration))
+    finally:
+        conn.close()
+        server.close()
+    return results
+
+def run(networks, duration: float) -> dict:
+    """run benchmarks every network in networks for duration seconds per
+    scenario and returns the results, ready to be dumped as json."""
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'duration': duration,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        },
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for network in networks:
+            if network in STREAM_NETWORKS:
+                results['results'][network] = bench_stream(network, duration, tmpdir)
+            elif network in DATAGRAM_NETWORKS:
+                results['results'][network] = bench_datagram(network, duration, tmpdir)
+            else:
+                raise net.UnknownNetworkError(network)
+    return results
+
+def _lower_is_better(metric: str) -> bool:
+    return metric.endswith('_us') or metric == 'lost'
+
+def compare(old: dict, new: dict, threshold: float = 10.0) -> list:
+    """compare returns (network, metric, old, new, change, regressed) rows
+    for every metric in both result sets. change is the percent the metric
+    moved by, positive when it got better. a metric regressed when it got
+    worse by more than threshold percent."""
+    rows = []
+    for network, metrics in new['results'].items():
+        base = old['results'].get(network, {})
+        for metric, value in metrics.items():
+            if metric not in base or metric == 'lost':
+                continue
+            was = base[metric]
+            if not was or was == 'n/a' or value == 'n/a':
+                continue
+            change = (value - was) / was * 100
+            if _lower_is_better(metric):
+                change = -change
+            rows.append((network, metric, was, value, round(change, 1),
+                change < -threshold))
+    return rows
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, 'hn:d:o:ct:')
+    except getopt.GetoptError as e:
+        print(e)
+        usage()
+        return 2
+    networks, duration, out = NETWORKS, 1.0, None
+    comparing, threshold = False, 10.0
+    for opt, val in opts:
+        if opt == '-h':
+            usage()
+            return 0
+        elif opt == '-n':
+            networks = val.split(',')
+        elif opt == '-d':
+            duration = float(val)
+        elif opt == '-o':
+            out = val
+        elif opt == '-c':
+            comparing = True
+        elif opt == '-t':
+            threshold = float(val)
+
+    if comparing:
+        if len(args) != 2:
+            usage()
+            return 2
+        with open(args[0]) as f:
+            old = json.load(f)
+        with open(args[1]) as f:
+            new = json.load(f)
+        rows = compare(old, new, threshold)
+        for network, metric, was, value, change, regressed in rows:
+            mark = '  REGRESSION' if regressed else ''
+            print(f'{network:9} {metric:16} {was:>12} {value:>12} {change:+7.1f}%{mark}')
+        return 1 if any(row[-1] for row in rows) else 0
+
+    results = run(networks, duration)
+    dump = json.dumps(results, indent=2)
+    print(dump)
+    if out:
+        with open(out, 'w') as f:
+            f.write(dump + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,189 @@
+from collections import deque
+from concurrent.futures import Future
+from typing import Optional
+import threading, time
+
+from .errors    import *
+from .netconn   import *
+from .framing   import *
+from .framing   import _length_header
+from .histogram import *
+
+ID_SIZE = 4
+_ID_MASK = (1 << (ID_SIZE * 8)) - 1
+
+class PipelinedClient:
+    """PipelinedClient keeps many requests in flight on one stream conn,
+    matching the responses to requests by id.
+
+    every request and response is a length prefixed frame (see
+    LengthPrefixedConn) whose payload starts with a big endian request id of
+    ID_SIZE bytes. the server answers with the id of the request, in any
+    order, serve_pipelined does that for a plain request handler.
+
+    requests are queued and a writer thread sends everything queued since
+    its last write with one writev, so a burst of small requests goes out
+    in a single send. a reader thread resolves the future of every request
+    as its response comes in and records the round trip in latency.
+
+        client = net.PipelinedClient(net.dial('localhost:5055', 'tcp'))
+        futs = [client.submit(b'req %d' % i) for i in range(100)]
+        replies = [f.result() for f in futs]
+        client.latency.percentile(99)
+
+    Parameters
+    ----------
+    conn: TCPConn | UnixConn
+        the conn to send requests on, the client owns it from now on.
+
+    max_in_flight: int
+        the most requests waiting on responses, submit blocks past it.
+
+    max_size: int
+        the largest frame read or written.
+    """
+    def __init__(self, conn: Conn, max_in_flight: int = 1024,
+            max_size: int = READ_LIMIT):
+        self.conn = conn
+        self.max_size = max_size
+        self.latency = Histogram()
+        self.requests = 0
+        self.writes = 0
+        self.__framed = LengthPrefixedConn(conn, max_size=max_size)
+        self.__pending = {}
+        self.__queue = deque()
+        self.__cond = threading.Condition()
+        self.__slots = threading.BoundedSemaphore(max_in_flight)
+        self.__next_id = 0
+        self.__closed = False
+        self.__writer = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__reader = threading.Thread(target=self.__read_loop, daemon=True)
+        self.__writer.start()
+        self.__reader.start()
+
+    def submit(self, body: bytes) -> Future:
+        """submit queues a request and returns the future of its response
+        body. the future fails with the error that broke the connection if
+        it goes away before the response arrives."""
+        self.__slots.acquire()
+        fut = Future()
+        with self.__cond:
+            if self.__closed:
+                self.__slots.release()
+                raise SocketError('submit on a closed client')
+            rid = self.__next_id
+            self.__next_id = (rid + 1) & _ID_MASK
+            self.__pending[rid] = (fut, time.perf_counter())
+            self.__queue.append((rid, body))
+            self.requests += 1
+            if len(self.__queue) == 1:
+                self.__cond.notify()
+        return fut
+
+    def call(self, body: bytes, timeout: Optional[float] = None) -> bytes:
+        # call sends a request and waits for its response.
+        return self.submit(body).result(timeout)
+
+    def in_flight(self) -> int:
+        return len(self.__pending)
+
+    def __write_loop(self):
+        while True:
+            with self.__cond:
+                while not self.__queue and not self.__closed:
+                    self.__cond.wait()
+                if not self.__queue:
+                    return
+                batch = list(self.__queue)
+                self.__queue.clear()
+            bufs = []
+            for rid, body in batch:
+                bufs.append(_length_header(ID_SIZE + len(body), 4, self.max_size))
+                bufs.append(rid.to_bytes(ID_SIZE, 'big'))
+                bufs.append(body)
+            try:
+                self.conn.writev(bufs)
+            except OSError as e:
+                self.__fail(e)
+                return
+            self.writes += 1
+
+    def __read_loop(self):
+        while True:
+            try:
+                msg = self.__framed.read_message()
+            except (OSError, Error) as e:
+                self.__fail(e)
+                return
+            if msg is None:
+                self.__fail(SocketError('connection closed by the server'))
+                return
+            rid = int.from_bytes(msg[:ID_SIZE], 'big')
+            with self.__cond:
+                fut, start = self.__pending.pop(rid, (None, 0))
+            if fut is None:
+                # a response to nothing we asked, ignore it.
+                continue
+            self.latency.record(time.perf_counter() - start)
+            self.__slots.release()
+            fut.set_result(msg[ID_SIZE:])
+
+    def __fail(self, err: Exception):
+        # fail every pending request, nothing more can be sent or read.
+        with self.__cond:
+            self.__closed = True
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+            self.__queue.clear()
+            self.__cond.notify_all()
+        for fut, _ in pending:
+            self.__slots.release()
+            fut.set_exception(err)
+
+    def close(self):
+        # close the connection, requests still queued or waiting on a
+        # response fail.
+        self.__fail(SocketError('client closed'))
+        # shutting down first wakes the writer when it is blocked on a
+        # server that stopped reading, and the reader blocked on one that
+        # stopped answering.
+        try:
+            self.conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if threading.current_thread() is not self.__writer:
+            self.__writer.join()
+        if threading.current_thread() is not self.__reader:
+            self.__reader.join()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def serve_pipelined(conn: Conn, handler, max_size: int = READ_LIMIT):
+    """serve_pipelined answers the requests of a PipelinedClient on conn
+    until it is closed.
+
+    handler is called with every request body and returns the response body.
+    responses to requests that arrived together are written together, the
+    buffered ones are answered before anything is sent.
+
+        net.serve(lstn, lambda conn: net.serve_pipelined(conn, handler))
+    """
+    framed = LengthPrefixedConn(conn, max_size=max_size)
+    bufs = []
+    while True:
+        msg = framed.read_message()
+        if msg is None:
+            return
+        body = handler(msg[ID_SIZE:])
+        bufs.append(_length_header(ID_SIZE + len(body), 4, max_size))
+        bufs.append(msg[:ID_SIZE])
+        bufs.append(body)
+        if not conn._rbuf:
+            # nothing more buffered, flush before blocking on the socket.
+            conn.writev(bufs)
+            bufs = []
@@ -3,6 +3,16 @@ from .netaddr  import *
 from .tcpconn  import *
 from .udpconn  import *
 from .unixconn import *
+from .shard    import *
+from .shard    import _handle_conn, _stream_worker, _run_workers
+from .         import metrics as _metrics
+
+from concurrent.futures import ThreadPoolExecutor
+import errno, os, selectors, threading, time
+
+# how long a connection attempt gets before the next address is tried
+# alongside it, the recommended value from RFC 8305.
+CONNECT_ATTEMPT_DELAY = 0.25
 
 def _config_from_net(addr, net):
     # return the config from an already resolve address.
@@ -10,7 +20,8 @@ def _config_from_net(addr, net):
         return config_inetaddr(addr.addrinfo[0], addr.addrinfo[1], net)
     return config_inetaddr('', '', net)
 
-def dial_udp(laddr: Optional[UDPAddr], raddr: UDPAddr, network = 'tcp'):
+def dial_udp(laddr: Optional[UDPAddr], raddr: UDPAddr, network = 'tcp',
+        options = None):
     """dial_udp acts like a dial for tcp networks.
 
     see dial and resolve_addr for more info on address formats and network.
@@ -25,14 +36,20 @@ def dial_udp(laddr: Optional[UDPAddr], raddr: UDPAddr, network = 'tcp'):
 
     network: str
         tcp network type of the socket. it must be a tcp network name.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
     """
     if net_is_valid('udp', network):
         config = _config_from_net(laddr, network)
+        config.add_options(options)
         return UDPConn(laddr, raddr, ConnType.CONNECT, config.get_socket())
     else:
         raise UnknownNetworkError(network)
 
-def dial_tcp(laddr: Optional[TCPAddr], raddr: TCPAddr, network = 'tcp'):
+def dial_tcp(laddr: Optional[TCPAddr], raddr: TCPAddr, network = 'tcp',
+        options = None, fastopen: bool = False):
     """dial_tcp acts like a dial for tcp networks.
     
     see dial and resolve_addr for more info on address formats and network.
@@ -47,14 +64,28 @@ def dial_tcp(laddr: Optional[TCPAddr], raddr: TCPAddr, network = 'tcp'):
 
     network: str
         tcp network type of the socket. it must be a tcp network name.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
+
+    fastopen: bool
+        connect with TCP_FASTOPEN_CONNECT. the connect returns right away
+        and the first write goes out in the syn, saving a round trip with
+        servers listening with fastopen. connection errors then show up on
+        that first write or read.
     """
     if net_is_valid('tcp', network):
         config = _config_from_net(laddr, network)
+        config.add_options(options)
+        if fastopen and TCP_FASTOPEN_CONNECT is not None:
+            config.add_options((socket.IPPROTO_TCP, TCP_FASTOPEN_CONNECT, 1))
         return TCPConn(laddr, raddr, ConnType.CONNECT, config.get_socket())
     else:
         raise UnknownNetworkError(network)
 
-def dial_unix(laddr: Optional[UnixAddr], raddr: UnixAddr, network = 'unix'):
+def dial_unix(laddr: Optional[UnixAddr], raddr: UnixAddr, network = 'unix',
+        options = None):
     """dial_unix acts like a dial for  networks.
     
     see dial and resolve_addr for more info on address formats and network.
@@ -69,14 +100,133 @@ def dial_unix(laddr: Optional[UnixAddr], raddr: UnixAddr, network = 'unix'):
 
     network: str
         Unix network type of the socket. it must be a Unix network name.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
     """
     if net_is_valid('unix', network):
         config = _config_from_net(laddr, network)
+        config.add_options(options)
         return UnixConn(laddr, raddr, ConnType.CONNECT, config.get_socket())
     else:
         raise UnknownNetworkError(network)
 
-def dial(address: str, network: str):
+def _interleave_families(addr_list: list) -> list:
+    # order addresses ipv6 first, alternating between the families while
+    # both have addresses left (RFC 8305 section 4).
+    v6 = [a for a in addr_list if len(a.addrinfo) == 4]
+    v4 = [a for a in addr_list if len(a.addrinfo) != 4]
+    ordered = []
+    for i in range(max(len(v6), len(v4))):
+        ordered.extend(v6[i:i+1])
+        ordered.extend(v4[i:i+1])
+    return ordered
+
+def _connect_error(err: int) -> OSError:
+    # OSError picks the matching subclass, ConnectionRefusedError etc.
+    return OSError(err, os.strerror(err))
+
+def dial_parallel(addr_list: list, config: AddrConfig,
+        delay: float = CONNECT_ATTEMPT_DELAY) -> TCPConn:
+    """dial_parallel races connections to the tcp addresses in addr_list
+    and returns the first one to connect, Happy Eyeballs style (RFC 8305).
+
+    addresses are tried ipv6 first, alternating families. a new attempt is
+    started every delay seconds, or straight away when one fails, while the
+    earlier ones are still in flight. the first attempt to complete wins
+    and every other attempt is closed, so a slow or blackholed address
+    family costs delay seconds instead of a full connect timeout.
+
+    Parameters
+    ----------
+    addr_list: list
+        the TCPAddr candidates, as returned from resolver.
+
+    config: AddrConfig
+        the config the addresses were resolved with, used to create sockets.
+
+    delay: float
+        seconds to wait on an attempt before starting the next one.
+
+    Raises
+    ------
+    OSError
+        the error of the first attempt when every one of them failed.
+    """
+    addrs = _interleave_families(addr_list)
+    if not addrs:
+        raise SocketError('dialing with an empty address list')
+    hooks = _metrics._hooks
+    sel = selectors.DefaultSelector()
+    pending = {}
+    errors = []
+    next_attempt = 0.0
+    try:
+        while addrs or pending:
+            now = time.monotonic()
+            if addrs and (now >= next_attempt or not pending):
+                raddr = addrs.pop(0)
+                config.set_family(socket.AF_INET6 if len(raddr.addrinfo) == 4
+                        else socket.AF_INET)
+                sock = None
+                try:
+                    sock = config.get_socket()
+                    sock.setblocking(False)
+                    err = sock.connect_ex(raddr.addrinfo)
+                except OSError as e:
+                    # no socket for this family or a bad address, the other
+                    # candidates may still work.
+                    if sock is not None:
+                        sock.close()
+                    errors.append(e)
+                    if hooks is not None:
+                        hooks.on_connect(raddr, time.monotonic() - now, e)
+                    continue
+                if err == 0:
+                    if hooks is not None:
+                        hooks.on_connect(raddr, time.monotonic() - now, None)
+                    return _connected(sock, raddr)
+                if err not in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    sock.close()
+                    errors.append(_connect_error(err))
+                    if hooks is not None:
+                        hooks.on_connect(raddr, time.monotonic() - now, errors[-1])
+                    continue
+                sel.register(sock, selectors.EVENT_WRITE)
+                pending[sock] = (raddr, now)
+                next_attempt = now + delay
+                continue
+            timeout = max(next_attempt - now, 0) if addrs else None
+            for key, _ in sel.select(timeout):
+                sock = key.fileobj
+                sel.unregister(sock)
+                raddr, started = pending.pop(sock)
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err == 0:
+                    if hooks is not None:
+                        hooks.on_connect(raddr, time.monotonic() - started, None)
+                    return _connected(sock, raddr)
+                sock.close()
+                errors.append(_connect_error(err))
+                if hooks is not None:
+                    hooks.on_connect(raddr, time.monotonic() - started, errors[-1])
+                # an attempt failed, don't hold the next one back.
+                next_attempt = 0.0
+        raise errors[0]
+    finally:
+        # close the losers.
+        for sock in pending:
+            sock.close()
+        sel.close()
+
+def _connected(sock: socket.socket, raddr: TCPAddr) -> TCPConn:
+    sock.setblocking(True)
+    conn = TCPConn(None, raddr, ConnType.REMOTE, sock)
+    conn.raddr = raddr
+    return conn
+
+def dial(address: str, network: str, options = None):
     """dial connects to network on the address endpoint
 
     For TCP and UDP networks the address is of the form "host:port". The
@@ -111,6 +261,10 @@ def dial(address: str, network: str):
 
     For unix sockets the address must be file system path
 
+    when a tcp host resolves to more than one address they are raced with
+    dial_parallel, the first connection to complete is returned. "tcp"
+    resolves both ipv4 and ipv6 addresses, "tcp4" and "tcp6" stick to one.
+
     Parameters
     ----------
     address: str, optional
@@ -121,6 +275,10 @@ def dial(address: str, network: str):
         this package are "tcp", "tcp4" (IPv4 only), "tcp6" (IPv6 only),
         "udp", "upd4" (IPv4 only), "udp6" (IPv6 only)
 
+    options: str | list, optional
+        socket options set on the socket before it connects, a profile name
+        like 'low_latency' or a list, see AddrConfig.add_options.
+
     Returns:
     --------
     TCPConn | UDPConn | UnixConn |
@@ -133,28 +291,54 @@ def dial(address: str, network: str):
     --------
     returns the conn type that corresponds to the network specified.
     """
-    host, port = split_host_port(address)
+    hooks = _metrics._hooks
+    if hooks is None:
+        return _dial(address, network, options)
+    hooks.on_dial_start(network, address)
+    start = time.perf_counter()
+    err = None
+    try:
+        return _dial(address, network, options)
+    except BaseException as e:
+        err = e
+        raise
+    finally:
+        hooks.on_dial(network, address, time.perf_counter() - start, err)
+
+def _dial(address: str, network: str, options):
     if net_is_valid('tcp', network) or net_is_valid('udp', network):
-        addr_list, config = resolver(host, port, network)
-        conn_obj = None
+        host, port = split_host_port(address)
+        config = config_inetaddr(host, port, network)
+        config.add_options(options)
+        if network == 'tcp':
+            # plain tcp can go either way, race both families.
+            config.set_family(socket.AF_UNSPEC)
+        addr_list = inet_addr_list(config.get_config(), network)
         if net_is_valid('tcp', network):
-            conn_obj = TCPConn
-        elif net_is_valid('udp', network):
-            conn_obj = UDPConn
-        else:
-            raise UnknownNetworkError(network)
-        # TODO(Joe):
-        # this loop will terminate on first try if the connection raises an
-        # exception. This is unacceptable and must be handled. Do so soon!
+            return dial_parallel(addr_list, config)
+        # udp connects never wait on the network, just take the first
+        # address that works.
+        hooks = _metrics._hooks
+        err = None
         for raddr in addr_list:
-            conn = conn_obj(None, raddr, ConnType.CONNECT, config.get_socket())
+            start = time.monotonic()
+            try:
+                conn = UDPConn(None, raddr, ConnType.CONNECT, config.get_socket())
+            except OSError as e:
+                err = e
+                if hooks is not None:
+                    hooks.on_connect(raddr, time.monotonic() - start, e)
+                continue
+            if hooks is not None:
+                hooks.on_connect(raddr, time.monotonic() - start, None)
             return conn
+        raise err or SocketError(f'no addresses for {address}')
     elif net_is_valid('unix', network):
-        return dial_unix(UnixAddr(address), network)
+        return dial_unix(None, UnixAddr(address), network, options)
     else:
         raise UnknownNetworkError(network)
 
-def listen_udp(laddr: UDPAddr, network = 'udp'):
+def listen_udp(laddr: UDPAddr, network = 'udp', options = None):
     """listen_udp returns a udp socket that's ready to listen for connections
     on the specified local address.
 
@@ -169,15 +353,22 @@ def listen_udp(laddr: UDPAddr, network = 'udp'):
 
     network: str
         the tcp network socket type to listen on.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
     """
     assert isinstance(laddr, UDPAddr), 'laddr not a UDPAddr object'
     if net_is_valid('udp', network):
         config = _config_from_net(laddr, network)
+        config.add_options(options)
         return UDPConn(laddr, None, ConnType.LISTEN, config.get_socket())
     else:
         raise UnknownNetworkError(network)
 
-def listen_tcp(laddr: TCPAddr, network = 'tcp'):
+def listen_tcp(laddr: TCPAddr, network = 'tcp', options = None,
+        backlog: int = socket.SOMAXCONN, defer_accept: int = 0,
+        fastopen: int = 0):
     """listen_tcp returns a tcp listener that is ready to listen on
     the local addr specified.
 
@@ -188,15 +379,22 @@ def listen_tcp(laddr: TCPAddr, network = 'tcp'):
 
     network:
         the tcp network socket type to listen on.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
     """
     assert isinstance(laddr, TCPAddr), 'laddr not a TCPAddr object'
     if net_is_valid('tcp', network):
         config = _config_from_net(laddr, network)
-        return TCPListener(laddr, config.get_socket())
+        config.add_options(options)
+        return TCPListener(laddr, config.get_socket(), backlog, defer_accept,
+                fastopen)
     else:
         raise UnknownNetworkError(network)
 
-def listen_unix(laddr: UnixAddr, network = 'unix'):
+def listen_unix(laddr: UnixAddr, network = 'unix', options = None,
+        backlog: int = socket.SOMAXCONN):
     """listen_unix opens a unix domain socket listener.
 
     we all know unix is special, so it does not have a listener function
@@ -210,39 +408,200 @@ def listen_unix(laddr: UnixAddr, network = 'unix'):
 
     network: str
         the unix network socket type to listen on.
+
+    options: str | list, optional
+        socket options set before the socket is bound or connected, a
+        profile name or a list, see AddrConfig.add_options.
     """
     assert isinstance(laddr, UnixAddr), 'laddr not a UnixAddr object'
     if net_is_valid('unix', network):
         config = _config_from_net(laddr, network)
+        config.add_options(options)
         if network == 'unix':
-            return UnixListener(laddr, config.get_socket())
+            return UnixListener(laddr, config.get_socket(), backlog)
         elif network == 'unixgram':
             return UnixConn(laddr, None, ConnType.LISTEN, sock=config.get_socket())
     else:
         raise UnknowNetworkError(network)
 
-def listen(address: str, network: str):
+def _listen_inet(addr, config: AddrConfig, network: str, reuse_port: bool,
+        backlog: int, defer_accept: int, fastopen: int):
+    # open a tcp listener or udp conn on addr.
+    sock = config.get_socket()
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if 'tcp' in network:
+        return TCPListener(addr, sock, backlog, defer_accept, fastopen)
+    elif 'udp' in network:
+        return UDPConn(addr, None, ConnType.LISTEN, sock)
+    else:
+        raise UnknownNetworkError(network)
+
+def listen(address: str, network: str, reuse_port: bool = False,
+        shards: int = 1, options = None, backlog: int = socket.SOMAXCONN,
+        defer_accept: int = 0, fastopen: int = 0):
     """listen announces and waits for connections on a local network address.
 
     the networks supported are "tcp", "tcp4", "tcp6", "udp", "udp4" or "udp6",
     "unix", "unixgram"
-    
+
+    with reuse_port the tcp or udp socket is opened with SO_REUSEPORT so other
+    sockets can bind the same address. shards greater than one opens that many
+    SO_REUSEPORT sockets on the address and returns them as a ShardedListener,
+    the kernel load balances connections and datagrams across them.
+
+    options are socket options set before the socket is bound, a profile
+    name like 'low_latency' or a list, see AddrConfig.add_options. linux
+    passes most of them on to the connections a tcp listener accepts.
+
+    backlog is the accept queue length of stream listeners. defer_accept
+    and fastopen tune tcp listeners, see TCPListener. they are ignored for
+    the datagram networks.
+
+    examples:
+    --------
+        listen(':5055', 'tcp') -> TCPListener
+        listen(':5055', 'udp') -> UDPConn
+        listen(':5055', 'tcp', reuse_port=True, shards=4) -> ShardedListener
+
+    Raises
+    ------
+    UnknownNetworkError, ValueError
     """
+    if shards < 1:
+        raise ValueError(f'shards must be at least 1, got {shards}')
+    if shards > 1 and not reuse_port:
+        raise ValueError('listening on more than one shard needs reuse_port')
     if net_is_valid('tcp', network) or net_is_valid('udp', network):
         host, port = split_host_port(address)
         addr_list, config = resolver(host, port, network)
+        config.add_options(options)
+        if shards > 1:
+            first = _listen_inet(addr_list[0], config, network, reuse_port,
+                    backlog, defer_accept, fastopen)
+            listeners = [first]
+            try:
+                # bind the rest of the shards to the address the first one got,
+                # it carries the real port when port 0 was asked for.
+                laddr = type(addr_list[0])(first.sock.getsockname())
+                for _ in range(shards - 1):
+                    listeners.append(_listen_inet(laddr, config, network,
+                        reuse_port, backlog, defer_accept, fastopen))
+            except OSError:
+                for lstn in listeners:
+                    lstn.close()
+                raise
+            return ShardedListener(listeners)
         # TODO(Joe):
         # do not fail until you've tried to connect to all the adresses
         # resolved. the way this is implemented right now, if the first
         # attempt throws an error the whole thing halts. So fix it!
         for addr in addr_list:
-            if 'tcp' in network:
-                return TCPListener(addr, config.get_socket())
-            elif 'udp' in network:
-                return UDPConn(addr, None, ConnType.LISTEN, config.get_socket())
-            else:
-                raise UnknownNetworkError(network)
+            return _listen_inet(addr, config, network, reuse_port, backlog,
+                    defer_accept, fastopen)
     elif net_is_valid('unix', network):
-        return listen_unix(UnixAddr(address), network)
+        if reuse_port:
+            raise ValueError('reuse_port is only supported for tcp and udp')
+        return listen_unix(UnixAddr(address), network, options, backlog)
     else:
         raise UnknownNetworkError(network)
+
+def _listener_closed(listener, err: Optional[OSError] = None) -> bool:
+    # a listener shut down by close makes accept fail with EINVAL before
+    # the fd itself is closed.
+    if err is not None and err.errno == errno.EINVAL:
+        return True
+    return listener.sock.fileno() < 0
+
+def _serve_threads(listener, handler, workers, max_pending):
+    # accept on this thread and hand every conn to the pool. the semaphore
+    # blocks the accept loop while the pool is saturated, so connections
+    # wait in the kernel's accept queue instead of piling up in memory.
+    slots = threading.BoundedSemaphore(workers + max_pending)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            slots.acquire()
+            try:
+                conn = listener.accept()
+            except ConnectionError:
+                slots.release()
+                continue
+            except OSError as e:
+                slots.release()
+                if _listener_closed(listener, e):
+                    return
+                raise
+            fut = pool.submit(_handle_conn, handler, conn)
+            fut.add_done_callback(lambda _: slots.release())
+
+def _serve_processes(listener, handler, workers):
+    # every worker blocks in accept on the same inherited socket and the
+    # kernel hands each new connection to one of them. closing the listener
+    # in this process is the signal to stop.
+    targets = [(_stream_worker, (listener, handler))] * workers
+    _run_workers(targets, lambda: _listener_closed(listener))
+
+def serve(listener, handler, workers: Optional[int] = None,
+        mode: str = 'thread', max_pending: Optional[int] = None):
+    """serve accepts connections on listener and dispatches each one to a
+    pool of workers that call handler on it.
+
+    handler is called with the TCPConn or UnixConn returned by accept, the
+    conn is closed once handler returns. serve returns when the listener is
+    closed.
+
+    a ShardedListener is always served with one process per shard, workers
+    and mode are ignored for it.
+
+    examples:
+    --------
+        def handler(conn):
+            conn.write(conn.read(1024))
+
+        serve(listen(':5055', 'tcp'), handler, workers=8)
+        serve(listen(':5055', 'tcp'), handler, workers=4, mode='process')
+
+    Parameters
+    ----------
+    listener: TCPListener | UnixListener | ShardedListener
+        the listener to accept connections from.
+
+    handler: Callable[[Conn], None]
+        function called for every accepted connection.
+
+    workers: int, optional
+        number of worker threads or processes, defaults to the number of cpus.
+
+    mode: str
+        "thread" runs handlers on a bounded thread pool. the accept loop
+        stops accepting while every worker is busy and max_pending conns
+        are queued up.
+        "process" pre-forks workers processes that all accept on the
+        listener, for handlers that need more than one cpu. the processes are
+        forked so this mode is only available where fork is.
+
+    max_pending: int, optional
+        number of accepted connections allowed to wait for a free worker in
+        thread mode, defaults to workers.
+
+    Raises
+    ------
+    ValueError
+    """
+    if isinstance(listener, ShardedListener):
+        listener.serve(handler)
+        return
+    assert isinstance(listener, (TCPListener, UnixListener)), \
+            'listener not a TCPListener or UnixListener'
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f'workers must be at least 1, got {workers}')
+    if mode == 'thread':
+        if max_pending is None:
+            max_pending = workers
+        _serve_threads(listener, handler, workers, max_pending)
+    elif mode == 'process':
+        _serve_processes(listener, handler, workers)
+    else:
+        raise ValueError(f'unknown serve mode {mode}')
@@ -13,3 +13,31 @@ class AddressError(Error):
 class UnknownNetworkError(Error):
     def __init__(self, network: str):
         super().__init__(f'unkown network {network}')
+
+class UnexpectedEOFError(Error):
+    def __init__(self, partial: bytes):
+        # partial holds the bytes read before the connection hit eof.
+        self.partial = partial
+        super().__init__(f'unexpected eof after reading {len(partial)} bytes')
+
+class LimitExceededError(Error):
+    def __init__(self, limit: int):
+        super().__init__(f'read buffer limit of {limit} bytes exceeded')
+
+class PoolTimeoutError(Error):
+    def __init__(self, timeout: float):
+        super().__init__(f'no pooled connection free after {timeout} seconds')
+
+class DeadlineExceededError(Error, TimeoutError):
+    # raised when a read or write is still waiting on the socket when the
+    # deadline set on the conn passes. it is a TimeoutError, like the
+    # socket.timeout settimeout raises.
+    def __init__(self, op: str):
+        super().__init__(f'{op} deadline exceeded')
+
+class WouldBlockError(Error, BlockingIOError):
+    # raised by a non blocking conn when the operation can't go ahead
+    # without waiting. it is a BlockingIOError so code catching that keeps
+    # working.
+    def __init__(self, op: str):
+        super().__init__(f'{op} would block')
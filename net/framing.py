@@ -0,0 +1,264 @@
+from typing import Optional
+
+from .errors  import *
+from .netconn import *
+
+def _length_header(n: int, header_size: int, max_size: int) -> bytes:
+    if n > max_size:
+        raise LimitExceededError(max_size)
+    return n.to_bytes(header_size, 'big')
+
+class LengthPrefixDecoder:
+    """LengthPrefixDecoder splits a byte stream into messages that are each
+    prefixed with their length as a big endian integer of header_size bytes.
+
+    feed it bytes as they arrive, in chunks of any size, and it returns the
+    messages completed so far. partial messages are kept until the rest of
+    them is fed.
+
+        dec = LengthPrefixDecoder()
+        dec.feed(b'\\x00\\x00\\x00\\x02hi\\x00\\x00') -> [b'hi']
+
+    Parameters
+    ----------
+    header_size: int
+        bytes in the length header.
+
+    max_size: int
+        the largest message accepted, LimitExceededError is raised on a
+        header announcing a bigger one.
+    """
+    def __init__(self, header_size: int = 4, max_size: int = READ_LIMIT):
+        self.header_size = header_size
+        self.max_size = max_size
+        self.__buf = bytearray()
+
+    def __len__(self) -> int:
+        # number of bytes held waiting for the rest of a message.
+        return len(self.__buf)
+
+    def feed(self, data: bytes) -> list:
+        buf = self.__buf
+        buf += data
+        msgs = []
+        pos = 0
+        hs = self.header_size
+        with memoryview(buf) as view:
+            while len(buf) - pos >= hs:
+                n = int.from_bytes(view[pos:pos + hs], 'big')
+                if n > self.max_size:
+                    raise LimitExceededError(self.max_size)
+                if len(buf) - pos - hs < n:
+                    break
+                pos += hs
+                msgs.append(bytes(view[pos:pos + n]))
+                pos += n
+        del buf[:pos]
+        return msgs
+
+    def encode(self, msg: bytes) -> bytes:
+        # encode returns msg with its length header in front.
+        return _length_header(len(msg), self.header_size, self.max_size) + msg
+
+class DelimiterDecoder:
+    """DelimiterDecoder splits a byte stream into messages that end with
+    delimiter, the delimiter is stripped from the returned messages.
+
+    like LengthPrefixDecoder it is fed bytes as they arrive and keeps the
+    partial message until it is completed. bytes are only scanned once for
+    the delimiter however small the chunks fed are.
+
+    Parameters
+    ----------
+    delimiter: bytes
+        the bytes ending every message.
+
+    max_size: int
+        the longest message accepted, LimitExceededError is raised when no
+        delimiter shows up within it.
+    """
+    def __init__(self, delimiter: bytes = b'\n', max_size: int = READ_LIMIT):
+        assert delimiter, 'empty delimiter'
+        self.delimiter = delimiter
+        self.max_size = max_size
+        self.__buf = bytearray()
+        self.__scanned = 0
+
+    def __len__(self) -> int:
+        return len(self.__buf)
+
+    def feed(self, data: bytes) -> list:
+        buf = self.__buf
+        buf += data
+        msgs = []
+        pos = 0
+        dl = len(self.delimiter)
+        offset = self.__scanned
+        while True:
+            i = buf.find(self.delimiter, max(pos, offset))
+            if i < 0:
+                break
+            if i - pos > self.max_size:
+                raise LimitExceededError(self.max_size)
+            msgs.append(bytes(buf[pos:i]))
+            pos = offset = i + dl
+        del buf[:pos]
+        if len(buf) > self.max_size + dl:
+            raise LimitExceededError(self.max_size)
+        # the tail could hold the start of a delimiter, rescan just that.
+        self.__scanned = max(0, len(buf) - dl + 1)
+        return msgs
+
+    def encode(self, msg: bytes) -> bytes:
+        return msg + self.delimiter
+
+class _FramedConn:
+    # the bits shared by the framed conn wrappers, they delegate the
+    # reading and writing of messages to read_message and write_messages.
+    def __init__(self, conn: Conn):
+        self.conn = conn
+
+    def write_message(self, msg: bytes) -> int:
+        # write a single message, returns the bytes written including framing.
+        return self.write_messages((msg,))
+
+    def __iter__(self):
+        # iterate over the messages read until the remote end closes the
+        # connection.
+        while True:
+            msg = self.read_message()
+            if msg is None:
+                return
+            yield msg
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class LengthPrefixedConn(_FramedConn):
+    """LengthPrefixedConn reads and writes length prefixed messages on a
+    TCPConn or UnixConn.
+
+    every message goes on the wire after a big endian length header of
+    header_size bytes. messages are decoded from the conn's receive buffer
+    (see Conn.readexactly), so a single recv picks up as many pipelined
+    messages as fit in it and one connection carries any number of them.
+
+        fc = net.LengthPrefixedConn(net.dial('localhost:5055', 'tcp'))
+        fc.write_messages([b'one', b'two'])
+        for msg in fc:
+            ...
+
+    Parameters
+    ----------
+    conn: TCPConn | UnixConn
+        the stream conn to frame messages on.
+
+    header_size: int
+        bytes in the length header.
+
+    max_size: int
+        the largest message read or written.
+    """
+    def __init__(self, conn: Conn, header_size: int = 4,
+            max_size: int = READ_LIMIT):
+        super().__init__(conn)
+        self.header_size = header_size
+        self.max_size = max_size
+
+    def read_message(self) -> Optional[bytes]:
+        """read_message returns the next message, None when the connection
+        was closed cleanly between messages.
+
+        Raises
+        ------
+        UnexpectedEOFError
+            the connection was closed halfway through a message.
+
+        LimitExceededError
+            the message is bigger than max_size.
+        """
+        try:
+            header = self.conn.readexactly(self.header_size)
+        except UnexpectedEOFError as e:
+            if not e.partial:
+                return None
+            raise
+        n = int.from_bytes(header, 'big')
+        if n > self.max_size:
+            raise LimitExceededError(self.max_size)
+        return self.conn.readexactly(n)
+
+    def write_messages(self, msgs) -> int:
+        # write all of msgs with one vectored write, returns the bytes
+        # written including the headers.
+        bufs = []
+        for msg in msgs:
+            bufs.append(_length_header(len(msg), self.header_size, self.max_size))
+            bufs.append(msg)
+        return self.conn.writev(bufs)
+
+class DelimitedConn(_FramedConn):
+    """DelimitedConn reads and writes messages ending with delimiter on a
+    TCPConn or UnixConn.
+
+    it works like LengthPrefixedConn but for line style protocols, messages
+    are read with Conn.readuntil and returned without the delimiter.
+
+    Parameters
+    ----------
+    conn: TCPConn | UnixConn
+        the stream conn to frame messages on.
+
+    delimiter: bytes
+        the bytes ending every message, it must not show up in a message.
+
+    max_size: int
+        the longest message read.
+    """
+    def __init__(self, conn: Conn, delimiter: bytes = b'\n',
+            max_size: int = READ_LIMIT):
+        assert delimiter, 'empty delimiter'
+        super().__init__(conn)
+        self.delimiter = delimiter
+        self.max_size = max_size
+
+    def read_message(self) -> Optional[bytes]:
+        """read_message returns the next message without the delimiter,
+        None when the connection was closed cleanly between messages.
+
+        Raises
+        ------
+        UnexpectedEOFError
+            the connection was closed halfway through a message.
+
+        LimitExceededError
+            no delimiter within max_size bytes.
+        """
+        try:
+            msg = self.conn.readuntil(self.delimiter,
+                    self.max_size + len(self.delimiter))
+        except UnexpectedEOFError as e:
+            if not e.partial:
+                return None
+            raise
+        except LimitExceededError:
+            # report the limit the way DelimiterDecoder does.
+            raise LimitExceededError(self.max_size) from None
+        return msg[:-len(self.delimiter)]
+
+    def write_messages(self, msgs) -> int:
+        # write all of msgs with one vectored write, returns the bytes
+        # written including the delimiters.
+        bufs = []
+        for msg in msgs:
+            if self.delimiter in msg:
+                raise ValueError('message contains the delimiter')
+            bufs.append(msg)
+            bufs.append(self.delimiter)
+        return self.conn.writev(bufs)
@@ -0,0 +1,92 @@
+from typing import Optional
+
+class Histogram:
+    """Histogram records latencies in log scale buckets, so a handful of
+    counters cover anything from a microsecond to minutes.
+
+    values are recorded in microseconds. every power of two range is split
+    into 2**precision linear buckets, percentiles are off by at most one
+    part in 2**precision (about 3% with the default of 5) while recording
+    stays a couple of integer operations and a dict update.
+
+        h = Histogram()
+        h.record(time.perf_counter() - start)
+        h.percentile(99) -> seconds
+
+    Parameters
+    ----------
+    precision: int
+        bits of the value kept, the relative error is 2**-precision.
+    """
+    def __init__(self, precision: int = 5):
+        self.precision = precision
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, us: int) -> int:
+        # the bucket is the value with everything past the top precision
+        # bits cleared.
+        shift = us.bit_length() - self.precision
+        if shift <= 0:
+            return us
+        return (us >> shift) << shift
+
+    def record(self, seconds: float):
+        # record a latency in seconds.
+        b = self._bucket(int(seconds * 1e6))
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'Histogram'):
+        # add the values recorded in other to this histogram.
+        assert self.precision == other.precision, 'merging histograms of different precision'
+        for b, n in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + n
+        self.count += other.count
+        self.total += other.total
+        for v in (other.min, other.max):
+            if v is not None:
+                self.min = v if self.min is None else min(self.min, v)
+                self.max = v if self.max is None else max(self.max, v)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """percentile returns the latency in seconds that p percent of the
+        recorded values are at or below, None when nothing was recorded."""
+        if not self.count:
+            return None
+        want = max(1, -(-self.count * p // 100))
+        if want >= self.count:
+            return self.max
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= want:
+                # the bucket's lower bound, never past the largest value.
+                return min(b / 1e6, self.max)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def summary(self) -> dict:
+        # count, mean, min, max and the usual percentiles in seconds.
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max,
+        }
+
+    def clear(self):
+        self.__init__(self.precision)
@@ -0,0 +1,274 @@
+from typing import Optional
+import socket, struct, threading, time, weakref
+
+from .histogram import *
+
+class MetricsHooks:
+    """MetricsHooks is the interface conns, listeners, dial and resolver
+    report what they do to. every method does nothing, override the ones
+    you care about and install an instance with set_metrics to export the
+    numbers to a metrics system. Counters is an implementation that keeps
+    running totals.
+
+    the hooks are called on the thread doing the work, right after the
+    syscall, so keep them cheap. with no hooks installed each call site
+    costs a single attribute check. use HookChain to install more than one
+    set of hooks, like Counters and a Tracer.
+    """
+    def on_read(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        # conn received nbytes with one call of syscall, msgs is the number
+        # of datagrams or reads it covers. seconds is how long the call
+        # took, waiting for the peer included.
+        pass
+
+    def on_write(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        # conn sent nbytes with one call of syscall.
+        pass
+
+    def on_accept(self, listener, conn, seconds: float = 0.0):
+        # listener accepted conn, seconds is how long accept blocked for.
+        pass
+
+    def on_close(self, conn):
+        # conn is being closed.
+        pass
+
+    def on_dial_start(self, network: str, address: str):
+        # dial was called, on_resolve, on_connect and on_dial follow.
+        pass
+
+    def on_connect(self, raddr, seconds: float, err: Optional[BaseException]):
+        # a connection attempt to raddr finished after seconds. dial makes
+        # one attempt per address it tries.
+        pass
+
+    def on_dial(self, network: str, address: str, seconds: float,
+            err: Optional[BaseException]):
+        # dial took seconds, resolution included. err is what it raised.
+        pass
+
+    def on_resolve(self, host: str, network: str, seconds: float,
+            err: Optional[BaseException]):
+        # resolving host took seconds, cache hits included. every address
+        # lookup reports here, the ones dial and listen do too.
+        pass
+
+class HookChain(MetricsHooks):
+    """HookChain passes every hook call on to each of hooks in turn.
+
+        net.set_metrics(net.HookChain(net.Counters(), net.Tracer(0.01)))
+    """
+    def __init__(self, *hooks: MetricsHooks):
+        self.hooks = hooks
+
+    def on_read(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_read(*args, **kwargs)
+
+    def on_write(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_write(*args, **kwargs)
+
+    def on_accept(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_accept(*args, **kwargs)
+
+    def on_close(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_close(*args, **kwargs)
+
+    def on_dial_start(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_dial_start(*args, **kwargs)
+
+    def on_connect(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_connect(*args, **kwargs)
+
+    def on_dial(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_dial(*args, **kwargs)
+
+    def on_resolve(self, *args, **kwargs):
+        for h in self.hooks:
+            h.on_resolve(*args, **kwargs)
+
+_hooks: Optional[MetricsHooks] = None
+
+def get_metrics() -> Optional[MetricsHooks]:
+    # the installed hooks, None when metrics are off.
+    return _hooks
+
+def set_metrics(hooks: Optional[MetricsHooks]):
+    """set_metrics installs hooks for the whole process, None turns metrics
+    off, which is the default."""
+    global _hooks
+    _hooks = hooks
+
+# struct tcp_info starts with 8 single byte fields, then the u32 fields
+# rto, ato, snd_mss, rcv_mss, unacked and sacked. on a listening socket
+# linux reports the accept queue length in unacked and the backlog in
+# sacked.
+_TCP_INFO_QUEUE = struct.Struct('8x16xII')
+
+def accept_queue_depth(listener) -> Optional[tuple[int, int]]:
+    """accept_queue_depth returns the (queued, backlog) connections of a
+    listening tcp socket, None where TCP_INFO doesn't report them."""
+    if not hasattr(socket, 'TCP_INFO'):
+        return None
+    try:
+        info = listener.sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO,
+                _TCP_INFO_QUEUE.size)
+    except OSError:
+        return None
+    if len(info) < _TCP_INFO_QUEUE.size:
+        return None
+    return _TCP_INFO_QUEUE.unpack(info)
+
+class Counters(MetricsHooks):
+    """Counters keeps running totals of everything reported to the hooks.
+
+        counters = net.Counters()
+        net.set_metrics(counters)
+        ...
+        counters.snapshot()
+
+    snapshot returns bytes and messages read and written, syscall counts by
+    name, accepts and the accept rate since the last reset, and dial,
+    connect and resolve latency percentiles.
+
+    Parameters
+    ----------
+    per_conn: bool
+        keep read and write totals for every live conn as well, see conn_stats.
+
+    sample_accept_queue: bool
+        sample the accept queue depth of tcp listeners on every accept, it
+        costs a getsockopt per accept.
+    """
+    def __init__(self, per_conn: bool = False, sample_accept_queue: bool = False):
+        self.per_conn = per_conn
+        self.sample_accept_queue = sample_accept_queue
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.__lock:
+            self.bytes_read = 0
+            self.bytes_written = 0
+            self.messages_read = 0
+            self.messages_written = 0
+            self.syscalls = {}
+            self.accepts = 0
+            self.accept_queue = None
+            self.accept_queue_max = 0
+            self.dials = 0
+            self.dial_errors = 0
+            self.dial_latency = Histogram()
+            self.connects = 0
+            self.connect_errors = 0
+            self.connect_latency = Histogram()
+            self.resolves = 0
+            self.resolve_errors = 0
+            self.resolve_latency = Histogram()
+            self.conns = weakref.WeakKeyDictionary()
+            self.since = time.monotonic()
+
+    def on_read(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        with self.__lock:
+            self.bytes_read += nbytes
+            self.messages_read += msgs
+            self.syscalls[syscall] = self.syscalls.get(syscall, 0) + 1
+            if self.per_conn:
+                stats = self.__conn_stats(conn)
+                stats[0] += nbytes
+                stats[1] += msgs
+
+    def on_write(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        with self.__lock:
+            self.bytes_written += nbytes
+            self.messages_written += msgs
+            self.syscalls[syscall] = self.syscalls.get(syscall, 0) + 1
+            if self.per_conn:
+                stats = self.__conn_stats(conn)
+                stats[2] += nbytes
+                stats[3] += msgs
+
+    def __conn_stats(self, conn) -> list:
+        stats = self.conns.get(conn)
+        if stats is None:
+            stats = self.conns[conn] = [0, 0, 0, 0]
+        return stats
+
+    def conn_stats(self, conn) -> Optional[dict]:
+        # read and write totals of conn, None if it did neither or
+        # per_conn is off.
+        with self.__lock:
+            stats = self.conns.get(conn)
+        if stats is None:
+            return None
+        return dict(zip(('bytes_read', 'messages_read', 'bytes_written',
+            'messages_written'), stats))
+
+    def on_accept(self, listener, conn, seconds: float = 0.0):
+        depth = None
+        if self.sample_accept_queue:
+            depth = accept_queue_depth(listener)
+        with self.__lock:
+            self.accepts += 1
+            self.syscalls['accept'] = self.syscalls.get('accept', 0) + 1
+            if depth is not None:
+                self.accept_queue = depth
+                self.accept_queue_max = max(self.accept_queue_max, depth[0])
+
+    def on_dial(self, network: str, address: str, seconds: float,
+            err: Optional[BaseException]):
+        with self.__lock:
+            self.dials += 1
+            if err is not None:
+                self.dial_errors += 1
+            self.dial_latency.record(seconds)
+
+    def on_connect(self, raddr, seconds: float, err: Optional[BaseException]):
+        with self.__lock:
+            self.connects += 1
+            if err is not None:
+                self.connect_errors += 1
+            self.connect_latency.record(seconds)
+
+    def on_resolve(self, host: str, network: str, seconds: float,
+            err: Optional[BaseException]):
+        with self.__lock:
+            self.resolves += 1
+            if err is not None:
+                self.resolve_errors += 1
+            self.resolve_latency.record(seconds)
+
+    def snapshot(self) -> dict:
+        # the totals as a dict, ready to be exported.
+        with self.__lock:
+            elapsed = time.monotonic() - self.since
+            return {
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+                'messages_read': self.messages_read,
+                'messages_written': self.messages_written,
+                'syscalls': dict(self.syscalls),
+                'accepts': self.accepts,
+                'accept_rate': self.accepts / elapsed if elapsed else 0.0,
+                'accept_queue': self.accept_queue,
+                'accept_queue_max': self.accept_queue_max,
+                'dials': self.dials,
+                'dial_errors': self.dial_errors,
+                'dial_latency': self.dial_latency.summary(),
+                'connects': self.connects,
+                'connect_errors': self.connect_errors,
+                'connect_latency': self.connect_latency.summary(),
+                'resolves': self.resolves,
+                'resolve_errors': self.resolve_errors,
+                'resolve_latency': self.resolve_latency.summary(),
+            }
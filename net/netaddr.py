@@ -1,9 +1,14 @@
 from typing import Union, Optional
 import ipaddress as ipaddr
+import asyncio
+import functools
 import socket
+import time
 
 from  .netconn import Addr
 from  .errors import *
+from  . import resolv
+from  . import metrics as _metrics
 
 class IPAddr(Addr):
     """IPAddr is a wrapper around a ip socket addresses.
@@ -15,22 +20,31 @@ class IPAddr(Addr):
     Union[ipaddress.IPv4Address, ipaddress.IPv6Address] so you can get those
     methods i obviously can not implement there.
 
+    the ip address is only parsed into self.ipaddr the first time it is
+    used, most addresses coming off a socket are only ever passed back to it.
+
     Parameters
     -----------
     addrinfo: tuple
         the (ip address, port) tuple associated with a socket or from getaddrinfo. 
     """
+    __slots__ = ('_ipaddr',)
+
     def __init__(self, addrinfo: tuple):
         Addr.__init__(self, addrinfo)
-        if addrinfo[0]:
-            ip = ''
-            if self.scope_id():
-                ip = f'{self.addrinfo[0]}%{self.scope_id()}'
-            else:
+        self._ipaddr = None
+
+    @property
+    def ipaddr(self) -> Union[ipaddr.IPv4Address, ipaddr.IPv6Address, tuple]:
+        if self._ipaddr is None:
+            if self.addrinfo[0]:
                 ip = self.addrinfo[0]
-            self.ipaddr = ipaddr.ip_address(ip)
-        else:
-            self.ipaddr = self.addrinfo
+                if self.scope_id():
+                    ip = f'{ip}%{self.scope_id()}'
+                self._ipaddr = ipaddr.ip_address(ip)
+            else:
+                self._ipaddr = self.addrinfo
+        return self._ipaddr
 
     def is_ipv6(self):
         if len(self.addrinfo) == 4:
@@ -38,13 +52,14 @@ class IPAddr(Addr):
         return False
 
     def scope_id(self) -> int:
+        # ipv6 socket addresses are (host, port, flowinfo, scope_id).
         if self.is_ipv6():
-            return self.addrinfo[2]
+            return self.addrinfo[3]
         return 0
 
     def flowinfo(self) -> int:
         if self.is_ipv6():
-            return self.addrinfo[3]
+            return self.addrinfo[2]
         return 0
 
     def __str__(self):
@@ -55,6 +70,8 @@ class TCPAddr(IPAddr):
 
     see IPAddr for more info.
     """
+    __slots__ = ('port',)
+
     def __init__(self, addrinfo: tuple):
         IPAddr.__init__(self, addrinfo)
         self.port = self.addrinfo[1]
@@ -67,6 +84,8 @@ class UDPAddr(IPAddr):
 
     see IPAddr for more info.
     """
+    __slots__ = ('port',)
+
     def __init__(self, addrinfo: tuple):
         IPAddr.__init__(self, addrinfo)
         self.port = self.addrinfo[1]
@@ -82,18 +101,105 @@ class UnixAddr(Addr):
     addrinfo: string
         filepath of the socket file used for communication.
     """
+    __slots__ = ()
+
     def __init__(self, addrinfo):
         Addr.__init__(self, addrinfo)
 
     def __str__(self):
         return self.addrinfo
 
+# number of addresses intern_addr keeps around.
+ADDR_CACHE_SIZE = 4096
+
+@functools.lru_cache(maxsize=ADDR_CACHE_SIZE)
+def intern_addr(addr_type: type, sockaddr) -> Addr:
+    """intern_addr returns the addr_type address for a raw socket address.
+
+    datagram receive paths see the same peers over and over, so the address
+    objects are kept in an lru cache keyed on the raw socket address and
+    handed out again instead of building a new one every time. accepted
+    stream conns each come from a new ephemeral port and would only churn
+    the cache, they build their address directly. the returned objects are
+    shared, do not modify them.
+
+        intern_addr(UDPAddr, ('127.0.0.1', 5055)) -> UDPAddr
+
+    intern_addr.cache_clear() empties the cache and intern_addr.cache_info()
+    reports its hits and misses.
+    """
+    return addr_type(sockaddr)
+
+def _sockopts(*opts) -> list:
+    # (level, option, value) triples with the option looked up by name,
+    # the ones this platform does not have are left out.
+    return [(level, getattr(socket, name), value) for level, name, value in opts
+            if hasattr(socket, name)]
+
+# socket buffer size of the bulk profile.
+BULK_BUFFER_SIZE = 0x400000
+
+# named sets of socket options, see AddrConfig.add_options.
+SOCKET_PROFILES = {
+    # send small writes right away and ack without delay.
+    'low_latency': _sockopts(
+        (socket.IPPROTO_TCP, 'TCP_NODELAY', 1),
+        (socket.IPPROTO_TCP, 'TCP_QUICKACK', 1)),
+    # big socket buffers for throughput, pair it with TCPConn.corked to
+    # send full segments.
+    'bulk': _sockopts(
+        (socket.SOL_SOCKET, 'SO_SNDBUF', BULK_BUFFER_SIZE),
+        (socket.SOL_SOCKET, 'SO_RCVBUF', BULK_BUFFER_SIZE)),
+    # find dead peers after a minute of silence and five unanswered probes
+    # ten seconds apart.
+    'keepalive': _sockopts(
+        (socket.SOL_SOCKET, 'SO_KEEPALIVE', 1),
+        (socket.IPPROTO_TCP, 'TCP_KEEPIDLE', 60),
+        (socket.IPPROTO_TCP, 'TCP_KEEPINTVL', 10),
+        (socket.IPPROTO_TCP, 'TCP_KEEPCNT', 5)),
+}
+
+def socket_options(options) -> list:
+    """socket_options expands options into a list of (level, option, value)
+    triples for setsockopt.
+
+    options is a profile name from SOCKET_PROFILES, a (level, option, value)
+    triple or a list mixing both.
+
+        socket_options(['low_latency', (socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)])
+
+    Raises
+    ------
+    ValueError
+        for a profile name that is not in SOCKET_PROFILES.
+    """
+    if isinstance(options, str) or (isinstance(options, tuple) and
+            len(options) == 3 and isinstance(options[0], int)):
+        options = [options]
+    expanded = []
+    for opt in options:
+        if isinstance(opt, str):
+            if opt not in SOCKET_PROFILES:
+                raise ValueError(f'unknown socket option profile {opt!r}')
+            expanded.extend(SOCKET_PROFILES[opt])
+        else:
+            level, name, value = opt
+            expanded.append((level, name, value))
+    return expanded
+
+def _is_tcp_socket(sock: socket.socket) -> bool:
+    return sock.type == socket.SOCK_STREAM and \
+            sock.family in (socket.AF_INET, socket.AF_INET6)
+
 class AddrConfig:
     """AddrConfig is used to configure parameters for address resolution.
 
     an empty AddrConfig can be initialized and the parameters set to
     the callers needs. AddrConfig provides methods to set all the 
     necessary socket and getaddrinfo parameters available.
+
+    it also carries the socket options get_socket sets on the sockets it
+    creates, see add_options. listen and dial take the same options.
     """
     def __init__(self,
             host: str = '',
@@ -102,6 +208,7 @@ class AddrConfig:
             socktype: Union[socket.SocketKind, int] = 0,
             proto: int = 0, # integer of protocol to use.
             flags: int = 0, # multiple flags can be or-ed together
+            options = None, # see add_options.
         ) -> None:
             self.__addr_config = {
                'host': host,
@@ -111,6 +218,25 @@ class AddrConfig:
                'proto': proto,
                'flags': flags,
             }
+            self.__options = []
+            self.add_options(options)
+
+    def add_options(self, options):
+        """add_options adds socket options for get_socket to set.
+
+        options is a profile name ('low_latency', 'bulk', 'keepalive'), a
+        (level, option, value) triple or a list mixing both, see
+        socket_options. None adds nothing. options are set in the order they
+        were added, right after the socket is created and before it is bound
+        or connected. tcp level options are skipped on sockets that aren't
+        tcp, so a profile can be given to any network.
+        """
+        if options:
+            self.__options.extend(socket_options(options))
+
+    def get_options(self) -> list:
+        # the (level, option, value) triples get_socket sets.
+        return list(self.__options)
 
     def add_flag(self, flag: int):
         # set flags that get passed to socket.getaddrinfo
@@ -137,8 +263,28 @@ class AddrConfig:
         proto = -1
         if self.__addr_config['proto']:
             proto = self.__addr_config['proto']
-        return socket.socket(self.__addr_config['family'],
+        sock = socket.socket(self.__addr_config['family'],
                 self.__addr_config['socktype'], proto)
+        if self.__options:
+            # all of them or no socket at all.
+            try:
+                set_socket_options(sock, self.__options)
+            except OSError:
+                sock.close()
+                raise
+        return sock
+
+def set_socket_options(sock: socket.socket, options: list):
+    # set (level, option, value) options on sock, tcp level ones only when
+    # it is a tcp socket.
+    tcp = None
+    for level, name, value in options:
+        if level == socket.IPPROTO_TCP:
+            if tcp is None:
+                tcp = _is_tcp_socket(sock)
+            if not tcp:
+                continue
+        sock.setsockopt(level, name, value)
 
 def join_host_port(host: str, port: str = '') -> str:
     """join_host_port combines host and port into into representation format
@@ -204,10 +350,15 @@ def split_host_port(hostport: str):
     # we've made it this far and its cool. we can now start the splitting.
     return host, port
 
-def resolve_addr_list(addr_config: dict):
-    # runs the address resolution parameters through socket.getaddrinfo
-    # function and returns the resulting addresses
-    return socket.getaddrinfo(
+def _getaddrinfo(key: tuple):
+    return resolv.get_resolver_backend()(key)
+
+def resolve_addr_list(addr_config: dict, use_cache: bool = True):
+    # runs the address resolution parameters through the resolver backend
+    # (socket.getaddrinfo by default, see set_resolver_backend) and returns
+    # the resulting addresses. results come from the resolver cache when
+    # there is one, see set_resolver_cache.
+    key = (
             addr_config['host'],
             addr_config['port'],
             addr_config['family'],
@@ -215,6 +366,10 @@ def resolve_addr_list(addr_config: dict):
             addr_config['proto'],
             addr_config['flags']
         )
+    cache = resolv.get_resolver_cache()
+    if use_cache and cache is not None:
+        return cache.lookup(key, lambda: _getaddrinfo(key))
+    return _getaddrinfo(key)
 
 def net_is_valid(network: str, net: str) -> bool:
     """net_is_valid checks if net is a supported socket type.
@@ -248,7 +403,7 @@ def net_is_valid(network: str, net: str) -> bool:
     else:
         return False
 
-def inet_addr_list(addr_config: dict, network: str):
+def inet_addr_list(addr_config: dict, network: str, use_cache: bool = True):
     """inet_addr_list returns a list of TCPAddr | UDPAddr | IPAddr
 
     Parameters
@@ -260,12 +415,30 @@ def inet_addr_list(addr_config: dict, network: str):
     network: str
         network type to resolve addresses to.
 
+    use_cache: bool
+        set to False to skip the resolver cache and always ask getaddrinfo.
+
     taking the dict form of AddrConfig and the network, it tries to
     resolve the host, port into a list of ip address, port pairs with
     the parameters in the config.
     """
+    hooks = _metrics._hooks
+    if hooks is None:
+        return _inet_addr_list(addr_config, network, use_cache)
+    start = time.perf_counter()
+    err = None
+    try:
+        return _inet_addr_list(addr_config, network, use_cache)
+    except BaseException as e:
+        err = e
+        raise
+    finally:
+        hooks.on_resolve(addr_config['host'], network,
+                time.perf_counter() - start, err)
+
+def _inet_addr_list(addr_config: dict, network: str, use_cache: bool):
     if network:
-        addrinfo_list = resolve_addr_list(addr_config)
+        addrinfo_list = resolve_addr_list(addr_config, use_cache)
         addr_obj = None
         if net_is_valid('tcp', network): # check tcp
             addr_obj = TCPAddr
@@ -345,7 +518,8 @@ def config_inetaddr(host: str, port: str, network: str) -> AddrConfig:
         config.add_flag(socket.AI_PASSIVE)
         return config
 
-def resolver(host: str, port: str, network: str) -> tuple[list, AddrConfig]:
+def resolver(host: str, port: str, network: str,
+        use_cache: bool = True) -> tuple[list, AddrConfig]:
     """resolve endpoints and return the parameters used to resolve them.
 
     this function makes live easier by calling all the other functions involved
@@ -366,11 +540,27 @@ def resolver(host: str, port: str, network: str) -> tuple[list, AddrConfig]:
 
     network: str
        type of network to resolved address is related to. 
+
+    use_cache: bool
+        set to False to skip the resolver cache, see set_resolver_cache.
     """
     config = config_inetaddr(host, port, network)
-    addr_list = inet_addr_list(config.get_config(), network)
+    addr_list = inet_addr_list(config.get_config(), network, use_cache)
     return addr_list, config
 
+async def resolve_addr_async(host: str, port: str, network: str,
+        use_cache: bool = True) -> tuple[list, AddrConfig]:
+    """resolve_addr_async is the awaitable form of resolver.
+
+    the lookup runs on the event loop's executor so the loop is never
+    blocked on getaddrinfo. cache hits are still answered without a lookup
+    and with a ThreadedResolver backend concurrent lookups of the same name
+    share one getaddrinfo call.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, resolver, host, port, network,
+            use_cache)
+
 def loopback_addr(network) -> str:
     # loopback ip address for network interface.
     if '6' in network:
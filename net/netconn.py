@@ -1,6 +1,9 @@
 from typing import Union, Optional
 from enum import Enum
-import socket, io, sys
+import select, selectors, socket, io, os, stat, sys, time
+
+from .errors import *
+from . import metrics as _metrics
 
 class _SocketWriter(io.BufferedIOBase):
     """A writtable and readable BufferedIOBase implementation for a socket.
@@ -19,13 +22,7 @@ class _SocketWriter(io.BufferedIOBase):
     def read(self) -> bytes:
         # read from the socket until eof then return read bytes.
         # if an error occurs while reading throw it.
-        chunks = []
-        while True:
-            buf = self.__sock.recv(2048)
-            chunks.append(buf)
-            if not buf:
-                break
-        return b''.join(chunks)
+        return _recv_until_eof(self.__sock.recv_into)
 
     def write(self, buf) -> int:
         # write the buf of bytes to the underlying socket connection.
@@ -35,6 +32,89 @@ class _SocketWriter(io.BufferedIOBase):
 
 RECV_MAX = 0xffff
 
+# initial size of the receive buffer behind Conn.read_into, readexactly and
+# readuntil. it grows when a single read needs more than this.
+RECV_BUF_SIZE = 0x4000
+
+# most buffers passed to a single sendmsg call by Conn.writev.
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+# size of the buffer the file is copied through when send_file can not
+# use sendfile, and the most bytes asked of a single sendfile call.
+SENDFILE_CHUNK = 0x40000
+SENDFILE_MAX = 0x40000000
+
+# readuntil gives up when the separator is not found within this many bytes.
+READ_LIMIT = 0x100000
+
+def _recv_until_eof(recv_into, buf: Optional[bytearray] = None) -> bytes:
+    # read into a growing bytearray until recv_into returns 0 (eof). buf
+    # holds any bytes that were already read.
+    if buf is None:
+        buf = bytearray()
+    n = len(buf)
+    while True:
+        if n == len(buf):
+            buf.extend(bytes(max(len(buf), RECV_BUF_SIZE)))
+        with memoryview(buf) as view:
+            got = recv_into(view[n:])
+        if not got:
+            del buf[n:]
+            return bytes(buf)
+        n += got
+
+class _RecvBuffer:
+    # _RecvBuffer is a preallocated receive buffer. bytes are received
+    # straight into the free space at the end with recv_into and consumed
+    # from the front, the unread bytes are moved back to the start of the
+    # buffer only when the free space runs out, so steady state reads do
+    # not allocate.
+    def __init__(self, size: int = RECV_BUF_SIZE):
+        self.buf = bytearray(size)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def writable(self, need: int = 1) -> memoryview:
+        # return a view of the free space, making room for at least
+        # need more bytes than are buffered.
+        if len(self.buf) - self.end < need:
+            n = len(self)
+            if self.start:
+                with memoryview(self.buf) as view:
+                    view[:n] = view[self.start:self.end]
+                self.start, self.end = 0, n
+            if len(self.buf) - self.end < need:
+                self.buf.extend(bytes(max(need - (len(self.buf) - n),
+                    len(self.buf))))
+        return memoryview(self.buf)[self.end:]
+
+    def take(self, n: int) -> bytes:
+        # remove and return n bytes from the front of the buffer.
+        with memoryview(self.buf) as view:
+            b = bytes(view[self.start:self.start + n])
+        self.consume(n)
+        return b
+
+    def copy_into(self, buffer) -> int:
+        # copy as much of the buffered bytes as fits into buffer.
+        with memoryview(buffer) as dst, dst.cast('B') as dst, \
+                memoryview(self.buf) as src:
+            n = min(len(self), dst.nbytes)
+            dst[:n] = src[self.start:self.start + n]
+        self.consume(n)
+        return n
+
+    def consume(self, n: int):
+        self.start += n
+        if self.start == self.end:
+            self.start = self.end = 0
+
 class ConnType(Enum):
     """ConnType represents the type of socket connection to initiate
 
@@ -61,6 +141,8 @@ class Addr:
     addrinfo: object
         a socket address
     """
+    __slots__ = ('addrinfo',)
+
     def __init__(self, addrinfo):
         """
         Parameters
@@ -98,11 +180,24 @@ class Conn:
     the socket object can be accessed and the send and recv used to achieve
     every specific use case.
 
+    a Conn works in non blocking mode too, see setblocking. reads that
+    would wait raise WouldBlockError and writes never wait, what the socket
+    can't take right away is kept in a pending buffer that flush sends.
+
+    like in go, reads and writes can be given deadlines, see set_deadline.
+    a deadline bounds a whole read or write, however many syscalls it takes,
+    where settimeout bounds every syscall on its own.
+
     The Conn objects present a more beginner friendly interface
     to dealing with sockets. That been, said after a fair amount of use
     beginners should try and play with the real socket api's provided by their
     os to really understand how this things work.
     """
+    # a server can hold a lot of conns, slots keep each one small. conns are
+    # weakly referenced by the metrics counters, hence __weakref__.
+    __slots__ = ('sock', 'laddr', 'raddr', '__conn', '_rbuf', '_wbuf',
+            '_read_deadline', '_write_deadline', '__weakref__')
+
     def __init__(self, sock, laddr=None):
         if sock:
             assert isinstance(sock, socket.socket), 'socket not a socket object'
@@ -111,36 +206,446 @@ class Conn:
             assert isinstance(laddr, Addr), 'address not an Addr object'
 
         self.sock = sock
-        # make the socket non blocking so it doesnt block the thread
-        # self.sock.setblocking(False)
 
         # local and remote address of the socket connection.
         self.laddr = laddr
         self.raddr = None
         
-        # create a buffered read, the socket object for buffered
-        # io support.
-        self.__conn = io.BufferedRWPair(self.sock.makefile('rb'),
-                self.sock.makefile('wb'))
+        # the buffered file object returned from file(). the read and write
+        # methods go to the socket directly, so it is only created when
+        # file() is first called, most conns never need one.
+        self.__conn = None
+
+        # receive buffer for the read methods, allocated on first use.
+        self._rbuf = None
+        # bytes a non blocking write could not send yet.
+        self._wbuf = None
+        # time.monotonic() deadlines of reads and writes, None for none.
+        self._read_deadline = None
+        self._write_deadline = None
+
+    def fileno(self) -> int:
+        # the socket's file descriptor, a Conn can be registered with a
+        # selector or an event loop directly.
+        return self.sock.fileno()
+
+    def set_deadline(self, deadline: Optional[float]):
+        """set_deadline sets both the read and write deadline.
+
+        a deadline is a time.monotonic() value, reads and writes still
+        waiting on the socket when it passes raise DeadlineExceededError,
+        as do the ones started after it. a deadline covers every read and
+        write up to it, not just the next one, so extend it after each
+        successful operation for an idle timeout:
+
+            conn.set_deadline(time.monotonic() + 30)
+
+        None clears the deadline.
+        """
+        self._read_deadline = deadline
+        self._write_deadline = deadline
+
+    def set_read_deadline(self, deadline: Optional[float]):
+        # set the deadline of reads only, see set_deadline.
+        self._read_deadline = deadline
+
+    def set_write_deadline(self, deadline: Optional[float]):
+        # set the deadline of writes only, see set_deadline.
+        self._write_deadline = deadline
+
+    def _wait(self, event: int, deadline: float, op: str):
+        # wait for the socket to become readable or writable before the
+        # deadline. polling on the side keeps the socket's own blocking mode
+        # and timeout alone, a reader and a writer with different deadlines
+        # can share the conn.
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceededError(op)
+        if self.sock.gettimeout() == 0:
+            return
+        p = select.poll()
+        p.register(self.sock, event)
+        if not p.poll(remaining * 1000):
+            raise DeadlineExceededError(op)
 
     def write(self, buf: bytes) -> int:
-        # write bytes to the underlying socket connection
-        return self.__conn.write(buf)
+        # write all of buf to the underlying socket connection. whatever was
+        # written through file() is flushed first to keep the bytes in order.
+        # a non blocking conn sends what it can and keeps the rest pending.
+        if self.__conn is not None:
+            self.__conn.flush()
+        if self.sock.gettimeout() == 0:
+            return self._write_nonblocking([buf])
+        if self._write_deadline is not None:
+            # sendall can't be cut short, go through the sendmsg loop.
+            return self.writev([buf])
+        if self._wbuf:
+            self._send_pending()
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        self.sock.sendall(buf)
+        with memoryview(buf) as view:
+            n = view.nbytes
+        if hooks is not None:
+            hooks.on_write(self, 'sendall', n, seconds=time.perf_counter() - start)
+        return n
+
+    def writev(self, buffers) -> int:
+        # write a sequence of bytes-like objects as if they were joined
+        # together, without joining them. the buffers are handed to sendmsg
+        # in one go so a header and its payload leave in a single syscall.
+        # returns the total number of bytes written.
+        if self.__conn is not None:
+            self.__conn.flush()
+        buffers = list(buffers)
+        if self.sock.gettimeout() == 0:
+            return self._write_nonblocking(buffers)
+        if self._wbuf:
+            self._send_pending()
+        total = 0
+        for b in buffers:
+            total += len(b) if type(b) in (bytes, bytearray) \
+                    else memoryview(b).nbytes
+        if not hasattr(self.sock, 'sendmsg'):
+            # no scatter/gather on this platform.
+            hooks = _metrics._hooks
+            start = time.perf_counter() if hooks is not None else 0.0
+            self.sock.sendall(b''.join(buffers))
+            if hooks is not None:
+                hooks.on_write(self, 'sendall', total,
+                        seconds=time.perf_counter() - start)
+            return total
+        # the common case, everything fits in the socket buffer at once.
+        n = self._sendmsg(buffers[:IOV_MAX])
+        if n == total:
+            return total
+        views = [memoryview(b).cast('B') for b in buffers]
+        i = 0
+        while True:
+            # drop the buffers that went out whole and trim the one that
+            # was only partly written.
+            while i < len(views) and n >= views[i].nbytes:
+                n -= views[i].nbytes
+                i += 1
+            if i == len(views):
+                return total
+            if n:
+                views[i] = views[i][n:]
+            n = self._sendmsg(views[i:i + IOV_MAX])
+
+    def _write_nonblocking(self, buffers: list) -> int:
+        # send as much of buffers as the socket takes without blocking and
+        # queue the rest behind whatever is already pending. returns the
+        # total size of buffers, all of it is either sent or queued.
+        views = [memoryview(b).cast('B') for b in buffers]
+        total = sum(v.nbytes for v in views)
+        n = 0
+        if not (self._wbuf and self.flush()):
+            try:
+                n = self._sendmsg(views[:IOV_MAX])
+            except BlockingIOError:
+                pass
+            if n == total:
+                return total
+        if self._wbuf is None:
+            self._wbuf = bytearray()
+        for v in views:
+            if n >= v.nbytes:
+                n -= v.nbytes
+                continue
+            self._wbuf += v[n:]
+            n = 0
+        return total
+
+    def _send_pending(self):
+        # a blocking write sends the pending bytes first to keep the order.
+        wbuf = self._wbuf
+        if self._write_deadline is None:
+            self.sock.sendall(wbuf)
+            wbuf.clear()
+            return
+        while wbuf:
+            del wbuf[:self._sendmsg([wbuf])]
+
+    def flush(self) -> int:
+        """flush sends the bytes a non blocking write left pending, as many
+        as the socket takes without blocking, and returns how many are still
+        pending. call it again once the socket is writable. on a blocking
+        conn it sends everything."""
+        wbuf = self._wbuf
+        if not wbuf:
+            return 0
+        if self.sock.gettimeout() != 0:
+            self._send_pending()
+            return 0
+        try:
+            n = self._sendmsg([wbuf])
+        except BlockingIOError:
+            return len(wbuf)
+        del wbuf[:n]
+        return len(wbuf)
+
+    def pending_bytes(self) -> int:
+        # number of bytes written but not sent yet.
+        return len(self._wbuf) if self._wbuf else 0
+
+    def _sendmsg(self, views) -> int:
+        # every vectored write to the socket goes through here.
+        if self._write_deadline is not None:
+            return self._sendmsg_deadline(views)
+        hooks = _metrics._hooks
+        if hooks is None:
+            return self.sock.sendmsg(views)
+        start = time.perf_counter()
+        n = self.sock.sendmsg(views)
+        hooks.on_write(self, 'sendmsg', n, seconds=time.perf_counter() - start)
+        return n
+
+    def _sendmsg_deadline(self, views) -> int:
+        # a blocking sendmsg waits until everything is sent, so wait for
+        # writability ourselves and only send what fits.
+        flags = 0 if self.sock.gettimeout() == 0 else socket.MSG_DONTWAIT
+        hooks = _metrics._hooks
+        while True:
+            self._wait(select.POLLOUT, self._write_deadline, 'write')
+            start = time.perf_counter() if hooks is not None else 0.0
+            try:
+                n = self.sock.sendmsg(views, (), flags)
+            except BlockingIOError:
+                if not flags:
+                    raise
+                continue
+            if hooks is not None:
+                hooks.on_write(self, 'sendmsg', n,
+                        seconds=time.perf_counter() - start)
+            return n
+
+    def _wait_writable(self):
+        # wait for a socket with a timeout to become writable again, the
+        # socket is non blocking underneath when it has a timeout.
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.sock, selectors.EVENT_WRITE)
+            if not sel.select(self.sock.gettimeout()):
+                raise socket.timeout('timed out')
+
+    def _send_file(self, file, offset: int = 0, count: Optional[int] = None) -> int:
+        # send count bytes of file starting at offset, all of it when count
+        # is None. file is a path or a file object opened in binary mode.
+        # returns the number of bytes sent.
+        # a non blocking conn sends what the socket takes without blocking
+        # and returns that, raising WouldBlockError when that is nothing.
+        if self.__conn is not None:
+            self.__conn.flush()
+        if self._wbuf and self.flush():
+            raise WouldBlockError('send_file')
+        if isinstance(file, (str, bytes, os.PathLike)):
+            with open(file, 'rb') as f:
+                return self._send_file(f, offset, count)
+        try:
+            fileno = file.fileno()
+            st = os.fstat(fileno)
+            if not stat.S_ISREG(st.st_mode):
+                # pipes and the likes have no size to go by.
+                fileno = None
+            size = st.st_size
+        except (AttributeError, io.UnsupportedOperation, OSError):
+            fileno = None
+        # sendfile on a blocking socket can't be cut short either, with a
+        # write deadline the file goes through the sendmsg loop.
+        if fileno is not None and hasattr(os, 'sendfile') and \
+                self._write_deadline is None:
+            if count is None:
+                count = max(size - offset, 0)
+            sent = self._sendfile_zero_copy(fileno, offset, count)
+            if sent is not None:
+                if hasattr(file, 'seek'):
+                    file.seek(offset + sent)
+                return sent
+        return self._sendfile_chunked(file, offset, count)
+
+    def _sendfile_zero_copy(self, fileno: int, offset: int, count: int):
+        # copy the file to the socket in the kernel with os.sendfile.
+        # returns None if sendfile refuses the file before anything is sent.
+        sent = 0
+        sockno = self.sock.fileno()
+        nonblocking = self.sock.gettimeout() == 0
+        hooks = _metrics._hooks
+        while sent < count:
+            start = time.perf_counter() if hooks is not None else 0.0
+            try:
+                n = os.sendfile(sockno, fileno, offset + sent,
+                        min(count - sent, SENDFILE_MAX))
+            except BlockingIOError:
+                if nonblocking:
+                    if not sent:
+                        raise WouldBlockError('send_file') from None
+                    break
+                self._wait_writable()
+                continue
+            except OSError:
+                if sent == 0:
+                    return None
+                raise
+            if n == 0:
+                # the file is shorter than count.
+                break
+            if hooks is not None:
+                hooks.on_write(self, 'sendfile', n,
+                        seconds=time.perf_counter() - start)
+            sent += n
+        return sent
+
+    def _sendfile_chunked(self, file, offset: int, count: Optional[int]) -> int:
+        # copy the file through one reusable buffer. a non blocking conn
+        # takes a single chunk per call, what the socket doesn't take of it
+        # is left pending.
+        nonblocking = self.sock.gettimeout() == 0
+        if offset:
+            file.seek(offset)
+        buf = bytearray(SENDFILE_CHUNK)
+        sent = 0
+        with memoryview(buf) as view:
+            while count is None or sent < count:
+                want = SENDFILE_CHUNK if count is None \
+                        else min(SENDFILE_CHUNK, count - sent)
+                if hasattr(file, 'readinto'):
+                    n = file.readinto(view[:want])
+                else:
+                    data = file.read(want)
+                    n = len(data)
+                    view[:n] = data
+                if not n:
+                    break
+                if nonblocking:
+                    self._write_nonblocking([view[:n]])
+                    return n
+                if self._write_deadline is not None:
+                    self.writev([view[:n]])
+                    sent += n
+                    continue
+                hooks = _metrics._hooks
+                start = time.perf_counter() if hooks is not None else 0.0
+                self.sock.sendall(view[:n])
+                if hooks is not None:
+                    hooks.on_write(self, 'sendall', n,
+                            seconds=time.perf_counter() - start)
+                sent += n
+        return sent
+
+    def _recv_into(self, view) -> int:
+        # every read from the socket goes through here.
+        if self._read_deadline is not None:
+            self._wait(select.POLLIN, self._read_deadline, 'read')
+        hooks = _metrics._hooks
+        if hooks is None:
+            try:
+                return self.sock.recv_into(view)
+            except BlockingIOError:
+                raise WouldBlockError('read') from None
+        start = time.perf_counter()
+        try:
+            n = self.sock.recv_into(view)
+        except BlockingIOError:
+            raise WouldBlockError('read') from None
+        hooks.on_read(self, 'recv_into', n, seconds=time.perf_counter() - start)
+        return n
+
+    def _buffer(self) -> _RecvBuffer:
+        if self._rbuf is None:
+            self._rbuf = _RecvBuffer()
+        return self._rbuf
+
+    def _fill(self, need: int = 1) -> int:
+        # receive more bytes into the read buffer, return 0 on eof.
+        rbuf = self._buffer()
+        with rbuf.writable(need) as view:
+            n = self._recv_into(view)
+        rbuf.end += n
+        return n
 
     def read(self, n: int = 0) -> bytes:
-        # read data from the underlying socket connection.
+        # read at most n bytes from the connection, returning b'' on eof.
+        # without n read until the remote end closes the connection.
+        # a non blocking conn raises WouldBlockError when there is nothing
+        # to read yet.
+        rbuf = self._rbuf
         if n:
-            while True:
-                buf = []
-                b = self.sock.recv(n)
-                buf.append(b'')
-                if len(b) < n:
-                    return b''.join(buf)
-        else:
-            return self.__conn.read()
+            if rbuf:
+                return rbuf.take(min(n, len(rbuf)))
+            if self._read_deadline is not None:
+                self._wait(select.POLLIN, self._read_deadline, 'read')
+            hooks = _metrics._hooks
+            start = time.perf_counter() if hooks is not None else 0.0
+            try:
+                data = self.sock.recv(n)
+            except BlockingIOError:
+                raise WouldBlockError('read') from None
+            if hooks is not None:
+                hooks.on_read(self, 'recv', len(data),
+                        seconds=time.perf_counter() - start)
+            return data
+        if self.sock.gettimeout() == 0 or self._read_deadline is not None:
+            # collect in the read buffer until eof, a read that would block
+            # or runs out of time raises with the bytes kept for the next
+            # call.
+            while self._fill():
+                pass
+            rbuf = self._rbuf
+            return rbuf.take(len(rbuf))
+        buf = None
+        if rbuf:
+            buf = bytearray(rbuf.take(len(rbuf)))
+        return _recv_until_eof(self._recv_into, buf)
+
+    def read_into(self, buffer) -> int:
+        # read at most len(buffer) bytes into buffer and return the number
+        # of bytes read, 0 on eof. buffered bytes are copied out first,
+        # otherwise the socket receives straight into buffer.
+        rbuf = self._rbuf
+        if rbuf:
+            return rbuf.copy_into(buffer)
+        with memoryview(buffer) as view, view.cast('B') as view:
+            return self._recv_into(view)
+
+    def readexactly(self, n: int) -> bytes:
+        # read exactly n bytes. raises UnexpectedEOFError if the connection
+        # is closed before n bytes arrive.
+        rbuf = self._buffer()
+        while len(rbuf) < n:
+            if not self._fill(n - len(rbuf)):
+                raise UnexpectedEOFError(rbuf.take(len(rbuf)))
+        return rbuf.take(n)
+
+    def readuntil(self, sep: bytes = b'\n', limit: int = READ_LIMIT) -> bytes:
+        # read until sep is found and return the data with sep at the end.
+        # raises UnexpectedEOFError if the connection is closed first and
+        # LimitExceededError if the data up to and including sep is longer
+        # than limit bytes.
+        rbuf = self._buffer()
+        # where to continue the search from, so bytes are scanned once.
+        offset = 0
+        while True:
+            i = rbuf.buf.find(sep, rbuf.start + offset, rbuf.end)
+            if i >= 0:
+                # a long line can arrive whole in one recv, check it too.
+                n = i + len(sep) - rbuf.start
+                if n > limit:
+                    raise LimitExceededError(limit)
+                return rbuf.take(n)
+            offset = max(0, len(rbuf) - len(sep) + 1)
+            if len(rbuf) >= limit:
+                raise LimitExceededError(limit)
+            if not self._fill():
+                raise UnexpectedEOFError(rbuf.take(len(rbuf)))
 
     def file(self) -> Union[_SocketWriter, io.BufferedRWPair]:
-        # file returns the file object that conn is wrapped in.
+        # file returns the file object that conn is wrapped in. the pair
+        # does the buffering, so it is built over the raw unbuffered socket
+        # files, else flushing the pair would leave bytes stuck in the file
+        # objects underneath it.
+        if self.__conn is None:
+            self.__conn = io.BufferedRWPair(self.sock.makefile('rb', buffering=0),
+                    self.sock.makefile('wb', buffering=0))
         return self.__conn
 
     def connect(self, addr):
@@ -179,8 +684,45 @@ class Conn:
     
     def close(self) -> None:
         # close all open file descriptors. both socket and io stream.
-        self.sock.close()
-        self.__conn.close()
+        # the stream goes first so it can flush into the open socket.
+        hooks = _metrics._hooks
+        if hooks is not None:
+            hooks.on_close(self)
+        try:
+            if self.__conn is not None:
+                self.__conn.close()
+        finally:
+            self.sock.close()
+
+def _accept_many(listener, max_n: int) -> list:
+    # accept like listener.accept, then keep accepting what is already
+    # queued. the listener is non blocking while draining, polling first and
+    # accepting after would block whenever another thread took the conn in
+    # between. a thread calling accept on the listener meanwhile may get
+    # WouldBlockError, accept_many is meant for the one loop accepting.
+    conns = [listener.accept()]
+    sock = listener.sock
+    timeout = sock.gettimeout()
+    if timeout != 0:
+        sock.settimeout(0)
+    try:
+        while len(conns) < max_n:
+            try:
+                conns.append(listener.accept())
+            except BlockingIOError:
+                # the queue is drained.
+                break
+            except ConnectionError:
+                # aborted before we got to it, the next one may be fine.
+                continue
+            except OSError:
+                # the conns already accepted are returned, a real error
+                # shows up again on the next accept.
+                break
+    finally:
+        if timeout != 0:
+            sock.settimeout(timeout)
+    return conns
 
 class Listener:
     """Listener in experimental phase.
@@ -199,7 +741,8 @@ class Listener:
 
     i am also things
     """
-    def __init__(self, addr, sock, conn_type = ConnType.REMOTE):
+    def __init__(self, addr, sock, conn_type = ConnType.REMOTE,
+            reuse_port: bool = False, backlog: int = socket.SOMAXCONN):
         if sock:
             assert isinstance(sock, socket.socket), 'sock not a socket object'
         if addr:
@@ -211,13 +754,28 @@ class Listener:
         # like how AddrConfig is.
         if conn_type == ConnType.LISTEN:
             self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port:
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             self.sock.bind(self.laddr.addrinfo)
-            self.sock.listen(socket.SOMAXCONN)
+            self.sock.listen(backlog)
 
     def accept(self) -> Conn:
         """accept waits for and returns the next connection to the listener"""
-        sock, addrinfo = self.sock.accept()
-        return Conn(sock, Addr(addrinfo))
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            sock, addrinfo = self.sock.accept()
+        except BlockingIOError:
+            raise WouldBlockError('accept') from None
+        conn = Conn(sock, Addr(addrinfo))
+        if hooks is not None:
+            hooks.on_accept(self, conn, seconds=time.perf_counter() - start)
+        return conn
+
+    def accept_many(self, max_n: int = 64) -> list:
+        # accept the connections waiting on the listener, up to max_n, see
+        # TCPListener.accept_many.
+        return _accept_many(self, max_n)
 
     def addr(self) -> Addr:
         """addr returns the listeners address"""
@@ -0,0 +1,185 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+import select, threading, time
+
+from .errors      import *
+from .netconn     import *
+from .dial_listen import dial
+
+def _idle_conn_ok(conn: Conn) -> bool:
+    # an idle conn should have nothing to read. if it polls readable the
+    # peer closed it or sent bytes nobody asked for, either way it is no
+    # good for the next request. poll instead of a MSG_PEEK recv so a
+    # timeout set on the socket can't make the check block.
+    if conn.sock.fileno() < 0 or conn._rbuf:
+        return False
+    p = select.poll()
+    p.register(conn.sock, select.POLLIN)
+    return not p.poll(0)
+
+class Pool:
+    """Pool keeps connections to a single endpoint open for reuse.
+
+    get hands out an idle connection when there is one and dials a new one
+    otherwise, put hands it back for the next caller. at most max_size
+    connections are open at once, get waits for one to be put back when
+    they are all in use. idle connections are checked before reuse and
+    the ones idle for longer than idle_timeout are closed.
+
+        pool = net.Pool('localhost:5055', 'tcp', max_size=16)
+        with pool.conn() as conn:
+            conn.write(b'ping')
+            conn.read(4)
+
+    Parameters
+    ----------
+    address: str
+        the endpoint to dial, see dial.
+
+    network: str
+        a tcp or unix network.
+
+    max_size: int
+        the most connections open at once, in use and idle.
+
+    idle_timeout: float
+        seconds a connection may sit idle before it is closed.
+    """
+    def __init__(self, address: str, network: str = 'tcp', max_size: int = 8,
+            idle_timeout: float = 60.0):
+        self.address = address
+        self.network = network
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.__idle = deque()
+        self.__cond = threading.Condition()
+        self.__open = 0
+        self.__closed = False
+        self.__stats = dict.fromkeys(('hits', 'misses', 'waits', 'evictions'), 0)
+        self.__wait_time = 0.0
+
+    def get(self, timeout: Optional[float] = None) -> Conn:
+        """get returns a connection to the pool's endpoint.
+
+        waits up to timeout seconds, forever when None, for a connection to
+        be put back if max_size are already in use.
+
+        Raises
+        ------
+        PoolTimeoutError
+        """
+        start = time.monotonic()
+        waited = False
+        with self.__cond:
+            try:
+                while True:
+                    if self.__closed:
+                        raise SocketError('get from a closed pool')
+                    conn = self.__take_idle()
+                    if conn is not None:
+                        self.__stats['hits'] += 1
+                        return conn
+                    if self.__open < self.max_size:
+                        self.__open += 1
+                        self.__stats['misses'] += 1
+                        break
+                    remaining = None
+                    if timeout is not None:
+                        remaining = start + timeout - time.monotonic()
+                        if remaining <= 0:
+                            raise PoolTimeoutError(timeout)
+                    if not waited:
+                        self.__stats['waits'] += 1
+                        waited = True
+                    self.__cond.wait(remaining)
+            finally:
+                if waited:
+                    self.__wait_time += time.monotonic() - start
+
+        # dial without the lock, other callers can still take idle conns.
+        try:
+            return dial(self.address, self.network)
+        except BaseException:
+            self.__release()
+            raise
+
+    def __take_idle(self) -> Optional[Conn]:
+        # pop the most recently used idle conn that is still good, closing
+        # the stale ones on the way.
+        now = time.monotonic()
+        while self.__idle:
+            conn, since = self.__idle.pop()
+            if now - since <= self.idle_timeout and _idle_conn_ok(conn):
+                return conn
+            self.__evict(conn)
+        return None
+
+    def __evict(self, conn: Conn):
+        conn.close()
+        self.__open -= 1
+        self.__stats['evictions'] += 1
+
+    def __release(self):
+        with self.__cond:
+            self.__open -= 1
+            self.__cond.notify()
+
+    def put(self, conn: Conn, discard: bool = False):
+        # put hands conn back to the pool. a conn left in an unknown state,
+        # after an error halfway through a request, should be discarded.
+        with self.__cond:
+            if discard or self.__closed:
+                conn.close()
+                self.__open -= 1
+            else:
+                self.__idle.append((conn, time.monotonic()))
+            self.__cond.notify()
+
+    @contextmanager
+    def conn(self, timeout: Optional[float] = None):
+        # conn is get and put as a context manager, the conn is discarded
+        # when the block raises.
+        conn = self.get(timeout)
+        try:
+            yield conn
+        except BaseException:
+            self.put(conn, discard=True)
+            raise
+        self.put(conn)
+
+    def prune(self):
+        # close the idle conns that are past idle_timeout.
+        now = time.monotonic()
+        with self.__cond:
+            while self.__idle and now - self.__idle[0][1] > self.idle_timeout:
+                conn, _ = self.__idle.popleft()
+                self.__evict(conn)
+            self.__cond.notify_all()
+
+    def stats(self) -> dict:
+        # hits, misses, waits and evictions counters along with the total
+        # seconds spent waiting for a free conn, the open and idle counts.
+        with self.__cond:
+            stats = dict(self.__stats)
+            stats['wait_time'] = self.__wait_time
+            stats['open'] = self.__open
+            stats['idle'] = len(self.__idle)
+        return stats
+
+    def close(self):
+        # close the idle conns, the ones in use are closed as they are put
+        # back.
+        with self.__cond:
+            self.__closed = True
+            while self.__idle:
+                conn, _ = self.__idle.pop()
+                conn.close()
+                self.__open -= 1
+            self.__cond.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
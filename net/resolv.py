@@ -0,0 +1,275 @@
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import ipaddress, socket, threading, time
+
+class ResolverCache:
+    """ResolverCache caches the results of address resolution.
+
+    entries are keyed on the getaddrinfo parameters of an AddrConfig (host,
+    port, family, socktype, proto, flags) and live for ttl seconds. failed
+    lookups are cached too for negative_ttl seconds so a name that does not
+    resolve is not asked for again on every dial. when more than max_size
+    entries are cached the least recently used one is dropped.
+
+    resolver, inet_addr_list and everything built on them (dial, listen,
+    resolve_tcp_addr, resolve_udp_addr) go through the cache set with
+    set_resolver_cache.
+
+    Parameters
+    ----------
+    ttl: float
+        seconds a resolved address list is reused for.
+
+    max_size: int
+        the most entries kept in the cache.
+
+    negative_ttl: float
+        seconds a failed lookup is remembered for, 0 turns negative caching off.
+
+    clock: Callable[[], float]
+        monotonic clock used for expiry, mostly useful in tests.
+    """
+    def __init__(self, ttl: float = 30.0, max_size: int = 1024,
+            negative_ttl: float = 5.0, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = dict.fromkeys(('hits', 'misses', 'negative_hits',
+            'evictions', 'expirations'), 0)
+
+    def lookup(self, key: tuple, resolve):
+        """lookup returns the cached result for key, calling resolve to get
+        it when there is no live entry.
+
+        the socket.gaierror raised by resolve is cached and raised again for
+        lookups of the same key until the negative entry expires.
+        """
+        now = self.clock()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                expires, result, err = entry
+                if expires > now:
+                    self.__entries.move_to_end(key)
+                    self.__stats['hits'] += 1
+                    if err is not None:
+                        self.__stats['negative_hits'] += 1
+                        raise socket.gaierror(*err)
+                    return list(result)
+                del self.__entries[key]
+                self.__stats['expirations'] += 1
+            self.__stats['misses'] += 1
+
+        # resolve without holding the lock, lookups of other names should
+        # not wait on this one.
+        try:
+            result = resolve()
+        except socket.gaierror as e:
+            if self.negative_ttl > 0:
+                self.__store(key, (now + self.negative_ttl, None, e.args))
+            raise
+        if self.ttl > 0:
+            self.__store(key, (now + self.ttl, list(result), None))
+        return result
+
+    def __store(self, key: tuple, entry: tuple):
+        with self.__lock:
+            self.__entries[key] = entry
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__stats['evictions'] += 1
+
+    def stats(self) -> dict:
+        # counters for hits, misses, negative_hits, evictions, expirations
+        # and the current number of entries as size.
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats['size'] = len(self.__entries)
+        return stats
+
+    def clear(self):
+        # drop every entry, the counters are kept.
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+_resolver_cache: Optional[ResolverCache] = ResolverCache()
+
+def get_resolver_cache() -> Optional[ResolverCache]:
+    """get_resolver_cache returns the cache used for address resolution,
+    None when caching is turned off."""
+    return _resolver_cache
+
+def set_resolver_cache(cache: Optional[ResolverCache]):
+    """set_resolver_cache replaces the cache used for address resolution.
+
+    pass None to turn caching off for the whole process, or use_cache=False
+    on resolver to skip it for a single lookup.
+    """
+    global _resolver_cache
+    _resolver_cache = cache
+
+def _system_lookup(key: tuple) -> list:
+    # the default backend, a blocking getaddrinfo on the calling thread.
+    return socket.getaddrinfo(*key)
+
+class ThreadedResolver:
+    """ThreadedResolver is a resolver backend running lookups on its own
+    thread pool.
+
+    concurrent lookups of the same key are coalesced, the first caller
+    starts the getaddrinfo call and everyone asking for the key while it is
+    in flight waits on the same future. a hundred threads dialing the same
+    name at once trigger a single lookup.
+
+        net.set_resolver_backend(net.ThreadedResolver(max_workers=4))
+
+    Parameters
+    ----------
+    max_workers: int
+        the most lookups running at once.
+
+    lookup: Callable[[tuple], list], optional
+        the blocking lookup run on the pool, socket.getaddrinfo by default.
+        it gets the (host, port, family, socktype, proto, flags) key.
+    """
+    def __init__(self, max_workers: int = 8, lookup=None):
+        self.lookup = lookup or _system_lookup
+        self.executor = ThreadPoolExecutor(max_workers,
+                thread_name_prefix='net-resolver')
+        self.__inflight = {}
+        self.__lock = threading.Lock()
+        self.lookups = 0
+        self.coalesced = 0
+
+    def submit(self, key: tuple) -> Future:
+        # future for the lookup of key, shared with the lookup in flight if
+        # there is one.
+        with self.__lock:
+            fut = self.__inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return fut
+            self.lookups += 1
+            fut = self.executor.submit(self.lookup, key)
+            self.__inflight[key] = fut
+        fut.add_done_callback(lambda _: self.__done(key, fut))
+        return fut
+
+    def __done(self, key: tuple, fut: Future):
+        with self.__lock:
+            if self.__inflight.get(key) is fut:
+                del self.__inflight[key]
+
+    def __call__(self, key: tuple) -> list:
+        return self.submit(key).result()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class HostsResolver:
+    """HostsResolver answers lookups from a static table of names, like
+    /etc/hosts, without touching the network.
+
+    it is a stand-in backend for tests and benchmarks. names missing from
+    the table fail with EAI_NONAME, ip literals and passive lookups are
+    handed to getaddrinfo which answers those without any network traffic.
+
+        net.set_resolver_backend(net.HostsResolver({'svc': ['127.0.0.1']}))
+
+    Parameters
+    ----------
+    hosts: dict
+        maps names to lists of ip address strings.
+
+    delay: float
+        seconds every lookup sleeps for, to stand in for a slow resolver.
+    """
+    def __init__(self, hosts: dict, delay: float = 0.0):
+        self.hosts = {name.lower(): list(ips) for name, ips in hosts.items()}
+        self.delay = delay
+        self.lookups = 0
+
+    @classmethod
+    def from_file(cls, path: str = '/etc/hosts', delay: float = 0.0):
+        # parse a hosts(5) file into a HostsResolver.
+        hosts = {}
+        with open(path) as f:
+            for line in f:
+                fields = line.split('#', 1)[0].split()
+                if len(fields) < 2:
+                    continue
+                for name in fields[1:]:
+                    hosts.setdefault(name.lower(), []).append(fields[0])
+        return cls(hosts, delay)
+
+    def __call__(self, key: tuple) -> list:
+        host, port, family, socktype, proto, flags = key
+        if not host or _is_ip_literal(host):
+            return socket.getaddrinfo(*key)
+        self.lookups += 1
+        if self.delay:
+            time.sleep(self.delay)
+        ips = self.hosts.get(host.lower())
+        if not ips:
+            raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        port = _port_number(port, socktype)
+        kinds = [(socktype, proto)] if socktype else \
+                [(socket.SOCK_STREAM, socket.IPPROTO_TCP),
+                    (socket.SOCK_DGRAM, socket.IPPROTO_UDP)]
+        result = []
+        for ip in ips:
+            ip_family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+            if family not in (socket.AF_UNSPEC, ip_family):
+                continue
+            sockaddr = (ip, port, 0, 0) if ip_family == socket.AF_INET6 \
+                    else (ip, port)
+            for kind, kind_proto in kinds:
+                result.append((ip_family, kind, kind_proto or proto, '', sockaddr))
+        if not result:
+            raise socket.gaierror(socket.EAI_ADDRFAMILY,
+                    'Address family for hostname not supported')
+        return result
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.split('%', 1)[0])
+    except ValueError:
+        return False
+    return True
+
+def _port_number(port, socktype: int) -> int:
+    if not port:
+        return 0
+    if str(port).isdigit():
+        return int(port)
+    proto = 'udp' if socktype == socket.SOCK_DGRAM else 'tcp'
+    try:
+        return socket.getservbyname(port, proto)
+    except OSError:
+        raise socket.gaierror(socket.EAI_SERVICE, 'Servname not supported for ai_socktype')
+
+_resolver_backend = _system_lookup
+
+def get_resolver_backend():
+    """get_resolver_backend returns the backend doing the lookups the
+    resolver cache misses on."""
+    return _resolver_backend
+
+def set_resolver_backend(backend=None):
+    """set_resolver_backend replaces the backend doing address lookups.
+
+    a backend is a callable taking the (host, port, family, socktype, proto,
+    flags) getaddrinfo parameters and returning a getaddrinfo style list,
+    ThreadedResolver and HostsResolver are the ones shipped. None restores
+    the plain blocking getaddrinfo.
+    """
+    global _resolver_backend
+    _resolver_backend = backend or _system_lookup
@@ -0,0 +1,236 @@
+import selectors, sys, traceback
+
+from .netconn  import *
+from .tcpconn  import *
+from .unixconn import *
+from .writequeue import *
+
+# default limit on the output pending across all of a server's conns.
+MAX_BUFFERED = 0x4000000
+
+class _Client:
+    # per connection state kept as the selector key data. the output not
+    # sent yet is kept by the non blocking conn itself, the queue decides
+    # when to stop reading because of it.
+    def __init__(self, conn: Conn):
+        self.conn = conn
+        self.queue = None
+        self.eof = False
+        # the selector events the conn is registered for, 0 when it isn't.
+        self.events = 0
+
+class Server:
+    """Server multiplexes every connection accepted from a stream listener
+    on a single thread.
+
+    instead of the serial `while True: accept(); handle()` loop, the
+    listener and all the connections it accepts are put in non blocking mode
+    and registered with a selector (epoll on linux). the handler is called
+    with the conn and the bytes that were read whenever a connection becomes
+    readable, whatever it returns gets written back to the connection as
+    the socket becomes writable. when the remote end closes its side, the
+    pending output is flushed and the connection closed.
+
+    the output of every connection goes through a WriteQueue. a connection
+    stops being read from once more than high_water bytes are pending for
+    it and is read again when that is down to low_water. once more than
+    max_buffered bytes are pending across all of them, every connection
+    that writes stops being read from too, until the total is back down to
+    3/4 of max_buffered. a slow reader can't make the server buffer without
+    bound and the others keep being served.
+
+        def echo(conn, data):
+            return data
+
+        srv = net.Server(net.listen('localhost:5055', 'tcp'), echo)
+        srv.serve_forever()
+
+    Parameters
+    ----------
+    listener: TCPListener | UnixListener
+        the listener returned from listen, listen_tcp or listen_unix.
+
+    handler: Callable[[Conn, bytes], Optional[bytes]]
+        called with the conn and the data read from it. it must not block.
+
+    max_conns: int, optional
+        the most connections served at once. the listener stops accepting
+        until a connection closes when this is reached, keeping memory bounded.
+
+    read_size: int, optional
+        the most bytes read from a connection per wakeup.
+
+    high_water, low_water: int, optional
+        pending output at which a connection stops and resumes being read
+        from, see WriteQueue.
+
+    max_buffered: int, optional
+        output pending across every connection past which the connections
+        writing more stop being read from, see WriteBudget. None for no
+        limit.
+    """
+    def __init__(self, listener, handler, max_conns: int = 1024,
+            read_size: int = RECV_MAX, high_water: int = HIGH_WATER,
+            low_water: int = LOW_WATER, max_buffered: Optional[int] = MAX_BUFFERED):
+        assert isinstance(listener, (TCPListener, UnixListener)), \
+                'listener not a TCPListener or UnixListener'
+        self.listener = listener
+        self.handler = handler
+        self.max_conns = max_conns
+        self.read_size = read_size
+        self.high_water = high_water
+        self.low_water = low_water
+        self.budget = WriteBudget(max_buffered) if max_buffered is not None else None
+        self._sel = selectors.DefaultSelector()
+        self._clients = {}
+        self._accepting = False
+        self._running = False
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        # serve connections until shutdown is called. poll_interval is how
+        # often the loop checks for a shutdown.
+        self.listener.setblocking(False)
+        self._start_accepting()
+        self._running = True
+        try:
+            while self._running:
+                for key, mask in self._sel.select(poll_interval):
+                    if key.data is None:
+                        self._accept()
+                        continue
+                    client = key.data
+                    if mask & selectors.EVENT_READ:
+                        self._read(client)
+                    if mask & selectors.EVENT_WRITE and client.conn.fileno() >= 0:
+                        self._flush(client)
+        finally:
+            self._running = False
+
+    def shutdown(self):
+        # stop the serve_forever loop, safe to call from another thread.
+        self._running = False
+
+    def num_conns(self) -> int:
+        # number of connections currently being served.
+        return len(self._clients)
+
+    def handle_error(self, conn: Conn, exc: Exception):
+        # called when the handler raises, the conn is closed afterwards.
+        # override to do something better than printing the traceback.
+        print(f'error serving {conn.remote_addr()}', file=sys.stderr)
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+    def close(self):
+        # close every connection, the selector and the listener.
+        for client in list(self._clients.values()):
+            self._close(client)
+        self._stop_accepting()
+        self._sel.close()
+        self.listener.close()
+
+    def _start_accepting(self):
+        if not self._accepting:
+            self._sel.register(self.listener.sock, selectors.EVENT_READ, None)
+            self._accepting = True
+
+    def _stop_accepting(self):
+        if self._accepting:
+            self._sel.unregister(self.listener.sock)
+            self._accepting = False
+
+    def _accept(self):
+        # drain the accept queue, stopping when max_conns is reached.
+        while len(self._clients) < self.max_conns:
+            try:
+                conns = self.listener.accept_many(self.max_conns - len(self._clients))
+            except (WouldBlockError, InterruptedError):
+                return
+            except ConnectionError:
+                continue
+            for conn in conns:
+                conn.setblocking(False)
+                client = _Client(conn)
+                update = lambda client=client: self._update(client)
+                client.queue = WriteQueue(conn, self.high_water, self.low_water,
+                        self.budget, on_pause=update, on_resume=update)
+                self._clients[conn.fileno()] = client
+                self._update(client)
+        self._stop_accepting()
+
+    def _update(self, client: _Client):
+        # register the conn for what it is waiting on: reads unless it is
+        # paused or done, writes while it has output pending.
+        conn = client.conn
+        if conn.fileno() < 0:
+            return
+        events = 0
+        if not client.eof and not client.queue.paused:
+            events |= selectors.EVENT_READ
+        if conn.pending_bytes():
+            events |= selectors.EVENT_WRITE
+        if events == client.events:
+            return
+        if not events:
+            self._sel.unregister(conn)
+        elif not client.events:
+            self._sel.register(conn, events, client)
+        else:
+            self._sel.modify(conn, events, client)
+        client.events = events
+
+    def _read(self, client: _Client):
+        conn = client.conn
+        try:
+            data = conn.read(self.read_size)
+        except (WouldBlockError, InterruptedError):
+            return
+        except ConnectionError:
+            self._close(client)
+            return
+        if not data:
+            client.eof = True
+            if conn.pending_bytes():
+                self._update(client)
+            else:
+                self._close(client)
+            return
+        try:
+            out = self.handler(client.conn, data)
+        except Exception as e:
+            self.handle_error(client.conn, e)
+            self._close(client)
+            return
+        if out:
+            # the write goes out straight away, most of the time it all fits
+            # in the socket buffer and we never wait for writability.
+            try:
+                client.queue.write(out)
+            except ConnectionError:
+                self._close(client)
+                return
+            self._update(client)
+
+    def _flush(self, client: _Client):
+        try:
+            pending = client.queue.flush()
+        except ConnectionError:
+            self._close(client)
+            return
+        if not pending and client.eof:
+            self._close(client)
+        else:
+            self._update(client)
+
+    def _close(self, client: _Client):
+        conn = client.conn
+        if conn.fileno() < 0:
+            return
+        del self._clients[conn.fileno()]
+        if client.events:
+            self._sel.unregister(conn)
+            client.events = 0
+        conn.close()
+        # hand its pending output back to the budget, it may resume others.
+        client.queue.close()
+        # a slot freed up, resume accepting if max_conns stopped us.
+        self._start_accepting()
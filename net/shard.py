@@ -0,0 +1,133 @@
+import multiprocessing
+import multiprocessing.connection
+import traceback
+
+from .netconn  import *
+from .tcpconn  import *
+from .udpconn  import *
+from .unixconn import *
+
+def _handle_conn(handler, conn):
+    # run handler on conn and always close the conn afterwards.
+    try:
+        handler(conn)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        conn.close()
+
+def _stream_worker(listener, handler):
+    # body of a worker process serving a stream listener. it accepts until
+    # the listener is shut down, handling one connection at a time.
+    while True:
+        try:
+            conn = listener.accept()
+        except ConnectionError:
+            continue
+        except OSError:
+            # the parent shut the listener down.
+            return
+        _handle_conn(handler, conn)
+
+def _datagram_worker(conn, handler):
+    # body of a worker process serving a udp conn, handler gets every
+    # datagram along with the address it came from.
+    while True:
+        try:
+            data, addrinfo = conn.sock.recvfrom(RECV_MAX)
+        except OSError:
+            return
+        if addrinfo is None:
+            # the parent shut the socket down.
+            return
+        try:
+            handler(conn, data, intern_addr(UDPAddr, addrinfo))
+        except Exception:
+            traceback.print_exc()
+
+def _run_workers(targets: list, stopped):
+    # fork a process for every (target, args) in targets and wait on them
+    # until stopped() returns true or they have all exited. the workers are
+    # terminated on the way out.
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=target, args=args, daemon=True)
+            for target, args in targets]
+    for p in procs:
+        p.start()
+    try:
+        while not stopped():
+            alive = [p.sentinel for p in procs if p.is_alive()]
+            if not alive:
+                return
+            multiprocessing.connection.wait(alive, timeout=0.2)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+class ShardedListener:
+    """ShardedListener is a group of sockets bound to the same address with
+    SO_REUSEPORT.
+
+    the kernel spreads incoming connections (or datagrams for udp) across
+    the sockets of the group, serve gives every shard its own worker process
+    so the load is spread across cores without the processes contending on
+    a single accept queue. a ShardedListener is returned from listen when it
+    is called with more than one shard.
+
+        lstn = net.listen(':5055', 'tcp', reuse_port=True, shards=4)
+        lstn.serve(handler)
+
+    Parameters
+    ----------
+    listeners: list
+        the TCPListener or UDPConn sockets making up the group.
+    """
+    def __init__(self, listeners: list):
+        assert listeners, 'sharded listener with no listeners'
+        self.listeners = listeners
+        self.__closed = False
+
+    def __len__(self) -> int:
+        return len(self.listeners)
+
+    def __iter__(self):
+        return iter(self.listeners)
+
+    def local_addr(self) -> Addr:
+        # every shard shares the same local address.
+        return self.listeners[0].local_addr()
+
+    def serve(self, handler):
+        """serve runs a worker process for every shard until close is called.
+
+        for tcp shards handler is called with every accepted TCPConn, which
+        is closed when handler returns. for udp shards handler is called
+        with the shard's UDPConn, the datagram and the address it came from.
+        """
+        targets = []
+        for i, lstn in enumerate(self.listeners):
+            others = self.listeners[:i] + self.listeners[i+1:]
+            targets.append((self._worker, (lstn, others, handler)))
+        _run_workers(targets, lambda: self.__closed)
+
+    @staticmethod
+    def _worker(lstn, others, handler):
+        # a worker only keeps the shard it owns open.
+        for other in others:
+            other.sock.close()
+        if isinstance(lstn, UDPConn):
+            _datagram_worker(lstn, handler)
+        else:
+            _stream_worker(lstn, handler)
+
+    def close(self):
+        # shut every shard down, waking the workers blocked on them.
+        self.__closed = True
+        for lstn in self.listeners:
+            try:
+                lstn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            lstn.close()
@@ -1,5 +1,22 @@
 from .netconn import *
+from .netconn import _accept_many
 from .netaddr import *
+from . import metrics as _metrics
+
+import contextlib, sys
+
+# send data in the syn with the first write after connect. linux has it
+# since 4.11 but python doesn't export it everywhere.
+TCP_FASTOPEN_CONNECT = getattr(socket, 'TCP_FASTOPEN_CONNECT',
+        30 if sys.platform.startswith('linux') else None)
+
+def _set_accept_options(sock: socket.socket, defer_accept: int, fastopen: int):
+    # accept tuning of a tcp listener, set before listen. the options the
+    # platform lacks are skipped, they only make accepting cheaper.
+    if defer_accept and hasattr(socket, 'TCP_DEFER_ACCEPT'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, defer_accept)
+    if fastopen and hasattr(socket, 'TCP_FASTOPEN'):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN, fastopen)
 
 class TCPConn(Conn):
     """TCPConn is tcp socket wrapper.
@@ -21,6 +38,8 @@ class TCPConn(Conn):
         the socket object to open for network communication. if none is supplied,
         One can be created based on the address parameters.
     """
+    __slots__ = ()
+
     def __init__(self, laddr: Optional[TCPAddr], raddr: Optional[TCPAddr],
         conn_type: ConnType = ConnType.REMOTE, sock: Optional[socket.socket]=None):
         if sock == None:
@@ -57,6 +76,54 @@ class TCPConn(Conn):
             self.sock.close()
             raise SocketError(f'trying to perform an unsurported socket action - {conn_type}')
     
+    def send_file(self, file, offset: int = 0, count: Optional[int] = None) -> int:
+        """send_file writes the contents of a file to the connection.
+
+        the copy happens in the kernel with sendfile when file is a regular
+        file and the platform has it, the file never passes through python
+        memory. otherwise it is copied through a small reusable buffer.
+
+        Parameters
+        ----------
+        file: str | os.PathLike | file object
+            path of the file or a file object opened in binary mode.
+
+        offset: int
+            where in the file to start sending from.
+
+        count: int, optional
+            number of bytes to send, defaults to the rest of the file.
+
+        Returns
+        -------
+        the number of bytes sent.
+        """
+        return self._send_file(file, offset, count)
+
+    @contextlib.contextmanager
+    def corked(self):
+        """corked holds back partial segments until the with block ends.
+
+        everything written inside the block leaves in full sized segments,
+        a header written before its body doesn't go out in a packet of its
+        own. it goes with the 'bulk' option profile. where TCP_CORK is
+        missing the block runs uncorked.
+
+            with conn.corked():
+                conn.write(header)
+                conn.send_file(path)
+        """
+        if not hasattr(socket, 'TCP_CORK'):
+            yield self
+            return
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        try:
+            yield self
+        finally:
+            # uncorking sends whatever is still held back.
+            if self.sock.fileno() >= 0:
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+
     def local_addr(self):
         # return the local addr associated with socket.
         if self.laddr:
@@ -75,13 +142,77 @@ class TCPListener(TCPConn):
     """ 
     TCPListener is a wrapper around TCPConn that provides capabilities
     to listen for connections.
+
+    Parameters
+    ----------
+    laddr: TCPAddr
+        the local address to listen on.
+
+    sock: socket.socket, optional
+        the socket to listen with, one is created when none is supplied.
+
+    backlog: int
+        the most connections waiting in the kernel to be accepted, the
+        kernel caps it at net.core.somaxconn.
+
+    defer_accept: int
+        with TCP_DEFER_ACCEPT a connection is only handed to accept once
+        the client sent data, waiting at most about this many seconds for
+        it. accept then never wakes up for a conn that has nothing to read
+        yet. 0 turns it off.
+
+    fastopen: int
+        with TCP_FASTOPEN clients that did a handshake before send their
+        first request in the syn, saving a round trip per connection. it is
+        the most fast open handshakes pending at once, 0 turns it off. the
+        net.ipv4.tcp_fastopen sysctl has to allow it on the server side too.
     """
-    def __init__(self, laddr: TCPAddr, sock: Optional[socket.socket] = None):
+    __slots__ = ()
+
+    def __init__(self, laddr: TCPAddr, sock: Optional[socket.socket] = None,
+            backlog: int = socket.SOMAXCONN, defer_accept: int = 0,
+            fastopen: int = 0):
         # create a tcp socket ready to listen on addr.
         super().__init__(laddr, None, ConnType.LISTEN, sock)
-        self.sock.listen(socket.SOMAXCONN)
+        _set_accept_options(self.sock, defer_accept, fastopen)
+        self.sock.listen(backlog)
 
     def accept(self) -> TCPConn:
         # return a TCPConn from the underlying listening socket.
-        sock, addrinfo = self.sock.accept()
-        return TCPConn(TCPAddr(addrinfo), None, sock=sock)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            sock, addrinfo = self.sock.accept()
+        except BlockingIOError:
+            raise WouldBlockError('accept') from None
+        conn = TCPConn(None, None, sock=sock)
+        conn.raddr = TCPAddr(addrinfo)
+        if hooks is not None:
+            hooks.on_accept(self, conn, seconds=time.perf_counter() - start)
+        return conn
+
+    def accept_many(self, max_n: int = 64) -> list[TCPConn]:
+        """accept_many accepts every connection waiting on the listener, up
+        to max_n of them.
+
+        it waits for the first connection like accept does, then drains the
+        rest of the accept queue without waiting, so a burst of connections
+        is taken in one wakeup instead of one per loop around accept. a non
+        blocking listener raises WouldBlockError when nothing is waiting.
+        the listener is non blocking while the queue is drained, call it
+        from the one thread accepting on the listener.
+
+        Returns
+        -------
+        the accepted TCPConns, at least one.
+        """
+        return _accept_many(self, max_n)
+
+    def close(self) -> None:
+        # shutting the socket down first wakes up threads blocked in accept,
+        # closing it alone leaves them waiting.
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        super().close()
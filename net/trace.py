@@ -0,0 +1,123 @@
+from collections import deque
+from typing import Optional
+import random, threading, time
+
+from .metrics import *
+
+class TraceEvent:
+    """TraceEvent is one traced operation.
+
+    name is one of dial.start, resolve, connect, dial, accept, read, write
+    and close. start is the time.monotonic the operation started at and
+    seconds how long it took, fd is the file descriptor of the conn it
+    happened on (-1 for the dial events). fields holds the rest: the
+    syscall and byte count of a read or write, the address of a dial or
+    connect, the error an operation failed with.
+    """
+    __slots__ = ('name', 'start', 'seconds', 'fd', 'fields')
+
+    def __init__(self, name: str, seconds: float = 0.0, fd: int = -1, **fields):
+        self.name = name
+        self.start = time.monotonic() - seconds
+        self.seconds = seconds
+        self.fd = fd
+        self.fields = fields
+
+    def __repr__(self) -> str:
+        fields = ' '.join(f'{k}={v!r}' for k, v in self.fields.items())
+        return f'<{self.name} fd={self.fd} {self.seconds * 1e6:.0f}us {fields}>'
+
+def _fd(conn) -> int:
+    try:
+        return conn.sock.fileno()
+    except AttributeError:
+        return -1
+
+class Tracer(MetricsHooks):
+    """Tracer turns the metrics hooks into a stream of TraceEvents, to find
+    out where time goes: resolving, connecting or waiting on the peer.
+
+    only sample_ratio of the operations are traced. a dial is sampled as a
+    whole, so a traced dial always comes with its resolve and connect
+    events. events are kept in a bounded buffer, override emit to send them
+    somewhere else instead.
+
+        tracer = net.Tracer(sample_ratio=0.01)
+        net.set_metrics(tracer)
+        ...
+        for ev in tracer.events:
+            print(ev)
+
+    Parameters
+    ----------
+    sample_ratio: float
+        the share of operations traced, between 0 and 1.
+
+    max_events: int
+        the most events kept, the oldest are dropped first.
+    """
+    def __init__(self, sample_ratio: float = 1.0, max_events: int = 10000):
+        self.sample_ratio = sample_ratio
+        self.events = deque(maxlen=max_events)
+        self.__local = threading.local()
+
+    def sampled(self) -> bool:
+        return self.sample_ratio >= 1 or random.random() < self.sample_ratio
+
+    def emit(self, event: TraceEvent):
+        # called with every sampled event.
+        self.events.append(event)
+
+    def clear(self):
+        self.events.clear()
+
+    def __dial_sampled(self) -> bool:
+        # inside a dial the decision made at its start holds.
+        sampled = getattr(self.__local, 'dial', None)
+        if sampled is None:
+            return self.sampled()
+        return sampled
+
+    def on_dial_start(self, network: str, address: str):
+        self.__local.dial = self.sampled()
+        if self.__local.dial:
+            self.emit(TraceEvent('dial.start', network=network, address=address))
+
+    def on_resolve(self, host: str, network: str, seconds: float,
+            err: Optional[BaseException]):
+        if self.__dial_sampled():
+            self.emit(TraceEvent('resolve', seconds, host=host,
+                network=network, err=err))
+
+    def on_connect(self, raddr, seconds: float, err: Optional[BaseException]):
+        if self.__dial_sampled():
+            self.emit(TraceEvent('connect', seconds, raddr=str(raddr), err=err))
+
+    def on_dial(self, network: str, address: str, seconds: float,
+            err: Optional[BaseException]):
+        sampled = self.__dial_sampled()
+        self.__local.dial = None
+        if sampled:
+            self.emit(TraceEvent('dial', seconds, network=network,
+                address=address, err=err))
+
+    def on_accept(self, listener, conn, seconds: float = 0.0):
+        if self.sampled():
+            self.emit(TraceEvent('accept', seconds, _fd(conn),
+                listener=_fd(listener)))
+
+    def on_read(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        if self.sampled():
+            self.emit(TraceEvent('read', seconds, _fd(conn), syscall=syscall,
+                nbytes=nbytes))
+
+    def on_write(self, conn, syscall: str, nbytes: int, msgs: int = 1,
+            seconds: float = 0.0):
+        if self.sampled():
+            self.emit(TraceEvent('write', seconds, _fd(conn), syscall=syscall,
+                nbytes=nbytes))
+
+    def on_close(self, conn):
+        if self.sampled():
+            self.emit(TraceEvent('close', 0.0, _fd(conn)))
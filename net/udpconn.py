@@ -1,5 +1,6 @@
 from .netconn import *
 from .netaddr import *
+from . import metrics as _metrics
 
 class UDPConn(Conn):
     """UDPConn is a wrapper around udp sockets
@@ -21,6 +22,8 @@ class UDPConn(Conn):
         the socket object to open for network communication. if none is supplied,
         One can be created based on the address parameters.
     """
+    __slots__ = ()
+
     def __init__(self, laddr: Optional[UDPAddr], raddr: Optional[UDPAddr],
         conn_type: ConnType = ConnType.REMOTE, sock: Optional[socket.socket] = None):
 
@@ -58,12 +61,114 @@ class UDPConn(Conn):
     def read_from(self) -> tuple[bytes, UDPAddr]:
         # read_from reads from the socket connection and returns
         # the bytes read with the remote host address read from
-        data, raddr = self.sock.recvfrom(RECV_MAX)
-        return data, UDPAddr(raddr)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            data, raddr = self.sock.recvfrom(RECV_MAX)
+        except BlockingIOError:
+            raise WouldBlockError('read_from') from None
+        if hooks is not None:
+            hooks.on_read(self, 'recvfrom', len(data),
+                    seconds=time.perf_counter() - start)
+        if raddr is None:
+            # no sender, the socket was shut down.
+            return data, None
+        return data, intern_addr(UDPAddr, raddr)
 
     def write_to(self, buf: bytes, addr: UDPAddr) -> int:
         # write_to write buf[bytes] to the underlying socket connection.
-        return self.sock.sendto(buf, addr.addrinfo)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            n = self.sock.sendto(buf, addr.addrinfo)
+        except BlockingIOError:
+            raise WouldBlockError('write_to') from None
+        if hooks is not None:
+            hooks.on_write(self, 'sendto', n, seconds=time.perf_counter() - start)
+        return n
+
+    def read_batch(self, max_msgs: int, buffers) -> list[tuple[int, UDPAddr]]:
+        """read_batch reads up to max_msgs datagrams into buffers.
+
+        it waits for the first datagram like read_from does, then drains
+        whatever else is already queued on the socket without waiting. a non
+        blocking conn raises WouldBlockError when nothing is queued. each
+        datagram is received straight into the next buffer, so reusing the
+        same buffers on every call reads without allocating.
+
+        Parameters
+        ----------
+        max_msgs: int
+            the most datagrams to read, capped at len(buffers).
+
+        buffers: list
+            writable buffers (bytearray, memoryview...) to read into, a
+            datagram longer than its buffer is truncated.
+
+        Returns
+        -------
+        a (nbytes, addr) pair for every buffer filled, in order.
+        """
+        max_msgs = min(max_msgs, len(buffers))
+        msgs = []
+        if max_msgs <= 0:
+            return msgs
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            n, raddr = self.sock.recvfrom_into(buffers[0])
+        except BlockingIOError:
+            raise WouldBlockError('read_batch') from None
+        if hooks is not None:
+            hooks.on_read(self, 'recvfrom_into', n,
+                    seconds=time.perf_counter() - start)
+        msgs.append((n, intern_addr(UDPAddr, raddr)))
+        # a socket with a timeout waits for readability even with
+        # MSG_DONTWAIT, so drop the timeout while draining.
+        timeout = self.sock.gettimeout()
+        if timeout:
+            self.sock.settimeout(0)
+        try:
+            for i in range(1, max_msgs):
+                start = time.perf_counter() if hooks is not None else 0.0
+                try:
+                    n, raddr = self.sock.recvfrom_into(buffers[i], 0,
+                            socket.MSG_DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    break
+                if hooks is not None:
+                    hooks.on_read(self, 'recvfrom_into', n,
+                            seconds=time.perf_counter() - start)
+                msgs.append((n, intern_addr(UDPAddr, raddr)))
+        finally:
+            if timeout:
+                self.sock.settimeout(timeout)
+        return msgs
+
+    def write_batch(self, msgs) -> int:
+        """write_batch writes every (buf, addr) pair in msgs as a datagram.
+
+        on a non blocking socket it stops at the first datagram the socket
+        can not take right away.
+
+        Returns
+        -------
+        the number of datagrams written.
+        """
+        sendto = self.sock.sendto
+        hooks = _metrics._hooks
+        sent = 0
+        for buf, addr in msgs:
+            start = time.perf_counter() if hooks is not None else 0.0
+            try:
+                n = sendto(buf, addr.addrinfo)
+            except (BlockingIOError, InterruptedError):
+                break
+            if hooks is not None:
+                hooks.on_write(self, 'sendto', n,
+                        seconds=time.perf_counter() - start)
+            sent += 1
+        return sent
 
     def local_addr(self):
         # return the local addr associated with socket.
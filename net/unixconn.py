@@ -1,5 +1,7 @@
 from .netconn import *
+from .netconn import _accept_many
 from .netaddr import *
+from . import metrics as _metrics
 
 import os
 
@@ -26,6 +28,8 @@ class UnixConn(Conn):
         the socket object to open for network communication. if none is supplied,
         One can be created based on the address parameters.
     """
+    __slots__ = ('max_packet_size',)
+
     def __init__(self, laddr: Optional[UnixAddr], raddr: Optional[UnixAddr],
             conn_type: ConnType = ConnType.REMOTE, sock: Optional[socket.socket]=None):
         if not sock:
@@ -59,12 +63,35 @@ class UnixConn(Conn):
     def read_from(self) -> tuple[bytes, UnixAddr]:
         # read_from reads from the socket connection and returns
         # the bytes read with the remote host address read from
-        data, raddr = self.sock.recvfrom(RECV_MAX)
-        return data, UnixAddr(raddr)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            data, raddr = self.sock.recvfrom(RECV_MAX)
+        except BlockingIOError:
+            raise WouldBlockError('read_from') from None
+        if hooks is not None:
+            hooks.on_read(self, 'recvfrom', len(data),
+                    seconds=time.perf_counter() - start)
+        return data, intern_addr(UnixAddr, raddr)
 
     def write_to(self, buf: bytes, addr: UnixAddr) -> int:
         # write_to write buf[bytes] to the underlying socket connection.
-        return self.sock.sendto(buf, addr.addrinfo)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            n = self.sock.sendto(buf, addr.addrinfo)
+        except BlockingIOError:
+            raise WouldBlockError('write_to') from None
+        if hooks is not None:
+            hooks.on_write(self, 'sendto', n, seconds=time.perf_counter() - start)
+        return n
+
+    def send_file(self, file, offset: int = 0, count: Optional[int] = None) -> int:
+        # send_file writes the contents of a file to a unix stream socket,
+        # see TCPConn.send_file.
+        if self.sock.type != socket.SOCK_STREAM:
+            raise SocketError('send_file on a unix datagram socket')
+        return self._send_file(file, offset, count)
 
     def local_addr(self):
         # return the local addr associated with socket.
@@ -94,19 +121,39 @@ class UnixListener(Conn):
     sock: socket.socket, optional
         the socket object to open for network communication. if none is supplied,
         One can be created based on the address parameters.
+
+    backlog: int
+        the most connections waiting to be accepted.
     """
-    def __init__(self, laddr: UnixAddr, sock: Optional[socket.socket] = None):
+    __slots__ = ('__path', '__unlink')
+
+    def __init__(self, laddr: UnixAddr, sock: Optional[socket.socket] = None,
+            backlog: int = socket.SOMAXCONN):
         self.__path = laddr.addrinfo
         self.__unlink = False
         if not sock:
             sock = socket.socket(AF_UNIX, socket.SOCK_STREAM)
         super().__init__(sock)
         self.bind(laddr, reuse=False)
-        self.sock.listen(socket.SOMAXCONN)
+        self.sock.listen(backlog)
 
     def accept(self) -> UnixConn:
-        sock, addrinfo = self.sock.accept()
-        return UnixConn(UnixAddr(addrinfo), None, sock=sock)
+        hooks = _metrics._hooks
+        start = time.perf_counter() if hooks is not None else 0.0
+        try:
+            sock, addrinfo = self.sock.accept()
+        except BlockingIOError:
+            raise WouldBlockError('accept') from None
+        conn = UnixConn(None, None, sock=sock)
+        conn.raddr = UnixAddr(addrinfo)
+        if hooks is not None:
+            hooks.on_accept(self, conn, seconds=time.perf_counter() - start)
+        return conn
+
+    def accept_many(self, max_n: int = 64) -> list[UnixConn]:
+        # accept the connections waiting on the listener, up to max_n, see
+        # TCPListener.accept_many.
+        return _accept_many(self, max_n)
 
     def local_addr(self):
         if self.laddr:
@@ -118,7 +165,12 @@ class UnixListener(Conn):
         self.__unlink = unlink
 
     def close(self):
-        self.sock.close()
+        # shutdown wakes threads blocked in accept, see TCPListener.close.
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        super().close()
         if self.__unlink:
             try:
                 os.unlink(self.__path)
@@ -0,0 +1,182 @@
+from typing import Optional
+import threading
+
+from .netconn import *
+
+# default watermarks of a WriteQueue.
+HIGH_WATER = 0x10000
+LOW_WATER = 0x4000
+
+class WriteBudget:
+    """WriteBudget caps the bytes queued for sending across many conns.
+
+    share one between the WriteQueues of every conn accepted from a
+    listener and a few slow readers can't make the process buffer without
+    bound, however many conns there are. a queue writing while the budget
+    is used up pauses, the paused queues are resumed once the total drops
+    to low.
+
+        budget = net.WriteBudget(64 << 20)
+        for conn in lstn.accept_many():
+            queues.append(net.WriteQueue(conn, budget=budget))
+
+    Parameters
+    ----------
+    limit: int
+        the most bytes queued across every queue before they pause.
+
+    low: int, optional
+        the total paused queues are resumed at, 3/4 of limit by default.
+    """
+    def __init__(self, limit: int, low: Optional[int] = None):
+        if low is None:
+            low = limit * 3 // 4
+        if not 0 <= low <= limit:
+            raise ValueError(f'low must be between 0 and limit, got {low}')
+        self.limit = limit
+        self.low = low
+        self.used = 0
+        self.__paused = set()
+        self.__lock = threading.Lock()
+
+    def exhausted(self) -> bool:
+        # true while more than limit bytes are queued.
+        return self.used > self.limit
+
+    def _charge(self, n: int):
+        # n more bytes are queued, negative when they were sent.
+        with self.__lock:
+            self.used += n
+            if n >= 0 or self.used > self.low or not self.__paused:
+                return
+            waiting = list(self.__paused)
+        # resume outside the lock, the callbacks may write.
+        for queue in waiting:
+            queue._maybe_resume()
+
+    def _paused(self, queue):
+        with self.__lock:
+            self.__paused.add(queue)
+
+    def _resumed(self, queue):
+        with self.__lock:
+            self.__paused.discard(queue)
+
+class WriteQueue:
+    """WriteQueue adds flow control to the writes of a non blocking conn.
+
+    writes never block, what the socket doesn't take right away is queued
+    on the conn (see Conn.flush). once more than high_water bytes are
+    queued the queue pauses, on_pause is called and the producer should
+    stop writing, a server stops reading requests from the conn. flush
+    sends more as the socket becomes writable and when the queue is down to
+    low_water on_resume is called. a WriteBudget shared with other queues
+    pauses them all when too much is queued in total.
+
+        q = net.WriteQueue(conn, on_pause=stop_reading, on_resume=start_reading)
+        q.write(response)
+        ...
+        # conn is writable
+        q.flush()
+
+    writes made while paused are still queued, pausing is a request to
+    the producer, not a limit on the queue.
+
+    Parameters
+    ----------
+    conn: Conn
+        a conn in non blocking mode. on a blocking conn writes wait for
+        the socket and nothing is ever queued.
+
+    high_water: int
+        queued bytes above which the queue pauses.
+
+    low_water: int
+        queued bytes at or below which a paused queue resumes.
+
+    budget: WriteBudget, optional
+        limit shared with other queues.
+
+    on_pause, on_resume: Callable[[], None], optional
+        called when the queue pauses and resumes.
+    """
+    def __init__(self, conn: Conn, high_water: int = HIGH_WATER,
+            low_water: int = LOW_WATER, budget: Optional[WriteBudget] = None,
+            on_pause=None, on_resume=None):
+        if not 0 <= low_water <= high_water:
+            raise ValueError(f'low_water must be between 0 and high_water, got {low_water}')
+        self.conn = conn
+        self.high_water = high_water
+        self.low_water = low_water
+        self.budget = budget
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+        self.paused = False
+        # bytes charged to the budget.
+        self.__charged = 0
+
+    def write(self, buf: bytes) -> int:
+        # queue buf behind whatever is pending and send what the socket
+        # takes. returns len(buf).
+        n = self.conn.write(buf)
+        self.__update()
+        return n
+
+    def writev(self, buffers) -> int:
+        # write a sequence of buffers, see Conn.writev.
+        n = self.conn.writev(buffers)
+        self.__update()
+        return n
+
+    def flush(self) -> int:
+        # send as much as the socket takes and return how much is still
+        # queued. call it whenever the conn is writable.
+        pending = self.conn.flush()
+        self.__update()
+        return pending
+
+    def pending_bytes(self) -> int:
+        # number of bytes queued.
+        return self.conn.pending_bytes()
+
+    def close(self):
+        # give the queued bytes back to the budget. the conn itself is
+        # left open.
+        if self.budget is not None:
+            self.budget._resumed(self)
+            charged, self.__charged = self.__charged, 0
+            if charged:
+                self.budget._charge(-charged)
+
+    def __update(self):
+        pending = self.conn.pending_bytes()
+        budget = self.budget
+        if budget is not None and pending != self.__charged:
+            charged, self.__charged = self.__charged, pending
+            budget._charge(pending - charged)
+        if not self.paused:
+            if pending > self.high_water or (budget is not None and
+                    budget.exhausted()):
+                self.__pause()
+        else:
+            self._maybe_resume()
+
+    def __pause(self):
+        self.paused = True
+        if self.budget is not None:
+            self.budget._paused(self)
+        if self.on_pause is not None:
+            self.on_pause()
+
+    def _maybe_resume(self):
+        # resume if this queue and the budget are both low enough.
+        if not self.paused or self.conn.pending_bytes() > self.low_water:
+            return
+        budget = self.budget
+        if budget is not None:
+            if budget.used > budget.low:
+                return
+            budget._resumed(self)
+        self.paused = False
+        if self.on_resume is not None:
+            self.on_resume()
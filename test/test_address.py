@@ -73,3 +73,20 @@ class TestConfigInetAddr(unittest.TestCase):
         for tc in tt:
             self.assertEqual(config_inetaddr(*tc['args']).get_config(),
                     tc['want'])
+
+class TestAddrObjects(unittest.TestCase):
+    def test_lazy_ipaddr(self):
+        addr = UDPAddr(('fe80::1', 53, 0, 2))
+        self.assertIsNone(addr._ipaddr)
+        self.assertEqual(str(addr.ipaddr), 'fe80::1%2')
+        self.assertEqual(str(addr), '[fe80::1%2]:53')
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            TCPAddr(('127.0.0.1', 80)).extra = 1
+
+    def test_intern_addr(self):
+        a = intern_addr(UDPAddr, ('127.0.0.1', 5055))
+        self.assertIs(a, intern_addr(UDPAddr, ('127.0.0.1', 5055)))
+        self.assertIsNot(a, intern_addr(TCPAddr, ('127.0.0.1', 5055)))
+        self.assertIsInstance(intern_addr(TCPAddr, ('127.0.0.1', 5055)), TCPAddr)
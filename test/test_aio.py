@@ -0,0 +1,112 @@
+import unittest
+import asyncio
+import os, socket, tempfile
+from unittest import mock
+
+import net
+from net import aio
+
+class TestAsyncConn(unittest.IsolatedAsyncioTestCase):
+    async def test_tcp_echo(self):
+        lstn = await aio.listen('127.0.0.1:0', 'tcp')
+        self.assertIsInstance(lstn, aio.AsyncTCPListener)
+
+        async def echo():
+            async for conn in lstn:
+                async with conn:
+                    await conn.write(await conn.read())
+                return
+
+        server = asyncio.create_task(echo())
+        client = await aio.dial(str(lstn.local_addr()), 'tcp')
+        self.assertIsInstance(client, aio.AsyncTCPConn)
+        self.assertEqual(await client.write(b'some random data'), 16)
+        client.close_write()
+        self.assertEqual(await client.read(), b'some random data')
+        client.close()
+        await server
+        lstn.close()
+
+    async def test_listen_backlog(self):
+        lstn = await aio.listen('127.0.0.1:0', 'tcp', backlog=8, defer_accept=1)
+        self.addCleanup(lstn.close)
+        depth = net.accept_queue_depth(lstn)
+        if depth is not None:
+            self.assertEqual(depth, (0, 8))
+
+    async def test_udp_read_from_write_to(self):
+        srv = await aio.listen('127.0.0.1:0', 'udp')
+        client = await aio.dial(str(srv.local_addr()), 'udp')
+        await client.write(b'ping')
+        buf, raddr = await srv.read_from()
+        self.assertEqual(buf, b'ping')
+        self.assertEqual(raddr.port, client.local_addr().port)
+        await srv.write_to(b'pong', raddr)
+        self.assertEqual(await client.read(4), b'pong')
+        client.close()
+        srv.close()
+
+    async def test_close_ends_iteration(self):
+        lstn = await aio.listen('127.0.0.1:0', 'tcp')
+
+        async def drain():
+            async for conn in lstn:
+                conn.close()
+
+        server = asyncio.create_task(drain())
+        await asyncio.sleep(0)
+        lstn.close()
+        await asyncio.wait_for(server, 1)
+
+    async def test_dial_falls_back(self):
+        lstn = await aio.listen('127.0.0.1:0', 'tcp')
+        # grab a port with nothing listening on it.
+        dead = socket.socket()
+        dead.bind(('127.0.0.1', 0))
+        dead_addr = net.TCPAddr(dead.getsockname())
+        dead.close()
+        addr_list = [dead_addr, lstn.local_addr()]
+        config = net.config_inetaddr('127.0.0.1', '0', 'tcp')
+        with mock.patch('net.netaddr.resolver', return_value=(addr_list, config)):
+            client = await aio.dial('127.0.0.1:0', 'tcp')
+        conn = await lstn.accept()
+        self.assertEqual(client.remote_addr().port, lstn.local_addr().port)
+        conn.close()
+        client.close()
+        lstn.close()
+
+    async def test_unknown_network(self):
+        with self.assertRaises(net.UnknownNetworkError):
+            await aio.dial('127.0.0.1:80', 'sctp')
+        with self.assertRaises(net.UnknownNetworkError):
+            await aio.listen('127.0.0.1:80', 'sctp')
+
+class TestAsyncUnixConn(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'test.sock')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    async def test_unix_echo(self):
+        lstn = await aio.listen(self.path, 'unix')
+        self.assertIsInstance(lstn, aio.AsyncUnixListener)
+        client = await aio.dial(self.path, 'unix')
+        conn = await lstn.accept()
+        await client.write(b'some random data')
+        self.assertEqual(await conn.read(16), b'some random data')
+        conn.close()
+        client.close()
+        lstn.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    async def test_unixgram_read_from(self):
+        srv = await aio.listen(self.path, 'unixgram')
+        self.assertIsInstance(srv, aio.AsyncUnixConn)
+        client = await aio.dial(self.path, 'unixgram')
+        await client.write(b'ping')
+        buf, _ = await srv.read_from()
+        self.assertEqual(buf, b'ping')
+        client.close()
+        srv.close()
@@ -0,0 +1,22 @@
+import unittest
+from net import bench
+
+class TestBench(unittest.TestCase):
+    def test_run(self):
+        results = bench.run(['tcp', 'unixgram'], 0.05)
+        self.assertEqual(set(results['results']), {'tcp', 'unixgram'})
+        self.assertGreater(results['results']['tcp']['conn_rate'], 0)
+        self.assertGreater(results['results']['unixgram']['datagram_rate'], 0)
+
+    def test_compare(self):
+        old = {'results': {'tcp': {'rtt_p99_us': 100, 'conn_rate': 1000}}}
+        new = {'results': {'tcp': {'rtt_p99_us': 150, 'conn_rate': 1050}}}
+        rows = {row[1]: row for row in bench.compare(old, new, threshold=10)}
+        self.assertEqual(rows['rtt_p99_us'][4:], (-50.0, True))
+        self.assertEqual(rows['conn_rate'][4:], (5.0, False))
+
+    def test_latency_empty(self):
+        self.assertEqual(bench._latency(bench.net.Histogram())['rtt_p99_us'], 'n/a')
+        old = {'results': {'tcp': {'rtt_p99_us': 100}}}
+        new = {'results': {'tcp': {'rtt_p99_us': 'n/a'}}}
+        self.assertEqual(bench.compare(old, new), [])
@@ -0,0 +1,79 @@
+import unittest
+import socket, threading, time
+import net
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        h = net.Histogram()
+        for us in range(1, 1001):
+            h.record(us / 1e6)
+        self.assertEqual(h.count, 1000)
+        self.assertAlmostEqual(h.percentile(50), 500e-6, delta=500e-6 / 32)
+        self.assertAlmostEqual(h.percentile(99), 990e-6, delta=990e-6 / 32)
+        self.assertEqual(h.percentile(100), 1000e-6)
+        self.assertAlmostEqual(h.mean(), 500.5e-6)
+
+    def test_merge(self):
+        a, b = net.Histogram(), net.Histogram()
+        a.record(0.001)
+        b.record(0.002)
+        a.merge(b)
+        self.assertEqual((a.count, a.min, a.max), (2, 0.001, 0.002))
+        self.assertIsNone(net.Histogram().percentile(50))
+
+class TestPipelinedClient(unittest.TestCase):
+    def setUp(self):
+        a, b = socket.socketpair()
+        self.client_conn, self.server_conn = net.Conn(a), net.Conn(b)
+        self.addCleanup(self.server_conn.close)
+
+    def serve(self, target):
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        self.addCleanup(t.join, 1)
+
+    def test_many_in_flight(self):
+        self.serve(lambda: net.serve_pipelined(self.server_conn, bytes.upper))
+        with net.PipelinedClient(self.client_conn) as client:
+            futs = [client.submit(b'req %d' % i) for i in range(1000)]
+            self.assertEqual([f.result(5) for f in futs],
+                    [b'REQ %d' % i for i in range(1000)])
+            self.assertEqual(client.latency.count, 1000)
+            # small requests get coalesced into far fewer writes.
+            self.assertLess(client.writes, 1000)
+            self.assertEqual(client.in_flight(), 0)
+
+    def test_out_of_order_responses(self):
+        def reverse():
+            framed = net.LengthPrefixedConn(self.server_conn)
+            msgs = [framed.read_message() for _ in range(3)]
+            framed.write_messages(reversed(msgs))
+        self.serve(reverse)
+        with net.PipelinedClient(self.client_conn) as client:
+            futs = [client.submit(b'%d' % i) for i in range(3)]
+            self.assertEqual([f.result(5) for f in futs], [b'0', b'1', b'2'])
+
+    def test_pending_fail_on_close(self):
+        client = net.PipelinedClient(self.client_conn)
+        fut = client.submit(b'never answered')
+        self.server_conn.close()
+        # fails with whatever broke the conn first, the write or the read.
+        with self.assertRaises((net.SocketError, OSError)):
+            fut.result(5)
+        client.close()
+        with self.assertRaises(net.SocketError):
+            client.submit(b'late')
+
+    def test_close_with_writer_blocked(self):
+        # the server never reads, the writer blocks once the socket buffers
+        # are full.
+        client = net.PipelinedClient(self.client_conn)
+        futs = [client.submit(b'x' * (256 << 10)) for _ in range(32)]
+        time.sleep(0.05)
+        closer = threading.Thread(target=client.close, daemon=True)
+        closer.start()
+        closer.join(5)
+        self.assertFalse(closer.is_alive())
+        for fut in futs:
+            with self.assertRaises(net.SocketError):
+                fut.result(0)
@@ -0,0 +1,341 @@
+import unittest
+import io, os, selectors, socket, tempfile, threading, time
+import net
+
+class TestConnRead(unittest.TestCase):
+    def setUp(self):
+        a, self.peer = socket.socketpair()
+        self.conn = net.Conn(a)
+        # cleanups run last in first out, so the sender threads are joined
+        # before the sockets go away.
+        self.addCleanup(self.peer.close)
+        self.addCleanup(self.conn.close)
+
+    def send_and_close(self, payload):
+        # send from a thread, payload may not fit in the socket buffer.
+        def send():
+            self.peer.sendall(payload)
+            self.peer.shutdown(socket.SHUT_WR)
+        t = threading.Thread(target=send)
+        t.start()
+        self.addCleanup(t.join)
+
+    def test_read_n(self):
+        self.peer.sendall(b'hello world')
+        self.assertEqual(self.conn.read(5), b'hello')
+        self.assertEqual(self.conn.read(64), b' world')
+
+    def test_read_until_eof(self):
+        payload = bytes(range(256)) * 1000
+        self.send_and_close(payload)
+        self.assertEqual(self.conn.read(), payload)
+
+    def test_readexactly(self):
+        self.peer.sendall(b'\x00\x05hello\x00\x03abc')
+        for want in (b'hello', b'abc'):
+            n = int.from_bytes(self.conn.readexactly(2), 'big')
+            self.assertEqual(self.conn.readexactly(n), want)
+
+    def test_readexactly_grows_buffer(self):
+        payload = b'x' * (net.RECV_BUF_SIZE * 3)
+        self.send_and_close(payload)
+        self.assertEqual(self.conn.readexactly(len(payload)), payload)
+
+    def test_readexactly_eof(self):
+        self.peer.sendall(b'abc')
+        self.peer.shutdown(socket.SHUT_WR)
+        with self.assertRaises(net.UnexpectedEOFError) as cm:
+            self.conn.readexactly(5)
+        self.assertEqual(cm.exception.partial, b'abc')
+
+    def test_readuntil(self):
+        self.peer.sendall(b'one\r\ntwo\r\nthr')
+        self.assertEqual(self.conn.readuntil(b'\r\n'), b'one\r\n')
+        self.assertEqual(self.conn.readuntil(b'\r\n'), b'two\r\n')
+        self.peer.sendall(b'ee\r\n')
+        self.assertEqual(self.conn.readuntil(b'\r\n'), b'three\r\n')
+
+    def test_readuntil_limit(self):
+        self.peer.sendall(b'x' * 100)
+        with self.assertRaises(net.LimitExceededError):
+            self.conn.readuntil(b'\n', limit=64)
+
+    def test_readuntil_limit_line_in_one_recv(self):
+        # the whole oversized line and its separator arrive together.
+        self.peer.sendall(b'x' * 50 + b'\nok\n')
+        with self.assertRaises(net.LimitExceededError):
+            self.conn.readuntil(b'\n', limit=10)
+        self.assertEqual(self.conn.readuntil(b'\n', limit=51), b'x' * 50 + b'\n')
+        self.assertEqual(self.conn.readuntil(b'\n', limit=3), b'ok\n')
+
+    def test_read_into(self):
+        self.peer.sendall(b'line\nrest')
+        self.conn.readuntil(b'\n')
+        buf = bytearray(16)
+        n = self.conn.read_into(buf)
+        self.assertEqual(buf[:n], b'rest')
+        self.peer.sendall(b'direct')
+        n = self.conn.read_into(memoryview(buf)[4:])
+        self.assertEqual(buf[:4 + n], b'restdirect')
+
+class TestConnWrite(unittest.TestCase):
+    def setUp(self):
+        a, self.peer = socket.socketpair()
+        self.conn = net.Conn(a)
+
+    def tearDown(self):
+        self.conn.close()
+        self.peer.close()
+
+    def recv_all(self):
+        self.conn.close_write()
+        return net.Conn(self.peer).read()
+
+    def test_write_is_not_held_back(self):
+        self.assertEqual(self.conn.write(b'hello'), 5)
+        self.peer.settimeout(1)
+        self.assertEqual(self.peer.recv(5), b'hello')
+
+    def test_file_mixes_with_write(self):
+        # the buffered file is made on first use, writes made through it
+        # still go out before the next conn.write.
+        self.assertFalse(hasattr(self.conn, '__dict__'))
+        self.conn.file().write(b'buffered ')
+        self.conn.write(b'direct')
+        self.assertEqual(self.recv_all(), b'buffered direct')
+
+    def test_writev(self):
+        bufs = [b'head', bytearray(b'-'), memoryview(b'payload'), b'']
+        self.assertEqual(self.conn.writev(bufs), 12)
+        self.assertEqual(self.recv_all(), b'head-payload')
+
+    def test_writev_partial_writes(self):
+        # much more than the socket buffer takes, so sendmsg comes back
+        # short and the rest has to be resent.
+        bufs = [bytes([i]) * 100000 for i in range(20)]
+        reader = threading.Thread(target=lambda: self.got.append(
+            self.recv_peer_all()))
+        self.got = []
+        reader.start()
+        self.assertEqual(self.conn.writev(bufs), 2000000)
+        self.conn.close_write()
+        reader.join()
+        self.assertEqual(self.got[0], b''.join(bufs))
+
+    def recv_peer_all(self):
+        chunks = []
+        while True:
+            b = self.peer.recv(1 << 16)
+            if not b:
+                return b''.join(chunks)
+            chunks.append(b)
+
+    def test_writev_more_than_iov_max(self):
+        bufs = [b'%d,' % i for i in range(net.IOV_MAX + 10)]
+        self.got = []
+        reader = threading.Thread(target=lambda: self.got.append(
+            self.recv_peer_all()))
+        reader.start()
+        self.conn.writev(bufs)
+        self.conn.close_write()
+        reader.join()
+        self.assertEqual(self.got[0], b''.join(bufs))
+
+class TestNonBlocking(unittest.TestCase):
+    def setUp(self):
+        a, self.peer = socket.socketpair()
+        self.conn = net.Conn(a)
+        self.conn.setblocking(False)
+        self.addCleanup(self.peer.close)
+        self.addCleanup(self.conn.close)
+
+    def test_read_would_block(self):
+        with self.assertRaises(net.WouldBlockError):
+            self.conn.read(10)
+        self.assertIsInstance(net.WouldBlockError('read'), BlockingIOError)
+        self.peer.sendall(b'hello')
+        self.assertEqual(self.conn.read(10), b'hello')
+
+    def test_read_until_eof_keeps_data(self):
+        self.peer.sendall(b'hello ')
+        with self.assertRaises(net.WouldBlockError):
+            self.conn.read()
+        self.peer.sendall(b'world')
+        self.peer.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.conn.read(), b'hello world')
+
+    def test_partial_write_is_pending(self):
+        payload = os.urandom(4 << 20)
+        self.assertEqual(self.conn.write(payload), len(payload))
+        pending = self.conn.pending_bytes()
+        self.assertGreater(pending, 0)
+        self.assertEqual(self.conn.flush(), pending)
+        # later writes queue behind the pending bytes.
+        self.conn.writev([b'a', b'b'])
+        got = []
+        reader = threading.Thread(target=lambda: got.append(
+            net.Conn(self.peer).read()))
+        reader.start()
+        with selectors.DefaultSelector() as sel:
+            sel.register(self.conn, selectors.EVENT_WRITE)
+            while self.conn.flush():
+                sel.select(1)
+        self.assertEqual(self.conn.pending_bytes(), 0)
+        self.conn.close_write()
+        reader.join()
+        self.assertEqual(got[0], payload + b'ab')
+
+    def test_blocking_write_sends_pending_first(self):
+        payload = os.urandom(4 << 20)
+        self.conn.write(payload)
+        got = []
+        reader = threading.Thread(target=lambda: got.append(
+            net.Conn(self.peer).read()))
+        reader.start()
+        self.conn.setblocking(True)
+        self.conn.write(b'tail')
+        self.conn.close_write()
+        reader.join()
+        self.assertEqual(got[0], payload + b'tail')
+
+    def test_accept_would_block(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        lstn.setblocking(False)
+        with self.assertRaises(net.WouldBlockError):
+            lstn.accept()
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        a, self.peer = socket.socketpair()
+        self.conn = net.Conn(a)
+        self.addCleanup(self.peer.close)
+        self.addCleanup(self.conn.close)
+
+    def test_read_deadline(self):
+        self.conn.set_read_deadline(time.monotonic() + 0.05)
+        start = time.monotonic()
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.read(10)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertIsInstance(net.DeadlineExceededError('read'), TimeoutError)
+
+    def test_deadline_spans_syscalls(self):
+        # every byte arrives in time for a per syscall timeout, the whole
+        # read still runs out of time.
+        def trickle():
+            for _ in range(20):
+                time.sleep(0.01)
+                self.peer.sendall(b'x')
+        t = threading.Thread(target=trickle)
+        t.start()
+        self.addCleanup(t.join)
+        self.conn.set_deadline(time.monotonic() + 0.08)
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.readexactly(20)
+
+    def test_read_until_eof_keeps_data(self):
+        self.peer.sendall(b'hello ')
+        self.conn.set_read_deadline(time.monotonic() + 0.02)
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.read()
+        self.conn.set_read_deadline(None)
+        self.peer.sendall(b'world')
+        self.peer.shutdown(socket.SHUT_WR)
+        self.assertEqual(self.conn.read(), b'hello world')
+
+    def test_write_deadline(self):
+        # nobody reads, the socket buffer fills up and the write stalls.
+        self.conn.set_write_deadline(time.monotonic() + 0.05)
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.write(b'x' * (16 << 20))
+
+    def test_expired_deadline(self):
+        self.peer.sendall(b'ready')
+        self.conn.set_deadline(time.monotonic() - 1)
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.read(5)
+        with self.assertRaises(net.DeadlineExceededError):
+            self.conn.write(b'x')
+
+    def test_in_time(self):
+        self.conn.set_deadline(time.monotonic() + 5)
+        payload = os.urandom(1 << 20)
+        got = []
+        reader = threading.Thread(target=lambda: got.append(
+            net.Conn(self.peer).read()))
+        reader.start()
+        self.assertEqual(self.conn.write(payload), len(payload))
+        self.conn.close_write()
+        reader.join()
+        self.assertEqual(got[0], payload)
+
+class TestSendFile(unittest.TestCase):
+    def setUp(self):
+        self.lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.client = net.dial(str(self.lstn.local_addr()), 'tcp')
+        self.conn = self.lstn.accept()
+        self.data = os.urandom(300000)
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.unlink(self.path)
+        self.client.close()
+        self.conn.close()
+        self.lstn.close()
+
+    def send(self, *args):
+        got = []
+        reader = threading.Thread(target=lambda: got.append(self.conn.read()))
+        reader.start()
+        n = self.client.send_file(*args)
+        self.client.close_write()
+        reader.join()
+        return n, got[0]
+
+    def test_path(self):
+        n, got = self.send(self.path)
+        self.assertEqual(n, len(self.data))
+        self.assertEqual(got, self.data)
+
+    def test_offset_count(self):
+        with open(self.path, 'rb') as f:
+            n, got = self.send(f, 1000, 5000)
+            self.assertEqual(f.tell(), 6000)
+        self.assertEqual(n, 5000)
+        self.assertEqual(got, self.data[1000:6000])
+
+    def test_fallback_without_fileno(self):
+        n, got = self.send(io.BytesIO(self.data), 10)
+        self.assertEqual(n, len(self.data) - 10)
+        self.assertEqual(got, self.data[10:])
+
+    def test_non_blocking_sends_what_fits(self):
+        self.client.setblocking(False)
+        big = self.data * 20
+        with open(self.path, 'wb') as f:
+            f.write(big)
+        n = self.client.send_file(self.path)
+        self.assertGreater(n, 0)
+        self.assertLess(n, len(big))
+        with self.assertRaises(net.WouldBlockError):
+            self.client.send_file(self.path, n)
+        self.client.setblocking(True)
+        n, got = self.send(self.path, n)
+        self.assertEqual(got, big)
+
+    def test_write_deadline(self):
+        self.client.set_write_deadline(time.monotonic() + 5)
+        n, got = self.send(self.path)
+        self.assertEqual(got, self.data)
+
+    def test_unix_stream(self):
+        a, b = socket.socketpair()
+        self.addCleanup(b.close)
+        self.addCleanup(a.close)
+        conn = net.UnixConn(None, None, sock=a)
+        self.assertEqual(conn.send_file(self.path, 0, 100), 100)
+        conn.close()
+        self.assertEqual(net.Conn(b).read(), self.data[:100])
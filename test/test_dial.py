@@ -0,0 +1,251 @@
+import unittest
+from unittest import mock
+import errno, os, socket, tempfile, time
+import net
+
+class TestDialParallel(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(net.set_resolver_backend, net.get_resolver_backend())
+        self.addCleanup(net.set_resolver_cache, net.get_resolver_cache())
+        net.set_resolver_cache(None)
+        self.lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(self.lstn.close)
+        self.port = self.lstn.local_addr().port
+
+    def v6_socket(self):
+        s = socket.socket(socket.AF_INET6)
+        self.addCleanup(s.close)
+        try:
+            s.bind(('::1', self.port))
+        except OSError:
+            self.skipTest('no ipv6 loopback')
+        return s
+
+    def test_interleave(self):
+        addrs = [net.TCPAddr(('10.0.0.1', 1)), net.TCPAddr(('10.0.0.2', 1)),
+                net.TCPAddr(('::1', 1, 0, 0)), net.TCPAddr(('10.0.0.3', 1))]
+        ordered = net.dial_listen._interleave_families(addrs)
+        self.assertEqual([str(a.ipaddr) for a in ordered],
+                ['::1', '10.0.0.1', '10.0.0.2', '10.0.0.3'])
+
+    def test_falls_back_on_refused(self):
+        self.v6_socket() # bound but not listening, refuses.
+        net.set_resolver_backend(net.HostsResolver({'svc': ['::1', '127.0.0.1']}))
+        conn = net.dial(f'svc:{self.port}', 'tcp')
+        self.assertEqual(str(conn.remote_addr().ipaddr), '127.0.0.1')
+        self.lstn.accept().close()
+        conn.close()
+
+    def test_races_slow_address(self):
+        # a listener with a full accept queue drops SYNs, attempts to it
+        # hang like a blackholed route.
+        slow = self.v6_socket()
+        slow.listen(0)
+        filler = socket.socket(socket.AF_INET6)
+        self.addCleanup(filler.close)
+        filler.connect(('::1', self.port))
+        net.set_resolver_backend(net.HostsResolver({'svc': ['::1', '127.0.0.1']}))
+        start = time.monotonic()
+        conn = net.dial(f'svc:{self.port}', 'tcp')
+        took = time.monotonic() - start
+        self.assertEqual(str(conn.remote_addr().ipaddr), '127.0.0.1')
+        self.assertGreaterEqual(took, net.CONNECT_ATTEMPT_DELAY * 0.9)
+        self.assertLess(took, 1)
+        self.lstn.accept().close()
+        conn.close()
+
+    def test_skips_unsupported_family(self):
+        get_socket = net.AddrConfig.get_socket
+        calls = []
+        def v6_unsupported(config):
+            calls.append(config)
+            if len(calls) == 1:
+                raise OSError(errno.EAFNOSUPPORT, os.strerror(errno.EAFNOSUPPORT))
+            return get_socket(config)
+        addrs = [net.TCPAddr(('::1', self.port, 0, 0)), self.lstn.local_addr()]
+        config = net.config_inetaddr('127.0.0.1', '0', 'tcp')
+        with mock.patch.object(net.AddrConfig, 'get_socket', v6_unsupported):
+            conn = net.dial_parallel(addrs, config)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(str(conn.remote_addr().ipaddr), '127.0.0.1')
+        self.lstn.accept().close()
+        conn.close()
+
+    def test_all_fail(self):
+        dead = socket.socket()
+        dead.bind(('127.0.0.1', 0))
+        port = dead.getsockname()[1]
+        dead.close()
+        with self.assertRaises(ConnectionRefusedError):
+            net.dial(f'127.0.0.1:{port}', 'tcp')
+
+class TestSocketOptions(unittest.TestCase):
+    def getopt(self, conn, level, name):
+        return conn.sock.getsockopt(level, name)
+
+    def test_profiles(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp', options='keepalive')
+        self.addCleanup(lstn.close)
+        conn = net.dial(str(lstn.local_addr()), 'tcp',
+                options=['low_latency', 'keepalive'])
+        self.addCleanup(conn.close)
+        peer = lstn.accept()
+        self.addCleanup(peer.close)
+        self.assertTrue(self.getopt(conn, socket.IPPROTO_TCP, socket.TCP_NODELAY))
+        self.assertTrue(self.getopt(conn, socket.SOL_SOCKET, socket.SO_KEEPALIVE))
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            self.assertEqual(self.getopt(conn, socket.IPPROTO_TCP,
+                socket.TCP_KEEPIDLE), 60)
+        self.assertTrue(self.getopt(lstn, socket.SOL_SOCKET, socket.SO_KEEPALIVE))
+
+    def test_custom_options(self):
+        size = 1 << 18
+        conn = net.listen('127.0.0.1:0', 'udp',
+                options=[(socket.SOL_SOCKET, socket.SO_RCVBUF, size)])
+        self.addCleanup(conn.close)
+        # linux doubles the value for its own bookkeeping.
+        self.assertGreaterEqual(self.getopt(conn, socket.SOL_SOCKET,
+            socket.SO_RCVBUF), size)
+
+    def test_tcp_options_skipped_elsewhere(self):
+        config = net.config_inetaddr('', '', 'udp')
+        config.add_options('low_latency')
+        config.get_socket().close()
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            net.dial('127.0.0.1:1', 'tcp', options='fastest')
+
+    def test_failed_option_closes_socket(self):
+        config = net.AddrConfig(family=socket.AF_INET,
+                socktype=socket.SOCK_STREAM, options=[(socket.SOL_SOCKET, -1, 1)])
+        with self.assertRaises(OSError):
+            config.get_socket()
+
+    def test_corked(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        conn = net.dial(str(lstn.local_addr()), 'tcp', options='bulk')
+        self.addCleanup(conn.close)
+        peer = lstn.accept()
+        self.addCleanup(peer.close)
+        with conn.corked():
+            conn.write(b'head')
+            conn.write(b'body')
+        peer.settimeout(1)
+        self.assertEqual(peer.readexactly(8), b'headbody')
+        if hasattr(socket, 'TCP_CORK'):
+            self.assertFalse(self.getopt(conn, socket.IPPROTO_TCP, socket.TCP_CORK))
+
+class TestListenTuning(unittest.TestCase):
+    def test_backlog(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp', backlog=8)
+        self.addCleanup(lstn.close)
+        depth = net.accept_queue_depth(lstn)
+        if depth is None:
+            self.skipTest('no TCP_INFO')
+        self.assertEqual(depth, (0, 8))
+
+    @unittest.skipUnless(hasattr(socket, 'TCP_DEFER_ACCEPT'), 'no TCP_DEFER_ACCEPT')
+    def test_defer_accept(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp', defer_accept=1)
+        self.addCleanup(lstn.close)
+        self.assertTrue(lstn.sock.getsockopt(socket.IPPROTO_TCP,
+            socket.TCP_DEFER_ACCEPT))
+        conn = net.dial(str(lstn.local_addr()), 'tcp')
+        self.addCleanup(conn.close)
+        conn.write(b'ping')
+        peer = lstn.accept()
+        self.addCleanup(peer.close)
+        # the request is there by the time accept returns.
+        peer.setblocking(False)
+        self.assertEqual(peer.read(4), b'ping')
+
+    @unittest.skipUnless(hasattr(socket, 'TCP_FASTOPEN'), 'no TCP_FASTOPEN')
+    def test_fastopen(self):
+        lstn = net.listen_tcp(net.TCPAddr(('127.0.0.1', 0)), fastopen=16)
+        self.addCleanup(lstn.close)
+        self.assertEqual(lstn.sock.getsockopt(socket.IPPROTO_TCP,
+            socket.TCP_FASTOPEN), 16)
+        # works with or without the sysctl letting the data into the syn.
+        conn = net.dial_tcp(None, lstn.local_addr(), fastopen=True)
+        self.addCleanup(conn.close)
+        conn.write(b'ping')
+        peer = lstn.accept()
+        self.addCleanup(peer.close)
+        self.assertEqual(peer.readexactly(4), b'ping')
+
+    def test_unix_backlog(self):
+        path = os.path.join(tempfile.mkdtemp(), 'backlog.sock')
+        lstn = net.listen(path, 'unix', backlog=4)
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        self.addCleanup(os.unlink, path)
+        self.addCleanup(lstn.close)
+        conn = net.dial(path, 'unix')
+        self.addCleanup(conn.close)
+        lstn.accept().close()
+
+class TestAcceptMany(unittest.TestCase):
+    def dial_n(self, lstn, n, network='tcp'):
+        clients = [net.dial(str(lstn.local_addr()), network) for _ in range(n)]
+        for c in clients:
+            self.addCleanup(c.close)
+        return clients
+
+    def accept_all(self, lstn, want):
+        conns = []
+        while len(conns) < want:
+            conns.extend(lstn.accept_many())
+        for c in conns:
+            self.addCleanup(c.close)
+        return conns
+
+    def test_drains_queue(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        self.dial_n(lstn, 5)
+        conns = self.accept_all(lstn, 5)
+        self.assertEqual(len(conns), 5)
+        self.assertTrue(all(isinstance(c, net.TCPConn) for c in conns))
+
+    def test_max_n(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        self.dial_n(lstn, 3)
+        # give the handshakes time to land in the accept queue.
+        time.sleep(0.05)
+        first = lstn.accept_many(2)
+        for c in first:
+            self.addCleanup(c.close)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(self.accept_all(lstn, 1)), 1)
+
+    def test_keeps_timeout(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        lstn.sock.settimeout(5)
+        self.dial_n(lstn, 3)
+        time.sleep(0.05)
+        self.accept_all(lstn, 3)
+        self.assertEqual(lstn.sock.gettimeout(), 5)
+
+    def test_non_blocking(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        lstn.setblocking(False)
+        with self.assertRaises(net.WouldBlockError):
+            lstn.accept_many()
+
+    def test_unix(self):
+        path = os.path.join(tempfile.mkdtemp(), 'many.sock')
+        lstn = net.listen(path, 'unix')
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        self.addCleanup(os.unlink, path)
+        self.addCleanup(lstn.close)
+        self.dial_n(lstn, 3, 'unix')
+        conns = self.accept_all(lstn, 3)
+        self.assertTrue(all(isinstance(c, net.UnixConn) for c in conns))
+        # the buffered file is only made when asked for and still works.
+        f = conns[0].file()
+        f.write(b'hi')
+        f.flush()
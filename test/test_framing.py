@@ -0,0 +1,75 @@
+import unittest
+import socket, threading
+import net
+
+class TestDecoders(unittest.TestCase):
+    def test_length_prefix_byte_at_a_time(self):
+        dec = net.LengthPrefixDecoder()
+        stream = b''.join(dec.encode(m) for m in (b'one', b'', b'three'))
+        msgs = []
+        for i in range(len(stream)):
+            msgs.extend(dec.feed(stream[i:i+1]))
+        self.assertEqual(msgs, [b'one', b'', b'three'])
+        self.assertEqual(len(dec), 0)
+
+    def test_length_prefix_limit(self):
+        dec = net.LengthPrefixDecoder(header_size=2, max_size=4)
+        with self.assertRaises(net.LimitExceededError):
+            dec.feed(b'\x00\x05')
+        with self.assertRaises(net.LimitExceededError):
+            dec.encode(b'12345')
+
+    def test_delimiter_split_delimiter(self):
+        dec = net.DelimiterDecoder(b'\r\n')
+        self.assertEqual(dec.feed(b'GET /\r'), [])
+        self.assertEqual(dec.feed(b'\nHost: x\r\n\r'), [b'GET /', b'Host: x'])
+        self.assertEqual(dec.feed(b'\n'), [b''])
+
+    def test_delimiter_limit(self):
+        dec = net.DelimiterDecoder(max_size=4)
+        self.assertEqual(dec.feed(b'1234\n'), [b'1234'])
+        with self.assertRaises(net.LimitExceededError):
+            dec.feed(b'123456')
+
+class TestFramedConn(unittest.TestCase):
+    def setUp(self):
+        a, b = socket.socketpair()
+        self.a, self.b = net.Conn(a), net.Conn(b)
+        self.addCleanup(self.b.close)
+        self.addCleanup(self.a.close)
+
+    def test_length_prefixed_pipeline(self):
+        msgs = [str(i).encode() * (i % 7) for i in range(2000)]
+        writer = net.LengthPrefixedConn(self.a)
+        reader = net.LengthPrefixedConn(self.b)
+
+        def send():
+            writer.write_messages(msgs)
+            self.a.close_write()
+        t = threading.Thread(target=send)
+        t.start()
+        self.addCleanup(t.join)
+        self.assertEqual(list(reader), msgs)
+
+    def test_length_prefixed_truncated(self):
+        self.a.write(b'\x00\x00\x00\x05ab')
+        self.a.close_write()
+        with self.assertRaises(net.UnexpectedEOFError):
+            net.LengthPrefixedConn(self.b).read_message()
+
+    def test_delimited(self):
+        writer = net.DelimitedConn(self.a, b'\r\n')
+        reader = net.DelimitedConn(self.b, b'\r\n')
+        writer.write_messages([b'one', b'two'])
+        writer.write_message(b'three')
+        self.a.close_write()
+        self.assertEqual(list(reader), [b'one', b'two', b'three'])
+        with self.assertRaises(ValueError):
+            writer.write_message(b'a\r\nb')
+
+    def test_delimited_limit(self):
+        self.a.write(b'x' * 50 + b'\n')
+        self.a.close_write()
+        reader = net.DelimitedConn(self.b, max_size=10)
+        with self.assertRaises(net.LimitExceededError):
+            reader.read_message()
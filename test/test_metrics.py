@@ -0,0 +1,92 @@
+import unittest
+import socket, threading
+import net
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.counters = net.Counters(per_conn=True, sample_accept_queue=True)
+        net.set_metrics(self.counters)
+        self.addCleanup(net.set_metrics, None)
+
+    def test_off_by_default(self):
+        net.set_metrics(None)
+        a, b = socket.socketpair()
+        conn = net.Conn(a)
+        conn.write(b'data')
+        conn.close()
+        b.close()
+        self.assertEqual(self.counters.snapshot()['bytes_written'], 0)
+
+    def test_conn_counters(self):
+        a, b = socket.socketpair()
+        conn, peer = net.Conn(a), net.Conn(b)
+        conn.writev([b'head', b'payload'])
+        self.assertEqual(peer.readexactly(11), b'headpayload')
+        conn.write(b'more')
+        self.assertEqual(peer.read(4), b'more')
+        snap = self.counters.snapshot()
+        self.assertEqual(snap['bytes_written'], 15)
+        self.assertEqual(snap['bytes_read'], 15)
+        self.assertEqual(snap['syscalls']['sendmsg'], 1)
+        self.assertEqual(snap['syscalls']['sendall'], 1)
+        self.assertEqual(self.counters.conn_stats(conn)['bytes_written'], 15)
+        self.assertEqual(self.counters.conn_stats(peer)['messages_read'], 2)
+        conn.close()
+        peer.close()
+
+    def test_listener_and_dial(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        client = net.dial(str(lstn.local_addr()), 'tcp')
+        conn = lstn.accept()
+        with self.assertRaises(net.AddressError):
+            net.dial('no port', 'tcp')
+        snap = self.counters.snapshot()
+        self.assertEqual(snap['accepts'], 1)
+        self.assertGreater(snap['accept_rate'], 0)
+        # sampled after the accept, the queue is empty again.
+        self.assertEqual(snap['accept_queue'][0], 0)
+        self.assertEqual((snap['dials'], snap['dial_errors']), (2, 1))
+        # listen and the dial that got as far as resolving.
+        self.assertEqual(snap['resolves'], 2)
+        self.assertEqual(snap['dial_latency']['count'], 2)
+        conn.close()
+        client.close()
+        lstn.close()
+
+    def test_connect(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.addCleanup(lstn.close)
+        client = net.dial(str(lstn.local_addr()), 'tcp')
+        self.addCleanup(client.close)
+        lstn.accept().close()
+        dead = socket.socket()
+        dead.bind(('127.0.0.1', 0))
+        port = dead.getsockname()[1]
+        dead.close()
+        with self.assertRaises(ConnectionRefusedError):
+            net.dial(f'127.0.0.1:{port}', 'tcp')
+        snap = self.counters.snapshot()
+        self.assertEqual((snap['connects'], snap['connect_errors']), (2, 1))
+        self.assertEqual(snap['connect_latency']['count'], 2)
+
+    def test_accept_queue_depth(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        clients = [socket.create_connection(lstn.local_addr().addrinfo)
+                for _ in range(3)]
+        queued, backlog = net.accept_queue_depth(lstn)
+        self.assertEqual(queued, 3)
+        self.assertGreater(backlog, 0)
+        for c in clients:
+            c.close()
+        lstn.close()
+
+    def test_udp(self):
+        srv = net.listen('127.0.0.1:0', 'udp')
+        client = net.dial(str(srv.local_addr()), 'udp')
+        client.write_to(b'ping', srv.local_addr())
+        srv.read_from()
+        snap = self.counters.snapshot()
+        self.assertEqual(snap['syscalls']['sendto'], 1)
+        self.assertEqual(snap['syscalls']['recvfrom'], 1)
+        client.close()
+        srv.close()
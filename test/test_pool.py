@@ -0,0 +1,76 @@
+import unittest
+import socket, threading, time
+import net
+
+class TestPool(unittest.TestCase):
+    def setUp(self):
+        self.lstn = net.listen('127.0.0.1:0', 'tcp')
+        self.accepted = []
+        t = threading.Thread(target=self.accept_loop, daemon=True)
+        t.start()
+        # runs last, once closing the listener has ended the accept loop.
+        self.addCleanup(self.close_accepted, t)
+        self.addCleanup(self.lstn.close)
+        self.pool = net.Pool(str(self.lstn.local_addr()), 'tcp', max_size=2,
+                idle_timeout=10)
+        self.addCleanup(self.pool.close)
+
+    def accept_loop(self):
+        while True:
+            try:
+                self.accepted.append(self.lstn.accept())
+            except (OSError, net.Error):
+                return
+
+    def close_accepted(self, t):
+        t.join(1)
+        for conn in self.accepted:
+            conn.close()
+
+    def test_reuse(self):
+        with self.pool.conn() as c1:
+            pass
+        with self.pool.conn() as c2:
+            self.assertIs(c1, c2)
+        stats = self.pool.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['idle']), (1, 1, 1))
+
+    def test_discard_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.conn() as c1:
+                raise RuntimeError
+        self.assertLess(c1.sock.fileno(), 0)
+        self.assertEqual(self.pool.stats()['open'], 0)
+
+    def test_evicts_closed_by_peer(self):
+        c1 = self.pool.get()
+        self.pool.put(c1)
+        while not self.accepted:
+            time.sleep(0.01)
+        self.accepted[0].close()
+        time.sleep(0.05)
+        c2 = self.pool.get()
+        self.assertIsNot(c1, c2)
+        self.assertEqual(self.pool.stats()['evictions'], 1)
+        self.pool.put(c2)
+
+    def test_idle_timeout(self):
+        self.pool.idle_timeout = 0
+        c1 = self.pool.get()
+        self.pool.put(c1)
+        time.sleep(0.01)
+        self.pool.prune()
+        self.assertEqual(self.pool.stats()['idle'], 0)
+        self.assertLess(c1.sock.fileno(), 0)
+
+    def test_waits_for_free_conn(self):
+        c1, c2 = self.pool.get(), self.pool.get()
+        with self.assertRaises(net.PoolTimeoutError):
+            self.pool.get(timeout=0.05)
+        threading.Timer(0.05, self.pool.put, (c1,)).start()
+        self.assertIs(self.pool.get(timeout=1), c1)
+        stats = self.pool.stats()
+        self.assertEqual(stats['waits'], 2)
+        self.assertGreater(stats['wait_time'], 0.05)
+        self.pool.put(c1)
+        self.pool.put(c2)
@@ -0,0 +1,128 @@
+import unittest
+import asyncio, socket, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import net
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResolverCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = net.ResolverCache(ttl=10, max_size=2, negative_ttl=1,
+                clock=self.clock)
+        self.old = net.get_resolver_cache()
+        net.set_resolver_cache(self.cache)
+        self.addCleanup(net.set_resolver_cache, self.old)
+
+    def patch_getaddrinfo(self, **kwargs):
+        patcher = mock.patch('socket.getaddrinfo', **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_hits_until_ttl(self):
+        gai = self.patch_getaddrinfo(wraps=socket.getaddrinfo)
+        for _ in range(3):
+            addr = net.resolve_tcp_addr('127.0.0.1:80')
+            self.assertEqual(addr.port, 80)
+        self.assertEqual(gai.call_count, 1)
+        self.clock.now = 11
+        net.resolve_tcp_addr('127.0.0.1:80')
+        self.assertEqual(gai.call_count, 2)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']),
+                (2, 2, 1))
+
+    def test_keyed_on_config(self):
+        gai = self.patch_getaddrinfo(wraps=socket.getaddrinfo)
+        net.resolver('127.0.0.1', '80', 'tcp')
+        net.resolver('127.0.0.1', '80', 'udp')
+        self.assertEqual(gai.call_count, 2)
+
+    def test_negative_caching(self):
+        err = socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        gai = self.patch_getaddrinfo(side_effect=err)
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                net.resolver('nowhere.invalid', '80', 'tcp')
+        self.assertEqual(gai.call_count, 1)
+        self.assertEqual(self.cache.stats()['negative_hits'], 1)
+        self.clock.now = 2
+        with self.assertRaises(socket.gaierror):
+            net.resolver('nowhere.invalid', '80', 'tcp')
+        self.assertEqual(gai.call_count, 2)
+
+    def test_lru_eviction(self):
+        for port in ('1', '2', '3'):
+            net.resolver('127.0.0.1', port, 'tcp')
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_opt_out(self):
+        gai = self.patch_getaddrinfo(wraps=socket.getaddrinfo)
+        net.resolver('127.0.0.1', '80', 'tcp', use_cache=False)
+        net.resolver('127.0.0.1', '80', 'tcp', use_cache=False)
+        self.assertEqual(gai.call_count, 2)
+        net.set_resolver_cache(None)
+        net.resolver('127.0.0.1', '80', 'tcp')
+        self.assertEqual(gai.call_count, 3)
+
+class TestResolverBackends(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(net.set_resolver_cache, net.get_resolver_cache())
+        self.addCleanup(net.set_resolver_backend, net.get_resolver_backend())
+        net.set_resolver_cache(None)
+
+    def test_hosts_resolver(self):
+        hosts = net.HostsResolver({'svc': ['127.0.0.1', '::1']})
+        net.set_resolver_backend(hosts)
+        addr_list, _ = net.resolver('svc', '80', 'tcp')
+        self.assertEqual([str(a) for a in addr_list], ['127.0.0.1:80'])
+        addr_list, _ = net.resolver('svc', '80', 'tcp6')
+        self.assertEqual([str(a) for a in addr_list], ['[::1]:80'])
+        with self.assertRaises(socket.gaierror):
+            net.resolver('nowhere', '80', 'tcp')
+        # literals never reach the table.
+        net.resolver('127.0.0.1', '80', 'tcp')
+        self.assertEqual(hosts.lookups, 3)
+
+    def test_hosts_from_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='hosts') as f:
+            f.write('# comment\n10.0.0.1 svc svc.local\n::2 svc\n')
+            f.flush()
+            hosts = net.HostsResolver.from_file(f.name)
+        self.assertEqual(hosts.hosts['svc'], ['10.0.0.1', '::2'])
+        self.assertEqual(hosts.hosts['svc.local'], ['10.0.0.1'])
+
+    def test_threaded_coalesces(self):
+        release = threading.Event()
+        calls = []
+
+        def lookup(key):
+            calls.append(key)
+            release.wait(5)
+            return net.HostsResolver({'svc': ['127.0.0.1']})(key)
+
+        backend = net.ThreadedResolver(max_workers=4, lookup=lookup)
+        self.addCleanup(backend.close)
+        net.set_resolver_backend(backend)
+        with ThreadPoolExecutor(8) as pool:
+            futs = [pool.submit(net.resolve_tcp_addr, 'svc:80') for _ in range(8)]
+            while backend.lookups + backend.coalesced < 8:
+                time.sleep(0.01)
+            release.set()
+            addrs = [f.result() for f in futs]
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(backend.coalesced, 7)
+        self.assertTrue(all(a.port == 80 for a in addrs))
+
+    def test_resolve_addr_async(self):
+        net.set_resolver_backend(net.HostsResolver({'svc': ['127.0.0.1']}))
+        addr_list, config = asyncio.run(net.resolve_addr_async('svc', '80', 'udp'))
+        self.assertIsInstance(addr_list[0], net.UDPAddr)
+        self.assertEqual(str(addr_list[0]), '127.0.0.1:80')
@@ -0,0 +1,88 @@
+import unittest
+import os, socket, threading, time
+import net
+
+def pid_handler(conn):
+    conn.sock.recv(1)
+    conn.sock.sendall(str(os.getpid()).encode())
+
+class TestServe(unittest.TestCase):
+    def start(self, handler, **kwargs):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        thread = threading.Thread(target=net.serve, args=(lstn, handler),
+                kwargs=kwargs)
+        thread.start()
+        return lstn, thread
+
+    def request(self, addr):
+        c = socket.create_connection(addr)
+        c.sendall(b'x')
+        buf = b''
+        while True:
+            b = c.recv(64)
+            if not b:
+                break
+            buf += b
+        c.close()
+        return buf
+
+    def test_thread_mode_runs_handlers_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def handler(conn):
+            conn.sock.recv(1)
+            # would deadlock if the handlers were run one after the other.
+            barrier.wait()
+            conn.sock.sendall(b'ok')
+
+        lstn, thread = self.start(handler, workers=3)
+        addr = lstn.local_addr().addrinfo
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(
+            self.request(addr))) for _ in range(3)]
+        for c in clients:
+            c.start()
+        for c in clients:
+            c.join()
+        lstn.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results, [b'ok'] * 3)
+
+    def test_thread_mode_backpressure(self):
+        release = threading.Event()
+        started = []
+
+        def handler(conn):
+            started.append(conn)
+            release.wait(5)
+
+        lstn, thread = self.start(handler, workers=1, max_pending=0)
+        addr = lstn.local_addr().addrinfo
+        clients = [socket.create_connection(addr) for _ in range(3)]
+        time.sleep(0.2)
+        # one connection is being handled, the rest wait in the kernel.
+        self.assertEqual(len(started), 1)
+        release.set()
+        for c in clients:
+            c.close()
+        time.sleep(0.2)
+        lstn.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(started), 3)
+
+    def test_process_mode(self):
+        lstn, thread = self.start(pid_handler, workers=2, mode='process')
+        addr = lstn.local_addr().addrinfo
+        pids = {self.request(addr) for _ in range(4)}
+        lstn.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertNotIn(str(os.getpid()).encode(), pids)
+
+    def test_unknown_mode(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        with self.assertRaises(ValueError):
+            net.serve(lstn, pid_handler, mode='fiber')
+        lstn.close()
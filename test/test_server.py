@@ -0,0 +1,95 @@
+import unittest
+import os, socket, tempfile, threading
+import net
+
+def echo(conn, data):
+    return data
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.srv = net.Server(net.listen('127.0.0.1:0', 'tcp'), echo)
+        self.addr = self.srv.listener.local_addr().addrinfo
+        self.thread = threading.Thread(target=self.srv.serve_forever,
+                args=(0.05,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.srv.shutdown()
+        self.thread.join()
+        self.srv.close()
+
+    def test_concurrent_echo(self):
+        # every client stays connected while the others are served.
+        clients = [socket.create_connection(self.addr) for _ in range(50)]
+        for i, c in enumerate(clients):
+            c.sendall(b'message %d' % i)
+        for i, c in enumerate(clients):
+            want = b'message %d' % i
+            got = b''
+            while len(got) < len(want):
+                got += c.recv(64)
+            self.assertEqual(got, want)
+        for c in clients:
+            c.close()
+
+    def test_flushes_on_eof(self):
+        c = socket.create_connection(self.addr)
+        payload = b'x' * (1 << 20)
+        sender = threading.Thread(target=c.sendall, args=(payload,))
+        sender.start()
+        got = bytearray()
+        while len(got) < len(payload):
+            got += c.recv(1 << 16)
+        sender.join()
+        c.shutdown(socket.SHUT_WR)
+        self.assertEqual(c.recv(1), b'')
+        self.assertEqual(bytes(got), payload)
+        c.close()
+
+class TestServerMaxConns(unittest.TestCase):
+    def test_stops_accepting_at_max_conns(self):
+        srv = net.Server(net.listen('127.0.0.1:0', 'tcp'), echo, max_conns=2)
+        addr = srv.listener.local_addr().addrinfo
+        thread = threading.Thread(target=srv.serve_forever, args=(0.05,))
+        thread.start()
+        try:
+            clients = [socket.create_connection(addr) for _ in range(3)]
+            clients[0].sendall(b'a')
+            self.assertEqual(clients[0].recv(1), b'a')
+            clients[1].sendall(b'b')
+            self.assertEqual(clients[1].recv(1), b'b')
+            self.assertEqual(srv.num_conns(), 2)
+            clients[0].close()
+            clients[2].sendall(b'c')
+            self.assertEqual(clients[2].recv(1), b'c')
+            for c in clients[1:]:
+                c.close()
+        finally:
+            srv.shutdown()
+            thread.join()
+            srv.close()
+
+class TestUnixServer(unittest.TestCase):
+    def test_unix_echo(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'test.sock')
+            srv = net.Server(net.listen(path, 'unix'), echo)
+            thread = threading.Thread(target=srv.serve_forever, args=(0.05,))
+            thread.start()
+            try:
+                c = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                c.connect(path)
+                c.sendall(b'some random data')
+                c.shutdown(socket.SHUT_WR)
+                got = b''
+                while True:
+                    b = c.recv(64)
+                    if not b:
+                        break
+                    got += b
+                self.assertEqual(got, b'some random data')
+                c.close()
+            finally:
+                srv.shutdown()
+                thread.join()
+                srv.close()
@@ -0,0 +1,51 @@
+import unittest
+import os, socket, threading
+import net
+
+def pid_handler(conn):
+    conn.sock.sendall(str(os.getpid()).encode())
+
+def udp_pid_handler(conn, buf, raddr):
+    conn.write_to(str(os.getpid()).encode(), raddr)
+
+class TestShardedListener(unittest.TestCase):
+    def test_shards_share_port(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp', reuse_port=True, shards=3)
+        self.assertIsInstance(lstn, net.ShardedListener)
+        self.assertEqual(len(lstn), 3)
+        ports = {l.sock.getsockname()[1] for l in lstn}
+        self.assertEqual(ports, {lstn.local_addr().port})
+        lstn.close()
+
+    def test_needs_reuse_port(self):
+        with self.assertRaises(ValueError):
+            net.listen('127.0.0.1:0', 'tcp', shards=2)
+
+    def test_serve_tcp(self):
+        lstn = net.listen('127.0.0.1:0', 'tcp', reuse_port=True, shards=2)
+        addr = lstn.local_addr().addrinfo
+        thread = threading.Thread(target=net.serve, args=(lstn, pid_handler))
+        thread.start()
+        for _ in range(4):
+            c = socket.create_connection(addr)
+            pid = c.recv(64)
+            c.close()
+            self.assertNotEqual(pid, str(os.getpid()).encode())
+        lstn.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_serve_udp(self):
+        lstn = net.listen('127.0.0.1:0', 'udp', reuse_port=True, shards=2)
+        self.assertIsInstance(lstn.listeners[0], net.UDPConn)
+        thread = threading.Thread(target=lstn.serve, args=(udp_pid_handler,))
+        thread.start()
+        c = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        c.settimeout(5)
+        c.sendto(b'ping', lstn.local_addr().addrinfo)
+        pid, _ = c.recvfrom(64)
+        c.close()
+        self.assertNotEqual(pid, str(os.getpid()).encode())
+        lstn.close()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
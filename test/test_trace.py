@@ -0,0 +1,57 @@
+import unittest
+import socket
+import net
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(net.set_metrics, None)
+
+    def test_dial_accept_read_write_close(self):
+        tracer = net.Tracer()
+        counters = net.Counters()
+        net.set_metrics(net.HookChain(tracer, counters))
+        lstn = net.listen('127.0.0.1:0', 'tcp')
+        client = net.dial(str(lstn.local_addr()), 'tcp')
+        conn = lstn.accept()
+        client.write(b'ping')
+        self.assertEqual(conn.read(4), b'ping')
+        client.close()
+        names = [ev.name for ev in tracer.events]
+        # listen resolves too, the dial events come after it in order.
+        self.assertEqual(names[1:], ['dial.start', 'resolve', 'connect',
+            'dial', 'accept', 'write', 'read', 'close'])
+        dial = tracer.events[4]
+        self.assertEqual(dial.fields['address'], str(lstn.local_addr()))
+        self.assertIsNone(dial.fields['err'])
+        read = tracer.events[7]
+        self.assertEqual((read.fields['nbytes'], read.fd), (4, conn.sock.fileno()))
+        self.assertEqual(counters.snapshot()['bytes_read'], 4)
+        conn.close()
+        lstn.close()
+
+    def test_failed_connect(self):
+        tracer = net.Tracer()
+        net.set_metrics(tracer)
+        dead = socket.socket()
+        dead.bind(('127.0.0.1', 0))
+        port = dead.getsockname()[1]
+        dead.close()
+        with self.assertRaises(ConnectionRefusedError):
+            net.dial(f'127.0.0.1:{port}', 'tcp')
+        connect = [ev for ev in tracer.events if ev.name == 'connect'][0]
+        self.assertIsInstance(connect.fields['err'], ConnectionRefusedError)
+        self.assertIsNotNone(tracer.events[-1].fields['err'])
+
+    def test_sampling(self):
+        tracer = net.Tracer(sample_ratio=0)
+        net.set_metrics(tracer)
+        a, b = socket.socketpair()
+        conn = net.Conn(a)
+        conn.write(b'x')
+        conn.close()
+        b.close()
+        self.assertEqual(len(tracer.events), 0)
+        tracer.sample_ratio = 0.5
+        for _ in range(1000):
+            tracer.on_close(conn)
+        self.assertTrue(300 < len(tracer.events) < 700)
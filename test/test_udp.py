@@ -0,0 +1,42 @@
+import unittest
+import net
+
+class TestUDPBatch(unittest.TestCase):
+    def setUp(self):
+        self.srv = net.listen('127.0.0.1:0', 'udp')
+        self.client = net.listen('127.0.0.1:0', 'udp')
+        self.srv.settimeout(5)
+        self.client.settimeout(5)
+
+    def tearDown(self):
+        self.srv.close()
+        self.client.close()
+
+    def test_write_read_batch(self):
+        laddr = self.srv.local_addr()
+        msgs = [(b'msg %d' % i, laddr) for i in range(10)]
+        self.assertEqual(self.client.write_batch(msgs), 10)
+
+        buffers = [bytearray(64) for _ in range(8)]
+        got = self.srv.read_batch(8, buffers)
+        self.assertEqual(len(got), 8)
+        for i, (n, _) in enumerate(got):
+            self.assertEqual(bytes(buffers[i][:n]), b'msg %d' % i)
+        # the same buffers are reused for the rest.
+        got = self.srv.read_batch(8, buffers)
+        self.assertEqual(len(got), 2)
+        n, raddr = got[-1]
+        self.assertEqual(bytes(buffers[1][:n]), b'msg 9')
+        self.assertEqual(raddr.port, self.client.local_addr().port)
+
+    def test_read_batch_returns_what_is_queued(self):
+        self.client.write_to(b'only one', self.srv.local_addr())
+        buffers = [bytearray(64) for _ in range(4)]
+        got = self.srv.read_batch(4, buffers)
+        self.assertEqual(len(got), 1)
+        self.assertEqual(bytes(buffers[0][:got[0][0]]), b'only one')
+
+    def test_read_batch_non_blocking_empty(self):
+        self.srv.setblocking(False)
+        with self.assertRaises(net.WouldBlockError):
+            self.srv.read_batch(4, [bytearray(64) for _ in range(4)])
@@ -0,0 +1,93 @@
+import unittest
+import socket, threading
+import net
+
+class TestWriteQueue(unittest.TestCase):
+    def pair(self):
+        a, b = socket.socketpair()
+        conn = net.Conn(a)
+        conn.setblocking(False)
+        self.addCleanup(b.close)
+        self.addCleanup(conn.close)
+        return conn, b
+
+    def drain(self, sock, n):
+        got = 0
+        while got < n:
+            got += len(sock.recv(1 << 20))
+
+    def test_watermarks(self):
+        conn, peer = self.pair()
+        events = []
+        q = net.WriteQueue(conn, high_water=1 << 16, low_water=1 << 12,
+                on_pause=lambda: events.append('pause'),
+                on_resume=lambda: events.append('resume'))
+        total = 0
+        while not q.paused:
+            total += q.write(b'x' * (1 << 16))
+        self.assertEqual(events, ['pause'])
+        self.assertGreater(q.pending_bytes(), 1 << 16)
+        # writes are still taken while paused.
+        total += q.write(b'y')
+        self.assertEqual(events, ['pause'])
+        while q.pending_bytes():
+            self.drain(peer, 1 << 16)
+            q.flush()
+        self.assertEqual(events, ['pause', 'resume'])
+        self.assertFalse(q.paused)
+
+    def test_bad_watermarks(self):
+        conn, _ = self.pair()
+        with self.assertRaises(ValueError):
+            net.WriteQueue(conn, high_water=10, low_water=20)
+
+    def test_budget(self):
+        budget = net.WriteBudget(1 << 20, low=1 << 16)
+        (c1, p1), (c2, p2) = self.pair(), self.pair()
+        # watermarks far above the budget, only the budget pauses.
+        q1 = net.WriteQueue(c1, 1 << 30, 1 << 16, budget)
+        q2 = net.WriteQueue(c2, 1 << 30, 1 << 16, budget)
+        while not q1.paused:
+            q1.write(b'x' * (1 << 16))
+        self.assertTrue(budget.exhausted())
+        self.assertEqual(budget.used, q1.pending_bytes())
+        # the other queue pauses on its first write.
+        q2.write(b'y')
+        self.assertTrue(q2.paused)
+        # freeing the budget resumes both.
+        q1.close()
+        self.assertEqual(budget.used, q2.pending_bytes())
+        self.assertFalse(q2.paused)
+
+class TestServerBackpressure(unittest.TestCase):
+    def test_slow_reader_does_not_stall_others(self):
+        srv = net.Server(net.listen('127.0.0.1:0', 'tcp'),
+                lambda conn, data: data * 64, high_water=1 << 16,
+                low_water=1 << 12, max_buffered=1 << 22)
+        addr = srv.listener.local_addr().addrinfo
+        thread = threading.Thread(target=srv.serve_forever, args=(0.05,))
+        thread.start()
+        self.addCleanup(srv.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(srv.shutdown)
+
+        # the slow client never reads its responses.
+        slow = socket.create_connection(addr)
+        self.addCleanup(slow.close)
+        slow.setblocking(False)
+        try:
+            for _ in range(1000):
+                slow.send(b'x' * 1024)
+        except BlockingIOError:
+            pass
+        fast = socket.create_connection(addr)
+        self.addCleanup(fast.close)
+        fast.settimeout(5)
+        fast.sendall(b'ping')
+        got = b''
+        while len(got) < 4 * 64:
+            got += fast.recv(1024)
+        self.assertEqual(got, b'ping' * 64)
+        # the server stopped reading the slow client long before the
+        # budget ran out.
+        self.assertLessEqual(srv.budget.used, 1 << 22)